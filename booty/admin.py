@@ -1,15 +1,22 @@
+import hashlib
 import json
-import pandas as pd
-from fastapi import APIRouter, HTTPException, Body
+import os
+import time
+from fastapi import APIRouter, Depends, HTTPException, Body, Request
 from pydantic import BaseModel
-from typing import List
+from typing import List, NamedTuple, Optional
 from fastapi.responses import FileResponse
 
+import http_cache
+from auth import require_admin
+from benchmark_store import BENCHMARK_FILE, STAT_INTERVAL, benchmark_store, benchmark_versions, write_benchmarks
+from versioned_files import VersionedFile
+
 admin_router = APIRouter(prefix="/admin")
 
 # === File Paths ===
 VISIBILITY_FILE = "visibility_settings.json"
-BENCHMARK_FILE = "benchmarks/final_cleaned_benchmarks_with_certainty.csv"
+visibility_versions = VersionedFile(VISIBILITY_FILE, "visibility")
 
 # === Models ===
 
@@ -18,54 +25,141 @@ class VisibilitySetting(BaseModel):
     calculator: str
     visible: bool
 
+# === Visibility Cache ===
+# Parsed once per file change and published as one immutable snapshot, so a
+# reader never pairs one version's data with another's ETag `version`.
+
+
+class _VisibilitySnapshot(NamedTuple):
+    mtime_ns: Optional[int]
+    generation: Optional[int]
+    data: Optional[list]
+    version: Optional[str]
+
+
+_visibility = _VisibilitySnapshot(None, None, None, None)
+_visibility_next_stat = 0.0
+_visibility_listeners = []
+
+
+def on_visibility_change(callback):
+    _visibility_listeners.append(callback)
+
+
+def load_visibility():
+    """
+    Returns (settings, version). Re-reads the file when another worker's write
+    bumps the shared change signal, or when its mtime changes (checked every
+    STAT_INTERVAL seconds, for hand edits).
+    """
+    global _visibility, _visibility_next_stat
+    snapshot = _visibility
+    generation = visibility_versions.signal.value()
+    if snapshot.generation == generation:
+        now = time.monotonic()
+        if now < _visibility_next_stat:
+            return snapshot.data, snapshot.version
+        _visibility_next_stat = now + STAT_INTERVAL
+        if snapshot.mtime_ns == os.stat(VISIBILITY_FILE).st_mtime_ns:
+            return snapshot.data, snapshot.version
+    # Writes replace the file by rename, so the handle and its fstat match
+    with open(VISIBILITY_FILE, "rb") as f:
+        mtime_ns = os.fstat(f.fileno()).st_mtime_ns
+        raw = f.read()
+    snapshot = _VisibilitySnapshot(mtime_ns, generation, json.loads(raw), hashlib.sha1(raw).hexdigest()[:12])
+    _visibility = snapshot
+    return snapshot.data, snapshot.version
+
+
+def _publish_visibility(raw: bytes) -> int:
+    version = visibility_versions.write(raw)
+    load_visibility()
+    for callback in _visibility_listeners:
+        callback()
+    return version
+
 # === Visibility Endpoints ===
 
 
 @admin_router.get("/get-visibility")
 async def get_visibility():
     try:
-        with open(VISIBILITY_FILE, "r") as f:
-            data = json.load(f)
+        data, _ = load_visibility()
         return {"status": "success", "data": data}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@admin_router.post("/set-visibility")
-async def set_visibility(payload: dict = Body(...)):
+# Handlers that touch the version history are plain `def` so they run in the
+# threadpool: VersionedFile.write waits on an flock other workers may hold, then fsyncs
+@admin_router.post("/set-visibility", dependencies=[Depends(require_admin)])
+def set_visibility(payload: dict = Body(...)):
     try:
         updated = [VisibilitySetting(**item)
                    for item in payload["updated_visibility"]]
-        with open(VISIBILITY_FILE, "w") as f:
-            json.dump([v.dict() for v in updated], f, indent=2)
-        return {"status": "success", "message": "Visibility settings updated."}
+        version = _publish_visibility(json.dumps([v.dict() for v in updated], indent=2).encode())
+        return {"status": "success", "message": "Visibility settings updated.", "version": version}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+
+@admin_router.get("/visibility-history", dependencies=[Depends(require_admin)])
+def visibility_history():
+    return {"status": "success", "current": visibility_versions.current_version(), "data": visibility_versions.history()}
+
+
+@admin_router.post("/rollback-visibility/{version}", dependencies=[Depends(require_admin)])
+def rollback_visibility(version: int):
+    """Republishes an earlier version as a new one; history is never rewritten."""
+    try:
+        raw = visibility_versions.read(version)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Visibility version {version} not found.")
+    new_version = _publish_visibility(raw)
+    return {"status": "success", "message": f"Visibility rolled back to version {version}.", "version": new_version}
+
 # === Benchmark Endpoints ===
 
 
 @admin_router.get("/get-benchmarks")
-async def get_benchmarks():
+async def get_benchmarks(request: Request):
     try:
-        df = pd.read_csv(BENCHMARK_FILE)
-        return {"status": "success", "data": df.to_dict(orient="records")}
+        table = benchmark_store.get()
+        return http_cache.cached_json(
+            request,
+            http_cache.make_etag("admin-benchmarks", table.version),
+            lambda: {"status": "success", "data": table.records()},
+            cache_control=http_cache.PRIVATE_REVALIDATE,
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@admin_router.post("/update-benchmarks")
-async def update_benchmarks(updated_benchmarks: List[dict]):
+@admin_router.post("/update-benchmarks", dependencies=[Depends(require_admin)])
+def update_benchmarks(updated_benchmarks: List[dict]):
     try:
-        df = pd.DataFrame(updated_benchmarks)
-        original_columns = pd.read_csv(
-            BENCHMARK_FILE, nrows=1).columns.tolist()
-        df = df[original_columns]
-        df.to_csv(BENCHMARK_FILE, index=False)
-        return {"status": "success", "message": "Benchmarks updated and saved successfully."}
+        version = write_benchmarks(updated_benchmarks)
+        benchmark_store.reload(force=True)
+        return {"status": "success", "message": "Benchmarks updated and saved successfully.", "version": version}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+
+@admin_router.get("/benchmark-history", dependencies=[Depends(require_admin)])
+def benchmark_history():
+    return {"status": "success", "current": benchmark_versions.current_version(), "data": benchmark_versions.history()}
+
+
+@admin_router.post("/rollback-benchmarks/{version}", dependencies=[Depends(require_admin)])
+def rollback_benchmarks(version: int):
+    """Republishes an earlier version as a new one; history is never rewritten."""
+    try:
+        new_version = benchmark_versions.rollback(version)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Benchmark version {version} not found.")
+    benchmark_store.reload(force=True)
+    return {"status": "success", "message": f"Benchmarks rolled back to version {version}.", "version": new_version}
+
 # === CSV Download Endpoint ===
 
 
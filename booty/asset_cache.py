@@ -0,0 +1,86 @@
+import hashlib
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+import metrics
+
+ASSETS_DIR = os.getenv("ASSETS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets"))
+# Replaced or removed files are noticed within this many seconds
+STAT_INTERVAL = float(os.getenv("ASSET_STAT_INTERVAL", "5.0"))
+
+# === 1. ASSETS ===
+
+
+class Asset:
+    """One file's bytes and fingerprint. Never mutated; a change swaps in a new instance."""
+
+    __slots__ = ("name", "content", "sha256", "mtime_ns", "size")
+
+    def __init__(self, name: str, content: bytes, mtime_ns: int):
+        self.name = name
+        self.content = content
+        self.sha256 = hashlib.sha256(content).hexdigest()
+        self.mtime_ns = mtime_ns
+        self.size = len(content)
+
+# === 2. PROCESS-WIDE CACHE ===
+
+
+class AssetCache:
+    """
+    Serves files from ASSETS_DIR out of memory. Each name is stat'ed at most
+    once per STAT_INTERVAL and re-read only when its mtime or size changed;
+    missing files are cached too, so a lookup is normally one dict read.
+    Loaded before fork under gunicorn, the bytes are shared by every worker.
+    """
+
+    def __init__(self, directory: str = ASSETS_DIR):
+        self.directory = directory
+        self.loads = 0
+        # name -> (asset or None when missing, monotonic time of the next stat)
+        self._entries: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> Optional[Asset]:
+        entry = self._entries.get(name)
+        if entry is not None and time.monotonic() < entry[1]:
+            return entry[0]
+        return self._refresh(name, entry[0] if entry is not None else None)
+
+    def _refresh(self, name: str, current: Optional[Asset]) -> Optional[Asset]:
+        path = os.path.join(self.directory, name)
+        with self._lock:
+            asset = current
+            try:
+                with open(path, "rb") as f:
+                    st = os.fstat(f.fileno())
+                    if current is None or (current.mtime_ns, current.size) != (st.st_mtime_ns, st.st_size):
+                        asset = Asset(name, f.read(), st.st_mtime_ns)
+                        self.loads += 1
+                        print(f"📎 Asset loaded: {name} ({asset.size:,} bytes, {asset.sha256[:12]})")
+            except (FileNotFoundError, IsADirectoryError):
+                asset = None
+            self._entries[name] = (asset, time.monotonic() + STAT_INTERVAL)
+            return asset
+
+    def warm(self):
+        """Load every file in the directory."""
+        try:
+            names = sorted(os.listdir(self.directory))
+        except FileNotFoundError:
+            print(f"⚠️ Assets directory not found: {self.directory}")
+            return
+        for name in names:
+            if os.path.isfile(os.path.join(self.directory, name)):
+                self.get(name)
+
+
+asset_cache = AssetCache()
+metrics.counter_func(
+    "clarity_asset_loads_total",
+    "Onboarding asset file reads (startup and changed files)",
+    (),
+    lambda: {(): asset_cache.loads},
+)
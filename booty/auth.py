@@ -0,0 +1,16 @@
+import hmac
+import os
+
+from fastapi import Header, HTTPException
+
+
+def is_admin(password: str) -> bool:
+    """Same ADMIN_PASSWORD as the protected module loader; constant-time compare."""
+    expected = os.getenv("ADMIN_PASSWORD")
+    return bool(expected) and hmac.compare_digest(password.encode(), expected.encode())
+
+
+def require_admin(x_admin_password: str = Header(default="")):
+    """Dependency for admin-only API routes."""
+    if not is_admin(x_admin_password):
+        raise HTTPException(status_code=401, detail="Unauthorized")
@@ -0,0 +1,95 @@
+import json
+import os
+from typing import Any, Dict, List, Literal, Optional
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel
+
+router = APIRouter(prefix="/batch", tags=["batch"])
+
+MAX_BATCH_ROWS = int(os.getenv("MAX_BATCH_ROWS", "100000"))
+STREAM_CHUNK_ROWS = 1000
+
+CalculatorName = Literal[
+    "payroll_waste",
+    "customer_churn",
+    "leadership_drag",
+    "workforce_productivity",
+    "productivity_dive",
+]
+
+# === Models ===
+
+
+class BatchRequest(BaseModel):
+    calculator: CalculatorName
+    # Either one object per scenario (same fields as the /run-* route) ...
+    inputs: Optional[List[Dict[str, Any]]] = None
+    # ... or the same data column-wise: {"industry": [...], "avg_salary": [...], ...}
+    columns: Optional[Dict[str, List[Any]]] = None
+    stream: bool = False
+
+# === Encoding ===
+
+
+def _encode_rows(start, industries, out, ok, decimals=2):
+    """Yield one JSON document per scenario for rows [start, start + len(industries))."""
+    keys = list(out)
+    stop = start + len(industries)
+    cols = [out[k][start:stop].round(decimals).tolist() for k in keys]
+    for offset, industry in enumerate(industries):
+        i = start + offset
+        if not ok[i]:
+            yield json.dumps({"index": i, "industry": industry,
+                              "error": f"Industry '{industry}' not found in benchmarks."})
+            continue
+        row = {"index": i, "industry": industry}
+        for k, col in zip(keys, cols):
+            v = col[offset]
+            row[k] = v if v == v and v not in (float("inf"), float("-inf")) else None
+        yield json.dumps(row)
+
+# === Route ===
+
+
+@router.post("/run")
+def run_batch(req: BatchRequest):
+    # Deferred so numpy stays off the cold-start import path
+    import vectorized
+
+    if req.inputs is not None:
+        rows = req.inputs
+        industries = [str(r.get("industry", "")) for r in rows]
+    elif req.columns is not None:
+        industries = [str(i) for i in req.columns.get("industry") or []]
+    else:
+        raise HTTPException(status_code=422, detail="Provide either 'inputs' or 'columns'.")
+
+    n = len(industries)
+    if n > MAX_BATCH_ROWS:
+        raise HTTPException(status_code=413, detail=f"Batch too large: {n} rows (max {MAX_BATCH_ROWS}).")
+
+    try:
+        if req.inputs is not None:
+            x = vectorized.columns_from_rows(req.calculator, rows)
+        else:
+            x = vectorized.columns_from_columns(req.calculator, req.columns, n)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    out, ok = vectorized.evaluate(req.calculator, x, industries)
+    errors = int(n - ok.sum())
+
+    def chunks():
+        for start in range(0, n, STREAM_CHUNK_ROWS):
+            part = industries[start:start + STREAM_CHUNK_ROWS]
+            yield "".join(line + "\n" for line in _encode_rows(start, part, out, ok))
+
+    if req.stream:
+        return StreamingResponse(chunks(), media_type="application/x-ndjson")
+
+    # Hand-built body: jsonable_encoder would walk every row again
+    body = ",".join(_encode_rows(0, industries, out, ok))
+    header = json.dumps({"calculator": req.calculator, "count": n, "errors": errors})[:-1]
+    return Response(content=f'{header}, "results": [{body}]}}', media_type="application/json")
@@ -0,0 +1,178 @@
+import csv
+import hashlib
+import io
+import os
+import threading
+import time
+
+import metrics
+import profiling
+from versioned_files import VersionedFile
+
+BENCHMARK_FILE = "benchmarks/final_cleaned_benchmarks_with_certainty.csv"
+# Hand edits (not made through write_benchmarks) are noticed within this many seconds
+STAT_INTERVAL = float(os.getenv("BENCHMARK_STAT_INTERVAL", "2.0"))
+
+# === 1. PARSED TABLE ===
+
+
+class BenchmarkTable:
+    """
+    Immutable parsed view of the benchmark CSV.
+    `rows` maps industry -> {column: value}; readers never see a partial table
+    because the store swaps whole instances.
+    """
+
+    def __init__(self, columns, rows, version, mtime_ns, generation=None):
+        self.columns = columns
+        self.rows = rows
+        self.industries = sorted(rows)
+        self.version = version
+        self.mtime_ns = mtime_ns
+        self.generation = generation
+
+    def get(self, industry):
+        return self.rows.get(industry)
+
+    def records(self):
+        """Rows in file order with the Industry column, as the admin panel expects."""
+        return [
+            {c: (industry if c == "Industry" else row.get(c)) for c in self.columns}
+            for industry, row in self.rows.items()
+        ]
+
+
+def _coerce(value: str):
+    value = value.strip()
+    if value == "":
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+def parse_benchmarks(raw: bytes) -> BenchmarkTable:
+    # Plain csv keeps pandas/numpy out of the import graph; the file is ~17 rows.
+    reader = csv.reader(io.StringIO(raw.decode("utf-8-sig")))
+    columns = [c.strip() for c in next(reader)]
+    rows = {}
+    for cells in reader:
+        record = dict(zip(columns, cells))
+        industry = record.pop("Industry", "").strip()
+        if not industry:
+            continue
+        # Blank cells are left out so callers' `.get(col, default)` fallbacks apply
+        rows[industry] = {
+            c: v for c, v in ((c, _coerce(v)) for c, v in record.items()) if v is not None
+        }
+    version = hashlib.sha1(raw).hexdigest()[:12]
+    return BenchmarkTable(columns, rows, version, mtime_ns=None)
+
+
+def read_columns(path=BENCHMARK_FILE):
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        return [c.strip() for c in next(csv.reader(f))]
+
+
+benchmark_versions = VersionedFile(BENCHMARK_FILE, "benchmarks")
+
+
+def write_benchmarks(records) -> int:
+    """Validates and atomically publishes a new benchmark CSV; returns its version number."""
+    columns = read_columns(benchmark_versions.path)
+    missing = [c for c in columns if any(c not in r for r in records)]
+    if missing:
+        raise ValueError(f"Missing benchmark columns: {missing}")
+    buf = io.StringIO(newline="")
+    writer = csv.DictWriter(buf, fieldnames=columns, extrasaction="ignore")
+    writer.writeheader()
+    writer.writerows(records)
+    return benchmark_versions.write(buf.getvalue().encode("utf-8"))
+
+# === 2. PROCESS-WIDE STORE ===
+
+
+class BenchmarkStore:
+    """
+    Loads the benchmark CSV once and serves it from memory. Reads take no lock:
+    they get whichever immutable table the last reload published.
+    A table is rebuilt when `signal` (bumped by write_benchmarks in any worker
+    process) moves past the generation it was built from, when the file's mtime
+    changes (checked every STAT_INTERVAL seconds) or on `reload(force=True)`.
+    """
+
+    def __init__(self, path=BENCHMARK_FILE, signal=None):
+        self.path = path
+        self.signal = signal
+        self.loads = 0
+        self._table = None
+        self._version = None
+        self._next_stat = 0.0
+        self._listeners = []
+        self._lock = threading.Lock()
+
+    def on_change(self, callback):
+        """Register `callback(table)` to run whenever a reload changes the table's version."""
+        self._listeners.append(callback)
+
+    def _generation(self):
+        return self.signal.value() if self.signal is not None else None
+
+    def get(self) -> BenchmarkTable:
+        table = self._table
+        if table is not None and table.generation == self._generation():
+            now = time.monotonic()
+            if now < self._next_stat:
+                return table
+            self._next_stat = now + STAT_INTERVAL
+            try:
+                if os.stat(self.path).st_mtime_ns == table.mtime_ns:
+                    return table
+            except OSError:
+                return table
+        return self.reload()
+
+    def reload(self, force=False) -> BenchmarkTable:
+        with self._lock:
+            current = self._table
+            # Read before the file: a write landing in between bumps it again
+            generation = self._generation()
+            # Writes replace the file by rename, so the open handle and its
+            # fstat always describe the same complete version
+            with open(self.path, "rb") as f:
+                mtime_ns = os.fstat(f.fileno()).st_mtime_ns
+                if (
+                    not force
+                    and current is not None
+                    and current.mtime_ns == mtime_ns
+                    and current.generation == generation
+                ):
+                    return current
+                with profiling.span("load_benchmarks"):
+                    raw = f.read()
+                    table = parse_benchmarks(raw)
+            table.mtime_ns = mtime_ns
+            table.generation = generation
+            self._table = table
+            self.loads += 1
+            print(f"📊 Benchmarks loaded: {len(table.rows)} industries (v{table.version})")
+            changed = table.version != self._version
+            self._version = table.version
+        if changed:
+            for callback in self._listeners:
+                callback(table)
+        return table
+
+
+benchmark_store = BenchmarkStore(signal=benchmark_versions.signal)
+metrics.counter_func(
+    "clarity_benchmark_loads_total",
+    "Benchmark CSV parses (startup, admin writes, cross-worker invalidation)",
+    (),
+    lambda: {(): benchmark_store.loads},
+)
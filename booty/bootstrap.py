@@ -0,0 +1,48 @@
+from fastapi import APIRouter, Request
+
+import http_cache
+from admin import load_visibility, on_visibility_change
+from benchmark_store import benchmark_store
+from calculator import industry_defaults
+
+router = APIRouter(tags=["bootstrap"])
+
+# Visibility toggles should reach users within a minute
+BOOTSTRAP_CACHE = "public, max-age=60, stale-while-revalidate=86400"
+
+
+def _etag(benchmark_version, visibility_version):
+    return http_cache.make_etag("bootstrap", benchmark_version, visibility_version)
+
+
+def _build(table, visibility):
+    return {
+        "benchmark_version": table.version,
+        "industries": table.industries,
+        "benchmarks": {name: industry_defaults(name, table.rows[name]) for name in table.industries},
+        "visibility": visibility,
+    }
+
+
+def warm(*_):
+    """Encode the payload for the current benchmark/visibility versions ahead of the first request."""
+    table = benchmark_store.get()
+    visibility, visibility_version = load_visibility()
+    http_cache.encoded_body(_etag(table.version, visibility_version), lambda: _build(table, visibility))
+
+
+benchmark_store.on_change(warm)
+on_visibility_change(warm)
+
+
+@router.get("/bootstrap")
+def bootstrap(request: Request):
+    """Everything a module page needs before first paint: industries, pre-fill defaults, visibility."""
+    table = benchmark_store.get()
+    visibility, visibility_version = load_visibility()
+    return http_cache.cached_json(
+        request,
+        _etag(table.version, visibility_version),
+        lambda: _build(table, visibility),
+        cache_control=BOOTSTRAP_CACHE,
+    )
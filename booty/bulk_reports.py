@@ -0,0 +1,342 @@
+import asyncio
+import csv
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+from uuid import uuid4
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import JSONResponse
+
+import outbox
+import report_templates
+from auth import require_admin
+from operational_risk import RiskInput, run_operational_risk
+from versioned_files import atomic_write
+
+router = APIRouter(prefix="/admin/bulk-reports", tags=["bulk-reports"], dependencies=[Depends(require_admin)])
+
+# === 1. SETTINGS ===
+# A bulk job spools the upload to disk, then a background thread reads it one
+# row at a time, scores and renders each lead and queues Mailgun batch sends
+# (one shared body, per-recipient values in `recipient-variables`) through the
+# outbox. Only the current batch is ever held in memory, whatever the file size,
+# plus an 8-byte digest per address for de-duplicating across the whole job;
+# delivery concurrency is the outbox's worker pool. Job status is mirrored to
+# `<id>.status.json` so any worker process can report on or cancel any job.
+
+BULK_SPOOL_DIR = os.getenv("BULK_SPOOL_DIR", "bulk_spool")
+MAX_UPLOAD_BYTES = int(os.getenv("BULK_MAX_UPLOAD_BYTES", str(200 * 1024 * 1024)))
+BATCH_SIZE = min(1000, int(os.getenv("BULK_BATCH_SIZE", "500")))  # Mailgun caps a batch at 1000
+DEFAULT_SUBJECT = "Your Operational Risk Summary"
+MAX_ERRORS_KEPT = 50
+MAX_JOBS_KEPT = 20
+
+_jobs: "OrderedDict[str, BulkJob]" = OrderedDict()
+
+# === 2. JOBS ===
+
+
+class BulkJob:
+    def __init__(self, subject: str, fmt: str):
+        self.id = uuid4().hex[:12]
+        self.subject = subject
+        self.format = fmt
+        self.status = "uploading"
+        self.bytes_received = 0
+        self.rows = 0
+        self.queued = 0
+        self.invalid = 0
+        self.duplicates = 0
+        self.batches = 0
+        self.errors: List[Dict] = []
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.cancelled = threading.Event()
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def key_prefix(self):
+        return f"bulk:{self.id}:"
+
+    def fail_row(self, line: int, error: str):
+        self.invalid += 1
+        if len(self.errors) < MAX_ERRORS_KEPT:
+            self.errors.append({"row": line, "error": error[:300]})
+
+    def state(self):
+        return {
+            "id": self.id,
+            "status": self.status,
+            "format": self.format,
+            "subject": self.subject,
+            "bytes_received": self.bytes_received,
+            "rows": self.rows,
+            "queued": self.queued,
+            "invalid": self.invalid,
+            "duplicates": self.duplicates,
+            "batches": self.batches,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "errors": self.errors,
+        }
+
+    def snapshot(self):
+        return _describe(self.state())
+
+
+def _describe(state: Dict):
+    end = state["finished_at"] or time.time()
+    elapsed = end - state["started_at"] if state["started_at"] else 0.0
+    return {
+        **{k: state[k] for k in ("id", "status", "format", "subject", "bytes_received", "rows", "queued",
+                                 "invalid", "duplicates", "batches")},
+        "elapsed_seconds": round(elapsed, 2),
+        "rows_per_second": round(state["rows"] / elapsed, 1) if elapsed else 0.0,
+        # Batch-level delivery state from the outbox (pending/sending/sent/dead)
+        "delivery": outbox.stats_for_prefix(f"bulk:{state['id']}:") if state["batches"] else {},
+        "errors": state["errors"],
+    }
+
+
+def _status_path(job_id: str) -> str:
+    return os.path.join(BULK_SPOOL_DIR, f"{job_id}.status.json")
+
+
+def _cancel_path(job_id: str) -> str:
+    return os.path.join(BULK_SPOOL_DIR, f"{job_id}.cancel")
+
+
+def _persist(job: BulkJob):
+    atomic_write(_status_path(job.id), json.dumps(job.state()).encode())
+
+
+def _load_state(job_id: str) -> Optional[Dict]:
+    try:
+        with open(_status_path(job_id), "rb") as f:
+            return json.loads(f.read())
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _all_states() -> List[Dict]:
+    states = {}
+    for name in os.listdir(BULK_SPOOL_DIR) if os.path.isdir(BULK_SPOOL_DIR) else ():
+        if name.endswith(".status.json"):
+            state = _load_state(name[: -len(".status.json")])
+            if state is not None:
+                states[state["id"]] = state
+    # Jobs running in this process are fresher than their last persisted state
+    states.update((job.id, job.state()) for job in _jobs.values())
+    return sorted(states.values(), key=lambda s: s["created_at"], reverse=True)
+
+
+def _remember(job: BulkJob):
+    _jobs[job.id] = job
+    while len(_jobs) > MAX_JOBS_KEPT:
+        oldest = next((k for k, j in _jobs.items() if j.status in ("done", "failed", "cancelled")), None)
+        if oldest is None:
+            break
+        del _jobs[oldest]
+
+
+def _prune_states():
+    """Delete status files of finished jobs past MAX_JOBS_KEPT. Reads every status file."""
+    finished = [s for s in _all_states() if s["status"] in ("done", "failed", "cancelled")]
+    for state in finished[MAX_JOBS_KEPT:]:
+        try:
+            os.remove(_status_path(state["id"]))
+        except OSError:
+            pass
+
+# === 3. PROCESSING ===
+
+
+def _read_rows(path: str, fmt: str):
+    """Yields (line number, dict or None if unparseable) without loading the file."""
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        if fmt == "csv":
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row
+        else:
+            for line_no, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    yield line_no, json.loads(line)
+                except ValueError:
+                    yield line_no, None
+
+
+def _lead_values(row: Dict):
+    email = str(row.get("email") or row.get("recipient") or "").strip()
+    if "@" not in email:
+        raise ValueError("Missing or invalid email")
+    # Blank CSV cells fall back to the RiskInput defaults
+    fields = {k: v for k, v in row.items() if k and v not in ("", None)}
+    inputs = RiskInput(**fields)
+    data = inputs.model_dump()
+    data.update(run_operational_risk(inputs))
+    return email, report_templates.ors_report_values(data)
+
+
+def _queue_batch(job: BulkJob, sender: str, batch: Dict[str, Dict]):
+    html = report_templates.recipient_variables_html("ors_report.html")
+    outbox.enqueue(
+        f"{job.key_prefix}{job.batches:06d}",
+        "bulk_ors_report",
+        {
+            "from": f"Candoo Culture Reports <{sender}>",
+            "to": list(batch),
+            "subject": job.subject,
+            "html": html,
+            "recipient-variables": json.dumps(batch, separators=(",", ":")),
+        },
+    )
+    job.batches += 1
+    job.queued += len(batch)
+    # Cancels from other workers arrive as a marker file
+    if os.path.exists(_cancel_path(job.id)):
+        job.cancelled.set()
+    _persist(job)
+
+
+def _produce(job: BulkJob, path: str, sender: str):
+    batch: Dict[str, Dict] = {}
+    seen = set()
+    for line, row in _read_rows(path, job.format):
+        if job.cancelled.is_set():
+            break
+        job.rows += 1
+        if not isinstance(row, dict):
+            job.fail_row(line, "Malformed row")
+            continue
+        try:
+            email, values = _lead_values(row)
+        except Exception as e:
+            job.fail_row(line, str(e))
+            continue
+        digest = hashlib.blake2b(email.lower().encode(), digest_size=8).digest()
+        if digest in seen:
+            job.duplicates += 1
+            continue
+        seen.add(digest)
+        batch[email] = values
+        if len(batch) >= BATCH_SIZE:
+            _queue_batch(job, sender, batch)
+            batch = {}
+    if batch and not job.cancelled.is_set():
+        _queue_batch(job, sender, batch)
+
+
+async def _run(job: BulkJob, path: str, sender: str):
+    job.status = "running"
+    job.started_at = time.time()
+    await asyncio.to_thread(_persist, job)
+    try:
+        await asyncio.to_thread(_produce, job, path, sender)
+        job.status = "cancelled" if job.cancelled.is_set() else "done"
+        print(f"📨 Bulk job {job.id} {job.status}: {job.queued} queued in {job.batches} batches, {job.invalid} invalid")
+    except Exception as e:
+        job.status = "failed"
+        job.fail_row(0, f"Job failed: {e}")
+        print(f"🔥 Bulk job {job.id} failed: {e}")
+    finally:
+        job.finished_at = time.time()
+        await asyncio.to_thread(_finish_files, job, path)
+
+
+def _finish_files(job: BulkJob, path: str):
+    _persist(job)
+    for leftover in (path, _cancel_path(job.id)):
+        try:
+            os.remove(leftover)
+        except OSError:
+            pass
+
+
+def stop():
+    for job in _jobs.values():
+        job.cancelled.set()
+
+# === 4. ROUTES ===
+
+
+@router.post("", status_code=202)
+async def create_bulk_job(request: Request, subject: str = Query(default=DEFAULT_SUBJECT)):
+    """
+    Upload a CSV (header row) or NDJSON file of leads as the raw request body.
+    Each row needs an `email` column plus any RiskInput fields.
+    """
+    content_type = request.headers.get("content-type", "")
+    if "csv" in content_type:
+        fmt = "csv"
+    elif "ndjson" in content_type or "jsonl" in content_type:
+        fmt = "ndjson"
+    else:
+        raise HTTPException(status_code=415, detail="Upload text/csv or application/x-ndjson.")
+
+    sender = os.getenv("MAILGUN_SENDER")
+    if not all([os.getenv("MAILGUN_API_KEY"), os.getenv("MAILGUN_DOMAIN"), sender]):
+        raise HTTPException(status_code=500, detail="Missing Mailgun environment variables")
+
+    job = BulkJob(subject, fmt)
+    os.makedirs(BULK_SPOOL_DIR, exist_ok=True)
+    path = os.path.join(BULK_SPOOL_DIR, f"{job.id}.{fmt}")
+    try:
+        with open(path, "wb") as f:
+            async for chunk in request.stream():
+                job.bytes_received += len(chunk)
+                if job.bytes_received > MAX_UPLOAD_BYTES:
+                    raise HTTPException(status_code=413, detail=f"Upload exceeds {MAX_UPLOAD_BYTES} bytes.")
+                # Disk writes (and the fsyncs below) go through a worker thread, never the event loop
+                await asyncio.to_thread(f.write, chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+
+    job.status = "queued"
+    _remember(job)
+    await asyncio.to_thread(_persist, job)
+    await asyncio.to_thread(_prune_states)
+    job.task = asyncio.create_task(_run(job, path, sender))
+    return JSONResponse(status_code=202, content=job.snapshot())
+
+
+@router.get("")
+def list_bulk_jobs():
+    return {"status": "success", "data": [_describe(state) for state in _all_states()[:MAX_JOBS_KEPT]]}
+
+
+def _find_state(job_id: str) -> Dict:
+    job = _jobs.get(job_id)
+    state = job.state() if job is not None else _load_state(job_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return state
+
+
+@router.get("/{job_id}")
+def get_bulk_job(job_id: str):
+    return {"status": "success", "data": _describe(_find_state(job_id))}
+
+
+@router.post("/{job_id}/cancel")
+def cancel_bulk_job(job_id: str):
+    """Stops reading new rows; batches already queued are still delivered."""
+    job = _jobs.get(job_id)
+    if job is not None:
+        job.cancelled.set()
+        return {"status": "success", "data": job.snapshot()}
+    state = _find_state(job_id)
+    if state["status"] in ("queued", "running"):
+        # Running in another worker; it checks for this between batches
+        atomic_write(_cancel_path(job_id), b"")
+    return {"status": "success", "data": _describe(state)}
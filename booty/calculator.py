@@ -1,27 +1,27 @@
-import pandas as pd
+from benchmark_store import benchmark_store
 
 # === 1. LOAD INDUSTRY BENCHMARKS ===
 
 
 def load_benchmark_data():
-    df = pd.read_csv("benchmarks/final_cleaned_benchmarks_with_certainty.csv")
-    df.set_index("Industry", inplace=True)
-    return df
+    # Served from the process-wide store; the CSV is only re-read when it changes.
+    return benchmark_store.get()
 
 # === 2. LOOKUP ===
 
 
 def industry_benchmarks(industry):
-    df = load_benchmark_data()
-    if industry not in df.index:
+    b = load_benchmark_data().get(industry)
+    if b is None:
         raise ValueError(f"Industry '{industry}' not found in benchmarks.")
-    return df.loc[industry]
+    return b
 
 # === 3. BENCHMARK MESSAGES ===
 
 
-def compare_to_benchmark(industry, improvement_rate):
-    b = industry_benchmarks(industry)
+def compare_to_benchmark(industry, improvement_rate, b=None):
+    if b is None:
+        b = industry_benchmarks(industry)
     return [
         f"{industry} typically has an employee churn rate of {b.get('Employee Churn Rate (%) (Value)', 'N/A')}%.",
         f"Inefficiency rate in {industry} averages {b.get('Process Inefficiency Rate (%) (Value)', 'N/A')}%.",
@@ -60,7 +60,7 @@ def calculate_efficiency_loss_and_roi(data):
                              "Return Per Dollar": f"${round(return_per_dollar, 2)}",
                              "Payback Period": f"{payback_days} days"
                              },
-        "benchmark_messages": compare_to_benchmark(data.industry, data.improvement_rate)
+        "benchmark_messages": compare_to_benchmark(data.industry, data.improvement_rate, b)
     }
 
 # === 5. CUSTOMER CHURN ===
@@ -256,9 +256,27 @@ def calculate_productivity_metrics_dive(data):
 
 
 def get_industry_benchmarks():
-    return load_benchmark_data().to_dict(orient="index")
+    return {industry: dict(row) for industry, row in load_benchmark_data().rows.items()}
 
-# === 10. ROUTE ALIASES FOR MAIN ===
+# === 10. MODULE PAGE DEFAULTS ===
+
+
+def industry_defaults(industry, b=None):
+    """Benchmark values the module pages pre-fill for an industry."""
+    if b is None:
+        b = industry_benchmarks(industry)
+    return {
+        "churn_rate": int(b.get("Customer Churn Rate (%) (Value)", 0)),
+        "inefficiency_rate": int(b.get("Process Inefficiency Rate (%) (Value)", 0)),
+        "leadership_drag": int(b.get("Leadership Drag Impact (%) (Value)", 10)),
+        "target_hours_per_employee": int(b.get("Target Hours per Employee (Value)", 160)),
+        # Expose per-employee source of truth and keep back-compat key
+        "absenteeism_days_per_employee": float(b.get("Absenteeism Days per Month (Value)", 1.0)),
+        "absenteeism_days": float(b.get("Absenteeism Days per Month (Value)", 1.0)),
+        "cac": int(b.get("Customer Acquisition Cost (CAC) (AUD) (Value)", 800))
+    }
+
+# === 11. ROUTE ALIASES FOR MAIN ===
 
 
 run_payroll_waste = calculate_efficiency_loss_and_roi
@@ -0,0 +1,51 @@
+import fcntl
+import mmap
+import os
+import struct
+
+SHARED_STATE_DIR = os.getenv("SHARED_STATE_DIR", "shared_state")
+
+_COUNTER = struct.Struct("<Q")
+
+
+class ChangeSignal:
+    """
+    A generation counter in a small memory-mapped file shared by every worker
+    process on the host. Writers `bump()` it after replacing a file; readers
+    compare `value()` with the generation their cached copy was built from, a
+    plain memory read instead of an os.stat per request.
+    """
+
+    def __init__(self, name: str):
+        self.path = os.path.join(SHARED_STATE_DIR, f"{name}.gen")
+        self._mm = None
+
+    def _map(self):
+        os.makedirs(SHARED_STATE_DIR, exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            if os.fstat(fd).st_size < _COUNTER.size:
+                os.ftruncate(fd, _COUNTER.size)
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            self._mm = mmap.mmap(fd, _COUNTER.size)
+        finally:
+            os.close(fd)
+        return self._mm
+
+    def value(self) -> int:
+        mm = self._mm or self._map()
+        return _COUNTER.unpack_from(mm)[0]
+
+    def bump(self) -> int:
+        """Increment under an flock; callers already serialize, this guards other processes."""
+        mm = self._mm or self._map()
+        with open(self.path, "rb") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                value = _COUNTER.unpack_from(mm)[0] + 1
+                _COUNTER.pack_into(mm, 0, value)
+                mm.flush()
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+        return value
@@ -0,0 +1,78 @@
+import math
+from typing import Any, Dict, Literal, Optional
+
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel
+
+from result_cache import result_cache
+
+router = APIRouter(prefix="/compare", tags=["compare"])
+
+# === Models ===
+
+
+class IndustryComparisonRequest(BaseModel):
+    calculator: Literal[
+        "payroll_waste",
+        "customer_churn",
+        "leadership_drag",
+        "productivity_dive",
+    ]
+    # Same fields as the calculator's /run-* route; `industry` (if given) is flagged in the table
+    inputs: Dict[str, Any]
+    # Output to rank by; defaults to the calculator's headline cost
+    rank_by: Optional[str] = None
+    ascending: bool = False
+
+# === Helpers ===
+
+
+def _clean(v):
+    return round(v, 2) if math.isfinite(v) else None
+
+
+def _compare(req: IndustryComparisonRequest):
+    # Deferred so numpy stays off the cold-start import path
+    import numpy as np
+    import vectorized
+
+    rank_by = req.rank_by or vectorized.CALCULATORS[req.calculator]["rank_by"]
+    try:
+        x = vectorized.columns_from_rows(req.calculator, [req.inputs])
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    industries, out = vectorized.across_industries(req.calculator, x)
+    if rank_by not in out:
+        raise HTTPException(status_code=422, detail=f"Cannot rank by '{rank_by}'; choose from {list(out)}")
+
+    key = out[rank_by]
+    # NaN sorts last either way
+    order = np.argsort(key if req.ascending else -key, kind="stable")
+    cols = {k: v.tolist() for k, v in out.items()}
+    own = str(req.inputs.get("industry", ""))
+
+    results = []
+    for rank, i in enumerate(order.tolist(), start=1):
+        row = {"rank": rank, "industry": industries[i], "is_input_industry": industries[i] == own}
+        row.update((k, _clean(col[i])) for k, col in cols.items())
+        results.append(row)
+
+    return {
+        "calculator": req.calculator,
+        "rank_by": rank_by,
+        "ascending": req.ascending,
+        "count": len(results),
+        "results": results,
+    }
+
+# === Route ===
+
+
+@router.post("/industries")
+def compare_industries(req: IndustryComparisonRequest):
+    """
+    One scenario evaluated against every industry's benchmarks in a single
+    vectorized pass, ranked by `rank_by` (highest first unless `ascending`).
+    """
+    return result_cache.respond("compare_industries", req, lambda: _compare(req))
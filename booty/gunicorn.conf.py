@@ -0,0 +1,43 @@
+"""
+Multi-worker mode: `gunicorn main:app -c gunicorn.conf.py`.
+`uvicorn main:app` still runs a single process for local development.
+
+Each worker keeps its own in-memory benchmark table, visibility settings and
+response caches. Admin writes go through VersionedFile, which bumps a
+memory-mapped change counter in SHARED_STATE_DIR, so every worker rebuilds on
+its next request. Outbox, snapshots and bulk-job status live on disk (SQLite /
+JSON files) and are shared by all workers.
+"""
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '10000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", str(min(4, multiprocessing.cpu_count()))))
+worker_class = "uvicorn.workers.UvicornWorker"
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = 30
+keepalive = 5
+
+# Import the app once in the master so workers share its code and the parsed
+# tables copy-on-write; nothing starts threads or opens sockets at import time.
+preload_app = True
+
+# One Monte Carlo pool per worker: split the cores instead of multiplying them
+os.environ.setdefault("MC_POOL_WORKERS", str(max(1, multiprocessing.cpu_count() // workers)))
+
+# Rate-limit buckets must be shared, or each worker would allow the full quota
+if workers > 1:
+    os.environ.setdefault("RATE_LIMIT_BACKEND", "sqlite")
+
+
+def on_starting(server):
+    from asset_cache import asset_cache
+    from benchmark_store import benchmark_store
+    import bootstrap
+    import report_templates
+
+    # Parsed before fork; each worker's lifespan then finds them current
+    benchmark_store.reload()
+    bootstrap.warm()
+    report_templates.load()
+    asset_cache.warm()
@@ -0,0 +1,73 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from fastapi import Request
+from fastapi.responses import Response
+
+import metrics
+
+# === Cache-Control policies ===
+# Public reads change only when an admin edits benchmarks; let browsers/CDNs keep
+# them briefly and serve stale while they revalidate.
+PUBLIC = "public, max-age=300, stale-while-revalidate=86400"
+# Admin views must always revalidate, but a 304 still saves the body.
+PRIVATE_REVALIDATE = "private, no-cache"
+
+_MAX_BODIES = 512
+_bodies = OrderedDict()  # etag -> encoded body
+_lock = threading.Lock()
+_stats = {"hit": 0, "miss": 0, "not_modified": 0}
+
+
+def make_etag(*parts) -> str:
+    """Strong validator from whatever identifies the representation (e.g. table version + query)."""
+    digest = hashlib.sha1("|".join(str(p) for p in parts).encode()).hexdigest()[:20]
+    return f'"{digest}"'
+
+
+def _not_modified(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = [t.strip() for t in header.split(",")]
+    # Weak comparison is correct for If-None-Match (RFC 9110 13.1.2)
+    return "*" in tags or any(t.removeprefix("W/") == etag for t in tags)
+
+
+def encoded_body(etag: str, build) -> bytes:
+    """JSON from `build()`, encoded once per etag. Call ahead of time to pre-warm."""
+    with _lock:
+        body = _bodies.get(etag)
+        if body is not None:
+            _bodies.move_to_end(etag)
+            _stats["hit"] += 1
+            return body
+        _stats["miss"] += 1
+    body = json.dumps(build(), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    with _lock:
+        _bodies[etag] = body
+        while len(_bodies) > _MAX_BODIES:
+            _bodies.popitem(last=False)
+    return body
+
+
+def cached_json(request: Request, etag: str, build, cache_control: str = PUBLIC) -> Response:
+    """
+    304 if the client already holds `etag`; otherwise the JSON from `build()`,
+    encoded once per etag and reused for every later request.
+    """
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if _not_modified(request, etag):
+        _stats["not_modified"] += 1
+        return Response(status_code=304, headers=headers)
+    return Response(content=encoded_body(etag, build), media_type="application/json", headers=headers)
+
+
+metrics.counter_func(
+    "clarity_http_cache_lookups_total",
+    "Encoded-body cache lookups for ETag'd GETs; not_modified answered with a 304",
+    ("result",),
+    lambda: {(k,): v for k, v in _stats.items()},
+)
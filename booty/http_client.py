@@ -0,0 +1,79 @@
+import asyncio
+import time
+from typing import Optional
+
+import httpx
+
+import metrics
+import profiling
+
+# === 1. PER-SERVICE SETTINGS ===
+# One pooled client is shared by every outbound call; each service gets its own
+# timeout and a cap on in-flight requests so one slow upstream can't take the
+# whole pool.
+
+SERVICES = {
+    "mailgun": {"timeout": httpx.Timeout(20.0, connect=5.0), "max_in_flight": 20},
+    "recaptcha": {"timeout": httpx.Timeout(10.0, connect=3.0), "max_in_flight": 50},
+    "sheets": {"timeout": httpx.Timeout(10.0, connect=5.0), "max_in_flight": 10},
+}
+
+POOL_LIMITS = httpx.Limits(
+    max_connections=100,
+    max_keepalive_connections=20,
+    keepalive_expiry=30.0,
+)
+
+_client: Optional[httpx.AsyncClient] = None
+_semaphores = {}
+
+# === 2. LIFECYCLE ===
+
+
+async def startup(transport: Optional[httpx.AsyncBaseTransport] = None):
+    """Create the shared client. `transport` lets load tests point it at a local stub."""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+    # Apps Script answers POSTs with a redirect; follow it like `requests` did
+    _client = httpx.AsyncClient(limits=POOL_LIMITS, follow_redirects=True, transport=transport)
+    _semaphores.clear()
+
+
+async def shutdown():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def get_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None:
+        # Used outside the app lifespan (scripts, ad-hoc calls)
+        _client = httpx.AsyncClient(limits=POOL_LIMITS, follow_redirects=True)
+    return _client
+
+# === 3. REQUESTS ===
+
+
+def _semaphore(service: str) -> asyncio.Semaphore:
+    sem = _semaphores.get(service)
+    if sem is None:
+        sem = _semaphores[service] = asyncio.Semaphore(SERVICES[service]["max_in_flight"])
+    return sem
+
+
+async def post(service: str, url: str, **kwargs) -> httpx.Response:
+    kwargs.setdefault("timeout", SERVICES[service]["timeout"])
+    async with _semaphore(service):
+        # Timed after the semaphore so queueing for a slot isn't blamed on the upstream
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            with profiling.span(f"http.{service}"):
+                response = await get_client().post(url, **kwargs)
+            outcome = str(response.status_code)
+            return response
+        finally:
+            metrics.outbound_request_duration.observe((service, outcome), time.perf_counter() - start)
@@ -1,21 +1,38 @@
 from uuid import uuid4
+import asyncio
 import os
-import base64
-import hashlib
+import json
 import email.utils
 import datetime as dt
-from typing import Dict, List, Optional, Tuple
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional
 
-import pandas as pd
-import requests
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import HTMLResponse
 from pydantic import BaseModel
 
+import bootstrap
+import bulk_reports
+import http_cache
+import http_client
+import metrics
+import monte_carlo
+import order_upload
+import outbox
+import profiling
+import rate_limit
+import report_templates
+import snapshots
+import unlock_log
 from admin import admin_router
+from asset_cache import asset_cache
+from batch import router as batch_router
+from compare import router as compare_router
+from sensitivity import router as sensitivity_router
+from benchmark_store import benchmark_store
 from calculator import (
-    industry_benchmarks,
+    industry_defaults,
     calculate_customer_churn_loss,
     calculate_efficiency_loss_and_roi,
     calculate_leadership_drag_loss,
@@ -25,10 +42,36 @@ from calculator import (
 from operational_risk import run_operational_risk, RiskInput
 from profit_projection import router as profit_router
 from profit_projection import ProfitRequest, compute_projection
+from report_templates import render_report_html, render_profit_report_html
+from result_cache import result_cache
+from result_cache import router as cache_router
+
+
+# === Lifecycle ===
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Parse benchmarks once per process, before the first request arrives
+    benchmark_store.reload()
+    bootstrap.warm()
+    report_templates.load()
+    asset_cache.warm()
+    await http_client.startup()
+    await outbox.start()
+    await unlock_log.start()
+    snapshots.start()
+    metrics.start()
+    yield
+    metrics.stop()
+    bulk_reports.stop()
+    await outbox.stop()
+    await unlock_log.stop()
+    snapshots.stop()
+    await http_client.shutdown()
+    monte_carlo.shutdown()
 
 
 # === App ===
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # === CORS ===
 app.add_middleware(
@@ -43,6 +86,16 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Opt-in span/cProfile traces; see profiling.py
+app.add_middleware(profiling.ProfilingMiddleware)
+
+# Added last so it is outermost and the histogram covers CORS too
+app.add_middleware(metrics.MetricsMiddleware)
+
+def _utc_now_iso() -> str:
+    return dt.datetime.now(dt.timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
 # Health check
 @app.get("/healthz")
 def healthz():
@@ -50,13 +103,26 @@ def healthz():
 
 app.include_router(admin_router)
 app.include_router(profit_router)
-
-
-# === Simple unlock capture (Sheets log, non-blocking) ===
+app.include_router(outbox.router)
+app.include_router(unlock_log.router)
+app.include_router(batch_router)
+app.include_router(compare_router)
+app.include_router(sensitivity_router)
+app.include_router(monte_carlo.router)
+app.include_router(cache_router)
+app.include_router(bootstrap.router)
+app.include_router(bulk_reports.router)
+app.include_router(snapshots.router)
+app.include_router(metrics.router)
+app.include_router(profiling.router)
+
+
+# === Simple unlock capture (Sheets log, batched in the background) ===
 @app.post("/unlock-user")
 async def unlock_user_email(request: Request):
     """
     Logs unlocks to Google Sheets and always returns 200 so the UI can proceed.
+    The event is spooled and sent in the background (see unlock_log.py).
     """
     try:
         payload = await request.json()
@@ -64,21 +130,16 @@ async def unlock_user_email(request: Request):
         if "@" not in email:
             raise HTTPException(status_code=400, detail="Invalid email")
 
-        gs_url = "https://script.google.com/macros/s/AKfycbwbtb1kDD5fOJrtCVtfcVq2H5vdgrpYhw89zpnJryUEiuset9AUBWSkNRPTU_5So-t-/exec"
-        timestamp = pd.Timestamp.utcnow().isoformat() + "Z"
-
         try:
-            r = requests.post(
-                gs_url,
-                data={"email": email, "timestamp": timestamp, "source": "module-unlock"},
-                timeout=10,
-            )
-            if not r.ok:
-                print(f"⚠️ Sheets logging failed: {r.status_code} {r.text[:160]}")
-        except Exception as e:
-            print(f"⚠️ Sheets logging error: {e}")
-
-        print(f"🔓 Unlock email captured: {email} @ {timestamp}")
+            await rate_limit.check("unlock", "ip", rate_limit.client_ip(request))
+            await rate_limit.check("unlock", "email", email)
+        except HTTPException:
+            # Over the limit: the UI still proceeds, the unlock just isn't logged
+            return {"success": True}
+
+        timestamp = _utc_now_iso()
+        if unlock_log.record(email, timestamp, "module-unlock"):
+            print(f"🔓 Unlock email captured: {email} @ {timestamp}")
         return {"success": True}
     except HTTPException:
         raise
@@ -127,242 +188,62 @@ class ProductivityDeepDiveInput(BaseModel):
 
 
 # === Module Calculator Endpoints ===
+# Responses are memoized on (route, benchmark version, validated input); see result_cache.py
 @app.post("/run-payroll-waste")
 def run_payroll_waste(data: EfficiencyAutoInput):
-    return calculate_efficiency_loss_and_roi(data)
+    return result_cache.respond("payroll_waste", data, lambda: calculate_efficiency_loss_and_roi(data))
 
 @app.post("/run-churn-calculator")
 def run_churn(data: ChurnCalculatorRequest):
-    return calculate_customer_churn_loss(data)
+    return result_cache.respond("customer_churn", data, lambda: calculate_customer_churn_loss(data))
 
 @app.post("/run-leadership-drag-calculator")
 def run_leadership_drag(data: LeadershipDragCalculatorRequest):
-    return calculate_leadership_drag_loss(data)
+    return result_cache.respond("leadership_drag", data, lambda: calculate_leadership_drag_loss(data))
 
 @app.post("/run-workforce-productivity")
 def run_workforce_productivity(data: WorkforceProductivityFullRequest):
-    return calculate_productivity_metrics(data)
+    return result_cache.respond("workforce_productivity", data, lambda: calculate_productivity_metrics(data))
 
 @app.post("/run-productivity-dive")
 def run_productivity_dive(data: ProductivityDeepDiveInput):
-    return calculate_productivity_metrics_dive(data)
+    return result_cache.respond("productivity_dive", data, lambda: calculate_productivity_metrics_dive(data))
 
 @app.get("/get-industry-benchmarks")
-def get_industry_benchmarks(industry: str):
-    b = industry_benchmarks(industry)
-    return {
-        "churn_rate": int(b.get("Customer Churn Rate (%) (Value)", 0)),
-        "inefficiency_rate": int(b.get("Process Inefficiency Rate (%) (Value)", 0)),
-        "leadership_drag": int(b.get("Leadership Drag Impact (%) (Value)", 10)),
-        "target_hours_per_employee": int(b.get("Target Hours per Employee (Value)", 160)),
-        # Expose per-employee source of truth and keep back-compat key
-        "absenteeism_days_per_employee": float(b.get("Absenteeism Days per Month (Value)", 1.0)),
-        "absenteeism_days": float(b.get("Absenteeism Days per Month (Value)", 1.0)),
-        "cac": int(b.get("Customer Acquisition Cost (CAC) (AUD) (Value)", 800))
-    }
+def get_industry_benchmarks(industry: str, request: Request):
+    version = benchmark_store.get().version
+    return http_cache.cached_json(
+        request,
+        http_cache.make_etag("industry-benchmarks", version, industry),
+        lambda: industry_defaults(industry),
+    )
+
 
 @app.get("/get-all-industries")
-def get_all_industries():
-    df = pd.read_csv("benchmarks/final_cleaned_benchmarks_with_certainty.csv")
-    return {"industries": sorted(df["Industry"].dropna().unique().tolist())}
+def get_all_industries(request: Request):
+    table = benchmark_store.get()
+    return http_cache.cached_json(
+        request,
+        http_cache.make_etag("all-industries", table.version),
+        lambda: {"industries": table.industries},
+    )
 
 
 # === ORS Scoring Endpoint ===
 @app.post("/run-operational-risk")
 def run_operational_risk_calculator(data: RiskInput):
     try:
-        return run_operational_risk(data)
+        return result_cache.respond("operational_risk", data, lambda: run_operational_risk(data))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 # === ORS Email Report (existing) ===
-def format_dollars(value):
-    if value is None or value == "N/A":
-        return "$N/A"
-    try:
-        return f"${float(value):,.0f}"
-    except:
-        return "$N/A"
-
-def render_report_html(data):
-    return f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-    <meta charset="UTF-8">
-    <title>ORS Report</title>
-    <!-- Montserrat webfont -->
-    <link rel="preconnect" href="https://fonts.googleapis.com">
-    <link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>
-    <link href="https://fonts.googleapis.com/css2?family=Montserrat:wght@400;500;600;700&display=swap" rel="stylesheet">
-    <style>
-      body {{
-        font-family: "Montserrat", Arial, Helvetica, sans-serif;
-        background-color: #ffffff;
-        color: #333333;
-        max-width: 640px;
-        margin: 0 auto;
-        padding: 30px 20px;
-        line-height: 1.6;
-        -webkit-font-smoothing: antialiased;
-        text-rendering: optimizeLegibility;
-      }}
-      h2 {{
-        text-align: center;
-        color: #111111;
-        font-size: 24px;
-        margin-bottom: 10px;
-        font-weight: 600;
-      }}
-      h3 {{
-        font-size: 20px;
-        border-bottom: 1px solid #ddd;
-        padding-bottom: 6px;
-        margin-top: 30px;
-        color: #000;
-        font-weight: 600;
-      }}
-      h4 {{
-        font-size: 16px;
-        color: #555;
-        margin-top: 24px;
-        margin-bottom: 6px;
-        font-weight: 600;
-      }}
-      ul {{
-        list-style: none;
-        padding-left: 0;
-        margin-top: 0;
-      }}
-      li {{
-        padding: 4px 0;
-        border-bottom: 1px solid #eee;
-      }}
-      li:last-child {{
-        border-bottom: none;
-      }}
-      p, li {{
-        font-size: 14px;
-        font-weight: 400;
-      }}
-      em {{
-        font-style: italic;
-        color: #777;
-      }}
-      .small-note {{
-        font-size: 12px;
-        color: #666;
-        margin-top: 6px;
-      }}
-      .footer-note {{
-        margin-top: 30px;
-        font-size: 13px;
-        color: #777;
-        text-align: center;
-      }}
-      .cta {{
-        text-align: center;
-        background: #f7f7f7;
-        padding: 16px;
-        margin: 20px 0;
-        border: 1px solid #e1e1e1;
-        border-radius: 6px;
-      }}
-      .cta a {{
-        color: #0066cc;
-        text-decoration: none;
-        font-weight: bold;
-      }}
-    </style>
-  </head>
-  <body>
-    <!-- LOGO -->
-    <div style="text-align: center; margin-bottom: 20px;">
-      <img src="https://cdn.prod.website-files.com/6837cb68fba35c01d42b2008/683bf2a9cdebe0a37abc749f_icons%20website-p-500.png"
-           alt="Candoo Culture" width="140" style="max-width: 100%; height: auto;" />
-    </div>
-
-    <!-- SINGLE CTA -->
-    <div class="cta">
-      <p>Ready to take action? <a href="mailto:aaron@candooculture.com" target="_blank" rel="noopener">Book a 15-minute strategy call</a> to unpack your results.</p>
-    </div>
-
-    <!-- TITLE -->
-    <h2>📊 Operational Risk Summary</h2>
-    <p style="text-align: center; color: #666;">Snapshot of your financial risk due to operational inefficiencies.</p>
-    <hr style="margin: 20px 0; border: none; border-top: 1px solid #ddd;" />
-
-    <!-- EBITDA -->
-    <h3>🔥 EBITDA at Risk</h3>
-    <ul>
-      <li><strong>Total Risk Impact:</strong> {format_dollars(data.get("total_risk_dollars"))}</li>
-      <li><strong>Estimated EBITDA Margin:</strong> {data.get("ebitda_margin", "N/A")}%</li>
-      <li><strong>EBITDA at Risk:</strong> {data.get("ebitda_risk_pct", "N/A")}%</li>
-    </ul>
-    <p class="small-note"><em>If EBITDA at Risk &gt; 100%, the at-risk total exceeds current EBITDA.</em></p>
-
-    <!-- MODULE BREAKDOWN -->
-    <h3>📋 Risk Breakdown</h3>
-    <ul>
-      <li><strong>Payroll Waste:</strong> {format_dollars(data.get("module_breakdown", {}).get("Payroll Waste"))}</li>
-      <li><strong>Customer Churn:</strong> {format_dollars(data.get("module_breakdown", {}).get("Customer Churn"))}</li>
-      <li><strong>Leadership Drag:</strong> {format_dollars(data.get("module_breakdown", {}).get("Leadership Drag"))}</li>
-      <li><strong>Workforce Productivity:</strong> {format_dollars(data.get("module_breakdown", {}).get("Workforce Productivity"))}</li>
-      <li><strong>Productivity (Deep Dive):</strong> {format_dollars(data.get("module_breakdown", {}).get("Productivity (Deep Dive)"))}</li>
-    </ul>
-
-    <!-- INPUTS SUMMARY -->
-    <h3>🧠 Inputs Summary</h3>
-    <p><em>This is a direct summary of the inputs used. Some values may reflect industry benchmarks.</em></p>
-
-    <h4>Business Context</h4>
-    <ul>
-      <li><strong>Industry:</strong> {data.get("industry", "N/A")}</li>
-      <li><strong>Total Employees:</strong> {data.get("total_employees", "N/A")}</li>
-      <li><strong>Average Salary:</strong> {format_dollars(data.get("avg_salary"))}</li>
-      <li><strong>Total Revenue:</strong> {format_dollars(data.get("total_revenue"))}</li>
-    </ul>
-
-    <h4>Customer Economics</h4>
-    <ul>
-      <li><strong>Number of Customers:</strong> {data.get("num_customers", "N/A")}</li>
-      <li><strong>Average Revenue per Customer:</strong> {format_dollars(data.get("avg_revenue"))}</li>
-      <li><strong>CAC:</strong> {format_dollars(data.get("cac"))}</li>
-      <li><strong>Churn Rate:</strong> {data.get("churn_rate", "N/A")}%</li>
-      <li><strong>Desired Improvement:</strong> {data.get("desired_improvement", "N/A")}%</li>
-    </ul>
-
-    <h4>Workforce &amp; Operations</h4>
-    <ul>
-      <li><strong>Leadership Drag:</strong> {data.get("leadership_drag", "N/A")}%</li>
-      <li><strong>Productive Hours (org/month):</strong> {data.get("productive_hours", "N/A")}</li>
-      <li><strong>Target Hours per Employee (per month):</strong> {data.get("target_hours_per_employee", "N/A")}</li>
-      <li><strong>Average Hours per Employee (per month):</strong> {data.get("avg_hours", "N/A")}</li>
-      <li><strong>Overtime Hours (org/month):</strong> {data.get("overtime_hours", "N/A")}</li>
-      <li><strong>Absenteeism Days (org/month):</strong> {data.get("absenteeism_days", "N/A")}</li>
-    </ul>
-
-    <h4>Calculated &amp; Efficiency Factors</h4>
-    <ul>
-      <li><strong>Payroll Cost:</strong> {format_dollars(data.get("payroll_cost"))}</li>
-      <li><strong>Improvement Rate:</strong> {data.get("improvement_rate", "N/A")}%</li>
-    </ul>
-
-    <p class="footer-note">
-      All amounts in AUD. Time-based metrics are monthly unless stated.<br>
-      Generated by the Candoo Culture ORS Engine<br>
-      <a href="https://www.candooculture.com" style="color: #0066cc; text-decoration: none;">www.candooculture.com</a>
-    </p>
-  </body>
-</html>
-    """
-
-
-@app.post("/send-risk-report")
+@app.post("/send-risk-report", dependencies=[rate_limit.guard("risk_report", email=lambda body: body.get("recipient"))])
 async def send_risk_report(request: Request):
     try:
-        data = await request.json()
+        with profiling.span("parse_body"):
+            data = await request.json()
 
         # === CAPTCHA VALIDATION ===
         captcha_token = data.get("captcha_token")
@@ -372,7 +253,8 @@ async def send_risk_report(request: Request):
         if not secret:
             raise HTTPException(status_code=500, detail="Missing CAPTCHA secret key")
 
-        verify_response = requests.post(
+        verify_response = await http_client.post(
+            "recaptcha",
             "https://www.google.com/recaptcha/api/siteverify",
             data={"secret": secret, "response": captcha_token}
         )
@@ -381,7 +263,10 @@ async def send_risk_report(request: Request):
 
         # === ORS calculation ===
         try:
-            ors_result = run_operational_risk(RiskInput(**data))
+            with profiling.span("validate"):
+                inputs = RiskInput(**data)
+            with profiling.span("compute"):
+                ors_result = run_operational_risk(inputs)
             data.update(ors_result)  # adds total_risk_dollars, module_breakdown, etc.
         except Exception as calc_error:
             print("ORS calculation failed:", calc_error)
@@ -407,7 +292,7 @@ async def send_risk_report(request: Request):
         snapshot = {
             "report_id": str(uuid4()),
             "email": data.get("recipient"),
-            "snapshot_at": pd.Timestamp.utcnow().isoformat() + "Z",
+            "snapshot_at": _utc_now_iso(),
             "version": "ors-snapshot-1",
             "currency": "AUD",
             "inputs": {
@@ -449,21 +334,25 @@ async def send_risk_report(request: Request):
         if not all([mg_api_key, mg_domain, mg_sender]):
             raise Exception("Missing Mailgun environment variables.")
 
-        response = requests.post(
-            f"https://api.mailgun.net/v3/{mg_domain}/messages",
-            auth=("api", mg_api_key),
-            data={
+        # Queued for the outbox workers; the snapshot UUID doubles as the idempotency key.
+        # The insert is a blocking SQLite write, so it runs off the event loop.
+        await asyncio.to_thread(
+            outbox.enqueue,
+            f"ors-report:{snapshot['report_id']}",
+            "ors_report",
+            {
                 "from": f"Candoo Culture Reports <{mg_sender}>",
                 "to": [data["recipient"]],
                 "bcc": ["aaron@candooculture.com"],
                 "subject": data["subject"],
                 "html": render_report_html(data)
-            }
+            },
         )
-        if response.status_code != 200:
-            raise Exception(f"Mailgun Error: {response.text}")
 
-        return {"success": True, "message": "Report sent.", "snapshot": snapshot}
+        # Kept for re-sends, comparisons and trends; the write itself happens off the request path
+        snapshots.record(snapshot, data)
+
+        return {"success": True, "message": "Report queued.", "snapshot": snapshot}
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -506,8 +395,7 @@ MAILGUN_API_KEY  = os.getenv("MAILGUN_API_KEY")
 MAILGUN_DOMAIN   = os.getenv("MAILGUN_DOMAIN")            # e.g. mg.candooculture.com
 MAILGUN_SENDER   = os.getenv("MAILGUN_SENDER")            # e.g. orders@candooculture.com
 MAILGUN_API_BASE = os.getenv("MAILGUN_API_BASE", "https://api.mailgun.net")  # set to https://api.eu.mailgun.net if EU
-ORDER_NOTIFY     = os.getenv("ORDER_NOTIFY")
-ASSETS_DIR       = os.getenv("ASSETS_DIR", os.path.join(os.path.dirname(__file__), "assets"))              # optional internal recipient (e.g. aaron@...)
+ORDER_NOTIFY     = os.getenv("ORDER_NOTIFY")          # optional internal recipient (e.g. aaron@...)
 
 class OrderPayload(BaseModel):
     form: Dict
@@ -522,31 +410,32 @@ def _esc(s: str) -> str:
                  .replace(">","&gt;").replace('"',"&quot;").replace("'","&#39;"))
 
 
-def schedule_onboarding_pack_email(f: Dict):
+def schedule_onboarding_pack_email(f: Dict, order_key: str):
     """
-    Email 2 (Onboarding Pack) — send immediately with attachments from assets.
+    Email 2 (Onboarding Pack) — queue immediately with attachments from assets.
     """
-    attachments: List[Tuple[str, Tuple[str, bytes, str]]] = []
-
-    def add_if_exists(fname: str, mime: str):
-        p = os.path.join(ASSETS_DIR, fname)
-        if os.path.isfile(p):
-            with open(p, "rb") as fh:
-                attachments.append(("attachment", (fname, fh.read(), mime)))
-        else:
-            print(f"⚠️ Missing onboarding attachment: {p}")
+    attachments: List[Dict] = []
+
+    def add_first(*options, required=False):
+        # Bytes come from the in-memory asset cache at send time; the row only names the asset
+        for fname, mime in options:
+            asset = asset_cache.get(fname)
+            if asset is not None:
+                attachments.append({"filename": fname, "mime": mime, "asset": fname, "sha256": asset.sha256})
+                return
+        if required:
+            print(f"⚠️ Missing onboarding attachment: {os.path.join(asset_cache.directory, options[0][0])}")
 
     # Attachments present in assets folder
-    add_if_exists("Onboarding Guide.pdf", "application/pdf")
-    if os.path.isfile(os.path.join(ASSETS_DIR, "Employee Information Sheet.pdf")):
-        add_if_exists("Employee Information Sheet.pdf", "application/pdf")
-    elif os.path.isfile(os.path.join(ASSETS_DIR, "Partnering with Candoo.pdf")):
-        add_if_exists("Partnering with Candoo.pdf", "application/pdf")
-
-    if os.path.isfile(os.path.join(ASSETS_DIR, "invite.csv")):
-        add_if_exists("invite.csv", "text/csv")
-    elif os.path.isfile(os.path.join(ASSETS_DIR, "invite.xlsx")):
-        add_if_exists("invite.xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+    add_first(("Onboarding Guide.pdf", "application/pdf"), required=True)
+    add_first(
+        ("Employee Information Sheet.pdf", "application/pdf"),
+        ("Partnering with Candoo.pdf", "application/pdf"),
+    )
+    add_first(
+        ("invite.csv", "text/csv"),
+        ("invite.xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    )
 
     subject = f"Next Steps: Onboarding Your Team – {f.get('company','')}".strip()
     html_body = f"""
@@ -577,35 +466,66 @@ def schedule_onboarding_pack_email(f: Dict):
     if ORDER_NOTIFY:
         data["bcc"] = [ORDER_NOTIFY]
 
-    r2 = requests.post(
-        f"{MAILGUN_API_BASE}/v3/{MAILGUN_DOMAIN}/messages",
-        auth=("api", MAILGUN_API_KEY),
-        data=data,
-        files=attachments if attachments else None,
-        timeout=20,
-    )
-    if r2.status_code >= 300:
-        raise HTTPException(status_code=502, detail=f"Mailgun (Email 2) error: {r2.text}")
-    else:
-        print(f"✅ Email 2 sent to {f.get('email')}")
+    outbox.enqueue(f"onboarding:{order_key}", "onboarding_pack", data, attachments)
 
-@app.post("/api/order-sign")
-async def order_sign(payload: OrderPayload):
-    # Env guard
+def _check_order_env():
     if not (MAILGUN_API_KEY and MAILGUN_DOMAIN and MAILGUN_SENDER):
         raise HTTPException(status_code=500, detail="Mailgun not configured")
 
-    # Basic field checks
-    f = payload.form or {}
+
+def _check_order_form(f: Dict):
     required = ["company","abn","name","title","email","phone","initial_users","start_date"]
     for k in required:
         if not str(f.get(k, "")).strip():
             raise HTTPException(status_code=422, detail=f"Missing field: {k}")
 
+
+@app.post("/api/order-sign", dependencies=[rate_limit.guard("order")])
+async def order_sign(payload: OrderPayload):
+    # Env guard
+    _check_order_env()
+
+    # Basic field checks
+    f = payload.form or {}
+    _check_order_form(f)
+    await rate_limit.check("order", "email", f.get("email"))
+
+    with order_upload.PdfSpool() as spool:
+        return await asyncio.to_thread(_decode_and_queue_order, f, spool, payload)
+
+
+@app.post("/api/order-sign/upload", dependencies=[rate_limit.guard("order")])
+async def order_sign_upload(request: Request):
+    """
+    Streaming variant of /api/order-sign for large PDFs: multipart/form-data
+    with a `pdf` file part and text parts `form` (the JSON object),
+    `pdf_sha256_b64` and optionally `user_agent`, `tz`, `signature_png`.
+    """
+    _check_order_env()
+    with order_upload.PdfSpool() as spool:
+        fields = await order_upload.read_multipart(request, spool)
+        try:
+            f = json.loads(fields.get("form") or "{}")
+        except ValueError:
+            raise HTTPException(status_code=422, detail="`form` must be a JSON object")
+        if not isinstance(f, dict):
+            raise HTTPException(status_code=422, detail="`form` must be a JSON object")
+        _check_order_form(f)
+        await rate_limit.check("order", "email", f.get("email"))
+        return await asyncio.to_thread(_queue_order, f, spool, fields.get("pdf_sha256_b64", ""), fields.get("user_agent"))
+
+
+def _decode_and_queue_order(f: Dict, spool: order_upload.PdfSpool, payload: OrderPayload):
+    # Up to ORDER_PDF_MAX_BYTES of base64 decoding, hashing and spool writes; kept off the event loop
+    order_upload.decode_base64(payload.pdf_base64, spool)
+    return _queue_order(f, spool, payload.pdf_sha256_b64, payload.user_agent)
+
+
+def _queue_order(f: Dict, spool: order_upload.PdfSpool, pdf_sha256_b64: str, user_agent: Optional[str]):
+    # Runs in a worker thread: it writes the PDF to the spool and inserts two outbox rows
     # Verify PDF integrity
-    pdf_bytes = base64.b64decode(payload.pdf_base64)
-    sha_b64 = base64.b64encode(hashlib.sha256(pdf_bytes).digest()).decode()
-    if sha_b64 != payload.pdf_sha256_b64:
+    sha_b64 = spool.sha256_b64()
+    if sha_b64 != pdf_sha256_b64.strip():
         raise HTTPException(status_code=400, detail="PDF hash mismatch")
 
     # Email body
@@ -640,7 +560,7 @@ async def order_sign(payload: OrderPayload):
   </p>
 
   <p style="margin-top:16px;font-size:12px;color:#445a68">
-    UA: {_esc(payload.user_agent or '')}
+    UA: {_esc(user_agent or '')}
   </p>
 </div>
     """
@@ -659,141 +579,33 @@ async def order_sign(payload: OrderPayload):
     else:
         data["bcc"] = [MAILGUN_SENDER]
 
-    files = [
-        ("attachment", ("Candoo-Order.pdf", pdf_bytes, "application/pdf")),
+    # The signed PDF's hash identifies the order, so a re-submitted form isn't mailed twice
+    order_key = f"order:{sha_b64}"
+    pdf_path = outbox.spool_path(order_key, "Candoo-Order.pdf")
+    spool.save(pdf_path)
+    attachments = [
+        {"filename": "Candoo-Order.pdf", "mime": "application/pdf", "path": pdf_path, "owned": True},
     ]
+    try:
+        created = outbox.enqueue(order_key, "order", data, attachments)
+    except BaseException:
+        os.remove(pdf_path)  # no row points at it, so nothing else would delete it
+        raise
+    if not created:
+        os.remove(pdf_path)  # duplicate submission; the first copy is already queued
 
-    r = requests.post(
-        f"{MAILGUN_API_BASE}/v3/{MAILGUN_DOMAIN}/messages",
-        auth=("api", MAILGUN_API_KEY),
-        data=data,
-        files=files,
-        timeout=20,
-    )
-
-    if r.status_code >= 300:
-        raise HTTPException(status_code=502, detail=f"Mailgun error: {r.text}")
-
-    # Send onboarding pack immediately (Email #2)
+    # Queue onboarding pack immediately (Email #2)
     try:
-        schedule_onboarding_pack_email(f)
+        schedule_onboarding_pack_email(f, order_key)
         print(f"✅ Email 2 queued for {f.get('email')}")
     except Exception as e:
         print(f"⚠️ Email 2 failed: {e}")
 
-    msg_id = r.json().get("id") if "application/json" in r.headers.get("content-type","") else None
-    return {"ok": True, "id": msg_id}
+    return {"ok": True, "id": order_key, "queued": True}
 
 
 # === Profit Report (email) ===
-def _fmt(n):
-    try:
-        return format_dollars(n)
-    except Exception:
-        return "$N/A"
-
-def render_profit_report_html(recipient: str, payload: dict, result: dict) -> str:
-    period   = (payload or {}).get("period") or "This Period"
-    inputs   = (payload or {}).get("inputs")   or {}
-    savings  = (payload or {}).get("savings")  or {}
-    scenarios= (payload or {}).get("scenarios")or {}
-    results  = (result  or {}).get("results")  or {}
-    computed = (result  or {}).get("computed") or {}
-
-    # Pull flags outside the f-string (avoids any odd brace parsing)
-    apply_fixes = bool(scenarios.get("applyFixes"))
-    apply_ors   = bool(scenarios.get("applyORS"))
-
-    # Unpack numbers defensively
-    gp_now = (results.get("now") or {}).get("gross")
-    np_now = (results.get("now") or {}).get("net")
-    np_fix = (results.get("fixes") or {}).get("net")
-    d_fix  = (results.get("fixes") or {}).get("delta_vs_now")
-    np_ors = (results.get("ors") or {}).get("net")
-    d_ors  = (results.get("ors") or {}).get("delta_vs_now")
-
-    total_savings = computed.get("totalSavings", 0.0)
-    ors_risk      = computed.get("orsEbitdaAtRisk", 0.0)
-
-    # Build HTML (escape CSS braces with doubled {{ }})
-    return f"""<!DOCTYPE html>
-<html>
-<head>
-  <meta charset="UTF-8">
-  <title>Profit Potential – {period}</title>
-  <link rel="preconnect" href="https://fonts.googleapis.com">
-  <link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>
-  <link href="https://fonts.googleapis.com/css2?family=Montserrat:wght@400;600;700&display=swap" rel="stylesheet">
-  <style>
-    body {{ font-family: "Montserrat", Arial, sans-serif; color:#0b1a21; max-width:720px; margin:0 auto; padding:28px; line-height:1.55; }}
-    h2 {{ margin:0 0 8px; }}
-    h3 {{ margin:22px 0 8px; border-bottom:1px solid #e5ecef; padding-bottom:6px; }}
-    table {{ width:100%; border-collapse:collapse; }}
-    th, td {{ padding:8px 6px; border-bottom:1px solid #edf2f5; text-align:right; }}
-    th:first-child, td:first-child {{ text-align:left; }}
-    .muted {{ color:#5a6b75; font-size:13px; }}
-    .pos {{ color:#0aa; font-weight:600; }}
-    .neg {{ color:#c33; font-weight:600; }}
-    .pill {{ display:inline-block; padding:2px 8px; border-radius:999px; background:#f2f7f9; font-size:12px; color:#335; }}
-  </style>
-</head>
-<body>
-  <h2>Profit Potential – {period}</h2>
-  <p class="muted">Critical when selling the business — EBITDA strength and operational risk directly shape both the valuation multiple and perceived risk.</p>
-
-  <h3>Current Financials</h3>
-  <table>
-    <tbody>
-      <tr><td>Revenue</td><td>{_fmt(inputs.get("revenue"))}</td></tr>
-      <tr><td>COGS</td><td>{_fmt(inputs.get("cogs"))}</td></tr>
-      <tr><td>Operating Expenses</td><td>{_fmt(inputs.get("opex"))}</td></tr>
-      <tr><td><strong>Gross Profit (Now)</strong></td><td><strong>{_fmt(gp_now)}</strong></td></tr>
-      <tr><td><strong>Net Profit (Now)</strong></td><td><strong>{_fmt(np_now)}</strong></td></tr>
-    </tbody>
-  </table>
-
-  <h3>Fixable Savings (from Toolbox)</h3>
-  <table>
-    <thead><tr><th>Driver</th><th>Amount</th></tr></thead>
-    <tbody>
-      <tr><td>Payroll Waste</td><td>{_fmt(savings.get("payroll"))}</td></tr>
-      <tr><td>Customer Churn</td><td>{_fmt(savings.get("churn"))}</td></tr>
-      <tr><td>Leadership Drag</td><td>{_fmt(savings.get("leadership"))}</td></tr>
-      <tr><td>Workforce Productivity</td><td>{_fmt(savings.get("workforce"))}</td></tr>
-      <tr><td>Productivity Deep Dive</td><td>{_fmt(savings.get("deepDive"))}</td></tr>
-      <tr><td><strong>Total Fixable Savings</strong></td><td><strong>{_fmt(total_savings)}</strong></td></tr>
-    </tbody>
-  </table>
-
-  <h3>Operational Risk (ORS)</h3>
-  <p class="muted">EBITDA at risk if operational issues persist.</p>
-  <table>
-    <tbody>
-      <tr><td><strong>ORS – EBITDA at Risk</strong></td><td><strong>{_fmt(ors_risk)}</strong></td></tr>
-    </tbody>
-  </table>
-
-  <h3>Scenario Comparison</h3>
-  <table>
-    <thead><tr><th>Scenario</th><th>Net Profit</th><th>Δ vs Now</th></tr></thead>
-    <tbody>
-      <tr><td>Now</td><td>{_fmt(np_now)}</td><td class="muted">–</td></tr>
-      <tr><td>Fix Inefficiencies <span class="pill">applyFixes={str(apply_fixes).lower()}</span></td>
-          <td>{_fmt(np_fix)}</td>
-          <td>{('<span class="pos">+' if (d_fix or 0) >= 0 else '<span class="neg">') + _fmt(d_fix) + '</span>'}</td></tr>
-      <tr><td>Eliminate ORS Risk <span class="pill">applyORS={str(apply_ors).lower()}</span></td>
-          <td>{_fmt(np_ors)}</td>
-          <td>{('<span class="pos">+' if (d_ors or 0) >= 0 else '<span class="neg">') + _fmt(d_ors) + '</span>'}</td></tr>
-    </tbody>
-  </table>
-
-  <p class="muted" style="margin-top:18px">All amounts in AUD. Sent to {recipient}.</p>
-  <p class="muted">Generated by the Candoo Culture Profit Engine • https://www.candooculture.com</p>
-</body>
-</html>"""
-
-
-@app.post("/send-profit-report")
+@app.post("/send-profit-report", dependencies=[rate_limit.guard("profit_report", email=lambda body: body.get("email"))])
 async def send_profit_report(request: Request):
     try:
         body = await request.json()
@@ -805,11 +617,13 @@ async def send_profit_report(request: Request):
 
         # Validate & compute using your existing schema/logic
         try:
-            profit_req = ProfitRequest(**payload)
+            with profiling.span("validate"):
+                profit_req = ProfitRequest(**payload)
         except Exception as e:
             raise HTTPException(status_code=422, detail=f"Bad payload: {e}")
 
-        result = compute_projection(profit_req).model_dump()
+        with profiling.span("compute"):
+            result = compute_projection(profit_req).model_dump()
         subject = f"Profit Potential – {payload.get('period') or 'Report'}"
         html = render_profit_report_html(recipient, payload, result)
 
@@ -819,20 +633,18 @@ async def send_profit_report(request: Request):
         if not all([mg_api_key, mg_domain, mg_sender]):
             raise HTTPException(status_code=500, detail="Missing Mailgun environment variables")
 
-        r = requests.post(
-            f"https://api.mailgun.net/v3/{mg_domain}/messages",
-            auth=("api", mg_api_key),
-            data={
+        await asyncio.to_thread(
+            outbox.enqueue,
+            f"profit-report:{uuid4()}",
+            "profit_report",
+            {
                 "from": f"Candoo Culture Reports <{mg_sender}>",
                 "to": [recipient],
                 "bcc": ["aaron@candooculture.com"],
                 "subject": subject,
                 "html": html
             },
-            timeout=20
         )
-        if r.status_code >= 300:
-            raise HTTPException(status_code=502, detail=f"Mailgun error: {r.text}")
 
         return {"success": True}
     except HTTPException:
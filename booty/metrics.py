@@ -0,0 +1,254 @@
+import bisect
+import hmac
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import Response
+
+from change_signal import SHARED_STATE_DIR
+from versioned_files import atomic_write
+
+router = APIRouter(tags=["metrics"])
+
+# === 1. SETTINGS ===
+# Prometheus text exposition without the client library. Recording is a dict
+# lookup, a bisect and two adds; it happens on the event loop thread (ASGI
+# middleware, async outbound calls), so no lock is needed. Under gunicorn each
+# worker dumps its series to METRICS_DIR every METRICS_FLUSH_INTERVAL seconds
+# and /metrics sums the files of every live worker.
+
+METRICS_DIR = os.getenv("METRICS_DIR", os.path.join(SHARED_STATE_DIR, "metrics"))
+FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "10"))
+# Optional bearer token for the scrape endpoint
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_histograms: Dict[str, "Histogram"] = {}
+_counter_funcs: Dict[str, Tuple[str, Tuple[str, ...], Callable[[], Dict[tuple, float]]]] = {}
+_gauge_funcs: Dict[str, Tuple[str, Tuple[str, ...], Callable[[], Dict[tuple, float]]]] = {}
+_stop = threading.Event()
+_thread: Optional[threading.Thread] = None
+
+# === 2. METRIC TYPES ===
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...], buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        # label values -> [count per bucket (+Inf last), sum]
+        self.series: Dict[tuple, list] = {}
+        _histograms[name] = self
+
+    def observe(self, label_values: tuple, value: float):
+        series = self.series.get(label_values)
+        if series is None:
+            series = self.series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+
+def counter_func(name: str, help_text: str, labels: Tuple[str, ...], read: Callable[[], Dict[tuple, float]]):
+    """A per-process counter read at flush time, e.g. a cache's hit count. Summed across workers."""
+    _counter_funcs[name] = (help_text, labels, read)
+
+
+def gauge_func(name: str, help_text: str, labels: Tuple[str, ...], read: Callable[[], Dict[tuple, float]]):
+    """A value read once per scrape from shared state (e.g. SQLite); never summed across workers."""
+    _gauge_funcs[name] = (help_text, labels, read)
+
+
+http_request_duration = Histogram(
+    "clarity_http_request_duration_seconds",
+    "Time to the end of the response body, by route template",
+    ("method", "route", "status"),
+)
+outbound_request_duration = Histogram(
+    "clarity_outbound_request_duration_seconds",
+    "Outbound HTTP calls by service; outcome is the status code or 'error'",
+    ("service", "outcome"),
+)
+
+# === 3. REQUEST TIMING ===
+
+
+class MetricsMiddleware:
+    """Pure ASGI so it adds no per-request task or body copy; labels use the matched route template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        start = time.perf_counter()
+        status = "500"
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            # Unmatched paths share one label so scanners can't blow up cardinality
+            path = getattr(route, "path", None) or "unmatched"
+            http_request_duration.observe((scope["method"], path, status), time.perf_counter() - start)
+
+# === 4. CROSS-WORKER AGGREGATION ===
+
+
+def _local_state():
+    return {
+        "histograms": {
+            h.name: [[list(k), v[0], v[1]] for k, v in list(h.series.items())] for h in _histograms.values()
+        },
+        "counters": {
+            name: [[list(k), v] for k, v in read().items()] for name, (_, _, read) in _counter_funcs.items()
+        },
+    }
+
+
+def _path(pid: int) -> str:
+    return os.path.join(METRICS_DIR, f"{pid}.json")
+
+
+def flush():
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    atomic_write(_path(os.getpid()), json.dumps(_local_state()).encode())
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _collect():
+    """Merged state of this process (live) and every other live worker (as of its last flush)."""
+    states = [_local_state()]
+    own = os.getpid()
+    for name in os.listdir(METRICS_DIR) if os.path.isdir(METRICS_DIR) else ():
+        if not name.endswith(".json"):
+            continue
+        try:
+            pid = int(name[:-5])
+        except ValueError:
+            continue
+        if pid == own:
+            continue
+        if not _alive(pid):
+            try:
+                os.remove(_path(pid))
+            except OSError:
+                pass
+            continue
+        try:
+            with open(_path(pid), "rb") as f:
+                states.append(json.loads(f.read()))
+        except (OSError, ValueError):
+            continue
+
+    histograms: Dict[str, Dict[tuple, list]] = {}
+    counters: Dict[str, Dict[tuple, float]] = {}
+    for state in states:
+        for name, series in state["histograms"].items():
+            merged = histograms.setdefault(name, {})
+            for labels, buckets, total in series:
+                current = merged.setdefault(tuple(labels), [[0] * len(buckets), 0.0])
+                current[0] = [a + b for a, b in zip(current[0], buckets)]
+                current[1] += total
+        for name, series in state["counters"].items():
+            merged = counters.setdefault(name, {})
+            for labels, value in series:
+                merged[tuple(labels)] = merged.get(tuple(labels), 0) + value
+    return histograms, counters
+
+
+def _writer_loop():
+    while not _stop.wait(FLUSH_INTERVAL):
+        try:
+            flush()
+        except Exception as e:
+            print(f"⚠️ Metrics flush failed: {e}")
+
+
+def start():
+    global _thread
+    _stop.clear()
+    _thread = threading.Thread(target=_writer_loop, name="metrics-flush", daemon=True)
+    _thread.start()
+
+
+def stop():
+    _stop.set()
+    if _thread is not None:
+        _thread.join(timeout=2)
+    try:
+        os.remove(_path(os.getpid()))
+    except OSError:
+        pass
+
+# === 5. EXPOSITION ===
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def render() -> str:
+    histograms, counters = _collect()
+    lines: List[str] = []
+    for name, hist in _histograms.items():
+        lines += [f"# HELP {name} {hist.help}", f"# TYPE {name} histogram"]
+        bounds = [repr(b) for b in hist.buckets] + ["+Inf"]
+        for labels, (buckets, total) in sorted(histograms.get(name, {}).items()):
+            cumulative = 0
+            for bound, count in zip(bounds, buckets):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f"{name}_bucket{_labels(hist.labels, labels, le)} {cumulative}")
+            lines.append(f"{name}_sum{_labels(hist.labels, labels)} {total}")
+            lines.append(f"{name}_count{_labels(hist.labels, labels)} {cumulative}")
+    for name, (help_text, label_names, _) in _counter_funcs.items():
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+        for labels, value in sorted(counters.get(name, {}).items()):
+            lines.append(f"{name}{_labels(label_names, labels)} {value}")
+    for name, (help_text, label_names, read) in _gauge_funcs.items():
+        try:
+            values = read()
+        except Exception as e:
+            print(f"⚠️ Metrics gauge {name} failed: {e}")
+            continue
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+        for labels, value in sorted(values.items()):
+            lines.append(f"{name}{_labels(label_names, labels)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+@router.get("/metrics", include_in_schema=False)
+def metrics(authorization: str = Header(default="")):
+    if METRICS_TOKEN and not hmac.compare_digest(authorization.encode(), f"Bearer {METRICS_TOKEN}".encode()):
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    return Response(render(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,117 @@
+import multiprocessing
+import os
+import secrets
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Literal, Optional
+
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel, Field
+
+from benchmark_store import benchmark_store
+from operational_risk import RiskInput
+
+router = APIRouter(prefix="/monte-carlo", tags=["monte-carlo"])
+
+# Each draw keeps a few float64 output arrays alive, so memory grows with this cap
+MAX_DRAWS = int(os.getenv("MC_MAX_DRAWS", "1000000"))
+# Below this many draws a single process is faster than shipping work to the pool
+PARALLEL_MIN_DRAWS = int(os.getenv("MC_PARALLEL_MIN_DRAWS", "250000"))
+POOL_WORKERS = int(os.getenv("MC_POOL_WORKERS", str(os.cpu_count() or 2)))
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+# === Models ===
+
+
+class MonteCarloRequest(BaseModel):
+    calculator: Literal[
+        "payroll_waste",
+        "customer_churn",
+        "leadership_drag",
+        "workforce_productivity",
+        "productivity_dive",
+        "operational_risk",
+    ]
+    inputs: Dict[str, Any]
+    draws: int = Field(default=100000, ge=100)
+    seed: Optional[int] = Field(None, ge=0)
+    parallel: bool = False
+
+# === Process pool ===
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # forkserver: forking the threaded server process could copy a held lock into the child
+        _pool = ProcessPoolExecutor(max_workers=POOL_WORKERS, mp_context=multiprocessing.get_context("forkserver"))
+    return _pool
+
+
+def shutdown():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
+
+
+def _simulate_chunk(calculator, row, inputs, draws, seed):
+    import simulation
+
+    # float32 halves what has to be pickled back to the parent
+    return {k: v.astype("float32") for k, v in simulation.simulate(calculator, row, inputs, draws, seed).items()}
+
+# === Route ===
+
+
+@router.post("/run")
+def run_monte_carlo(req: MonteCarloRequest):
+    """
+    P10/P50/P90 bands for a calculator or the ORS, sampling benchmark values
+    according to their Certainty columns.
+    """
+    # Deferred so numpy stays off the cold-start import path
+    import numpy as np
+    import simulation
+    import vectorized
+
+    if req.draws > MAX_DRAWS:
+        raise HTTPException(status_code=413, detail=f"Too many draws: {req.draws} (max {MAX_DRAWS}).")
+
+    industry = str(req.inputs.get("industry", ""))
+    row = benchmark_store.get().get(industry)
+    if row is None:
+        raise HTTPException(status_code=404, detail=f"Industry '{industry}' not found in benchmarks.")
+
+    try:
+        if req.calculator == "operational_risk":
+            inputs = {k: float(v) for k, v in RiskInput(**req.inputs).model_dump().items() if k != "industry"}
+        else:
+            cols = vectorized.columns_from_rows(req.calculator, [req.inputs])
+            inputs = {k: float(v[0]) for k, v in cols.items()}
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    seed = req.seed if req.seed is not None else secrets.randbits(63)
+    parallel = req.parallel and req.draws >= PARALLEL_MIN_DRAWS and POOL_WORKERS > 1
+
+    if parallel:
+        children = np.random.SeedSequence(seed).spawn(POOL_WORKERS)
+        sizes = [len(part) for part in np.array_split(np.arange(req.draws), POOL_WORKERS)]
+        futures = [
+            _get_pool().submit(_simulate_chunk, req.calculator, row, inputs, size, child)
+            for size, child in zip(sizes, children)
+        ]
+        parts = [f.result() for f in futures]
+        samples = {k: np.concatenate([p[k] for p in parts]) for k in parts[0]}
+    else:
+        samples = simulation.simulate(req.calculator, row, inputs, req.draws, seed)
+
+    return {
+        "calculator": req.calculator,
+        "industry": industry,
+        "draws": req.draws,
+        "seed": seed,
+        "parallel": parallel,
+        "bands": {k: simulation.bands(v) for k, v in samples.items()},
+    }
@@ -1,6 +1,10 @@
+from operator import itemgetter
+
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 
+from structured_log import log_event, sample_rate
+
 router = APIRouter()
 
 class RiskInput(BaseModel):
@@ -34,62 +38,99 @@ class RiskInput(BaseModel):
     industry: str = ""
     ebitda_margin: float = 20.0  # Default if not provided
 
+# === ORS module registry ===
+# Each module names the inputs that must be positive for it to apply and a loss
+# function of (inputs, payroll_cost). The engine drops inactive modules before
+# evaluating anything, and the breakdown keeps registration order.
+
+ORS_MODULES = {}
+ORS_LOG_RATE = sample_rate("ORS_LOG_SAMPLE_RATE", 0.01)
+
+
+def _positive_check(requires):
+    """Compile a module's activation rule once, instead of looping fields per call."""
+    if len(requires) == 1:
+        field = requires[0]
+        return lambda v: v[field] > 0
+    get = itemgetter(*requires)
+    return lambda v: min(get(v)) > 0
+
+
+def ors_module(name, requires):
+    def register(loss):
+        ORS_MODULES[name] = (tuple(requires), _positive_check(requires), loss)
+        return loss
+    return register
+
+
+@ors_module("Payroll Waste", requires=("improvement_rate",))
+def _payroll_waste(v, payroll_cost):
+    return payroll_cost * (v["improvement_rate"] / 100)
+
+
+@ors_module("Customer Churn", requires=("churn_rate", "avg_revenue", "num_customers"))
+def _customer_churn(v, payroll_cost):
+    return v["churn_rate"] / 100 * v["avg_revenue"] * v["num_customers"]
+
+
+@ors_module("Leadership Drag", requires=("leadership_drag",))
+def _leadership_drag(v, payroll_cost):
+    return payroll_cost * (v["leadership_drag"] / 100)
+
+
+@ors_module("Workforce Productivity", requires=("productive_hours", "target_hours_per_employee", "total_employees"))
+def _workforce_productivity(v, payroll_cost):
+    expected_total_hours = v["target_hours_per_employee"] * v["total_employees"]
+    productivity_gap_pct = 1 - (v["productive_hours"] / expected_total_hours)
+    return max(productivity_gap_pct * payroll_cost, 0)
+
+
+@ors_module("Productivity (Deep Dive)", requires=("avg_hours", "absenteeism_days"))
+def _productivity_dive(v, payroll_cost):
+    # Module-aligned method:
+    # avg_daily_salary = (avg_salary / 12) / work_days_per_month
+    # where work_days ≈ avg_hours / 7.6 (default ~152h ÷ 7.6 = 20 days)
+    work_days = v["avg_hours"] / 7.6
+    avg_daily_salary = (v["avg_salary"] / 12) / work_days
+    return v["absenteeism_days"] * avg_daily_salary
+
+
+def active_modules(inputs):
+    return [(name, loss) for name, (_, is_active, loss) in ORS_MODULES.items() if is_active(inputs)]
+
+
 @router.post("/run-operational-risk")
 def run_operational_risk(data: RiskInput):
     try:
-        inputs = data.dict()
-        print("🔍 ORS Received Payload:", inputs)
+        # Read-only view of the validated fields; model_dump() would copy them every call
+        inputs = data.__dict__
 
         # === Resolve Payroll Cost ===
-        payroll_cost = inputs.get("payroll_cost", 0)
-        if payroll_cost <= 0:
-            # Estimate it if missing
+        payroll_cost = inputs["payroll_cost"]
+        payroll_estimated = payroll_cost <= 0
+        if payroll_estimated:
             payroll_cost = inputs["avg_salary"] * inputs["total_employees"]
-            print(f"⚠️ Estimated payroll_cost as {payroll_cost} from avg_salary and total_employees")
 
         # === Baseline EBITDA Calculation ===
         ebitda_value = inputs["total_revenue"] * (inputs["ebitda_margin"] / 100)
-        module_losses = {}
-
-        # === Payroll Waste ===
-        if inputs["improvement_rate"] > 0:
-            module_losses["Payroll Waste"] = round(payroll_cost * (inputs["improvement_rate"] / 100), 2)
-
-        # === Customer Churn ===
-        if inputs["churn_rate"] > 0 and inputs["avg_revenue"] > 0 and inputs["num_customers"] > 0:
-            churn_loss = inputs["churn_rate"] / 100 * inputs["avg_revenue"] * inputs["num_customers"]
-            module_losses["Customer Churn"] = round(churn_loss, 2)
-
-        # === Leadership Drag ===
-        if inputs["leadership_drag"] > 0:
-            module_losses["Leadership Drag"] = round(payroll_cost * (inputs["leadership_drag"] / 100), 2)
-
-        # === Workforce Productivity ===
-        if (
-            inputs["productive_hours"] > 0
-            and inputs["target_hours_per_employee"] > 0
-            and inputs["total_employees"] > 0
-        ):
-            expected_total_hours = inputs["target_hours_per_employee"] * inputs["total_employees"]
-            productivity_gap_pct = 1 - (inputs["productive_hours"] / expected_total_hours)
-            productivity_loss = productivity_gap_pct * payroll_cost
-            module_losses["Workforce Productivity"] = round(max(productivity_loss, 0), 2)
-
-        # === Productivity (Deep Dive) ===
-        if inputs["avg_hours"] > 0 and inputs["absenteeism_days"] > 0:
-            # Module-aligned method:
-            # avg_daily_salary = (avg_salary / 12) / work_days_per_month
-            # where work_days ≈ avg_hours / 7.6 (default ~152h ÷ 7.6 = 20 days)
-            work_days = (inputs.get("avg_hours") or 152) / 7.6
-            monthly_salary = (inputs.get("avg_salary") or 0) / 12
-            avg_daily_salary = (monthly_salary / work_days) if work_days else 0
-            deep_dive_loss = inputs.get("absenteeism_days", 0) * avg_daily_salary
-            module_losses["Productivity (Deep Dive)"] = round(deep_dive_loss, 2)
+
+        # === Module losses (active modules only) ===
+        module_losses = {name: round(loss(inputs, payroll_cost), 2) for name, loss in active_modules(inputs)}
 
         # === Totals and Risk Score ===
         total_risk = sum(module_losses.values())
         ebitda_risk_pct = round((total_risk / ebitda_value) * 100, 1) if ebitda_value > 0 else 0
 
+        log_event(
+            "ors.run",
+            ORS_LOG_RATE,
+            industry=inputs["industry"],
+            modules=list(module_losses),
+            payroll_estimated=payroll_estimated,
+            total_risk=round(total_risk, 2),
+            ebitda_risk_pct=ebitda_risk_pct,
+        )
+
         return {
             "ebitda_margin": inputs["ebitda_margin"],
             "ebitda_value": round(ebitda_value, 2),
@@ -101,5 +142,5 @@ def run_operational_risk(data: RiskInput):
         }
 
     except Exception as e:
-        print("🔥 ORS Exception:", str(e))
+        log_event("ors.error", error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,182 @@
+import base64
+import binascii
+import hashlib
+import os
+import re
+import tempfile
+from typing import Dict, Optional
+
+from fastapi import HTTPException, Request
+from python_multipart.multipart import MultipartParseError, MultipartParser, parse_options_header
+
+import outbox
+
+# === 1. SETTINGS ===
+# The signed order PDF is hashed as it arrives and held in memory only up to
+# ORDER_SPOOL_THRESHOLD; past that it continues into a temp file in the outbox
+# spool dir, which is then renamed into place as the message's attachment. So
+# an order costs at most the threshold in RAM however large the PDF is or
+# however many are signed at once, and the outbox streams the file to Mailgun
+# from disk.
+
+ORDER_PDF_MAX_BYTES = int(os.getenv("ORDER_PDF_MAX_BYTES", str(25 * 1024 * 1024)))
+ORDER_SPOOL_THRESHOLD = int(os.getenv("ORDER_SPOOL_THRESHOLD", str(256 * 1024)))
+ORDER_FIELDS_MAX_BYTES = 1024 * 1024   # every non-PDF part together (form JSON, signature)
+B64_CHUNK = 64 * 1024                  # base64 characters per decode; a multiple of 4
+PDF_PART = "pdf"
+
+_B64_NOISE = re.compile(r"[^A-Za-z0-9+/=]")
+
+# === 2. SPOOL ===
+
+
+class PdfSpool:
+    """
+    Incremental SHA-256 plus in-memory-then-disk storage for one upload.
+    Use as a context manager: anything not moved out with save() is discarded.
+    """
+
+    def __init__(self):
+        self.size = 0
+        self._sha = hashlib.sha256()
+        self._buffer = bytearray()
+        self._file = None
+        self._tmp: Optional[str] = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.discard()
+        return False
+
+    @property
+    def spilled(self) -> bool:
+        return self._file is not None
+
+    def write(self, chunk: bytes):
+        self.size += len(chunk)
+        if self.size > ORDER_PDF_MAX_BYTES:
+            raise HTTPException(status_code=413, detail=f"PDF exceeds {ORDER_PDF_MAX_BYTES} bytes.")
+        self._sha.update(chunk)
+        if self._file is not None:
+            self._file.write(chunk)
+            return
+        self._buffer += chunk
+        if len(self._buffer) > ORDER_SPOOL_THRESHOLD:
+            os.makedirs(outbox.OUTBOX_SPOOL_DIR, exist_ok=True)
+            fd, self._tmp = tempfile.mkstemp(dir=outbox.OUTBOX_SPOOL_DIR, prefix=".upload-", suffix=".part")
+            self._file = os.fdopen(fd, "wb")
+            self._file.write(self._buffer)
+            self._buffer = bytearray()
+
+    def sha256_b64(self) -> str:
+        return base64.b64encode(self._sha.digest()).decode()
+
+    def save(self, path: str):
+        """Move the content to `path`, which must be in the outbox spool dir (same filesystem)."""
+        if self._file is None:
+            with open(path, "wb") as fh:
+                fh.write(self._buffer)
+            self._buffer = bytearray()
+            return
+        self._file.close()
+        os.replace(self._tmp, path)
+        self._file = self._tmp = None
+
+    def discard(self):
+        self._buffer = bytearray()
+        if self._file is not None:
+            self._file.close()
+            try:
+                os.remove(self._tmp)
+            except OSError:
+                pass
+            self._file = self._tmp = None
+
+# === 3. DECODING ===
+
+
+def decode_base64(text: str, spool: PdfSpool):
+    """
+    The JSON contract's `pdf_base64`, decoded a slice at a time so the decoded
+    PDF never exists as one bytes object next to the string.
+    """
+    # b64decode skips stray characters (line breaks, spaces); strip them up
+    # front so the slices stay aligned to 4-character groups
+    if _B64_NOISE.search(text):
+        text = _B64_NOISE.sub("", text)
+    try:
+        for i in range(0, len(text), B64_CHUNK):
+            spool.write(base64.b64decode(text[i:i + B64_CHUNK]))
+    except binascii.Error:
+        raise HTTPException(status_code=400, detail="PDF is not valid base64")
+
+
+class _OrderForm:
+    """python-multipart callbacks: the `pdf` part goes to the spool, other parts are kept as text."""
+
+    def __init__(self, spool: PdfSpool):
+        self.spool = spool
+        self.fields: Dict[str, bytearray] = {}
+        self.field_bytes = 0
+        self.name: Optional[str] = None
+        self.header_field = bytearray()
+        self.header_value = bytearray()
+        self.seen_pdf = False
+
+    def callbacks(self):
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_header_field": lambda data, start, end: self.header_field.extend(data[start:end]),
+            "on_header_value": lambda data, start, end: self.header_value.extend(data[start:end]),
+            "on_header_end": self.on_header_end,
+            "on_part_data": self.on_part_data,
+        }
+
+    def on_part_begin(self):
+        self.name = None
+
+    def on_header_end(self):
+        if bytes(self.header_field).lower() == b"content-disposition":
+            _, params = parse_options_header(bytes(self.header_value))
+            name = params.get(b"name")
+            self.name = name.decode("utf-8", "replace") if name is not None else None
+            if self.name == PDF_PART:
+                self.seen_pdf = True
+            elif self.name is not None:
+                self.fields.setdefault(self.name, bytearray())
+        self.header_field.clear()
+        self.header_value.clear()
+
+    def on_part_data(self, data, start, end):
+        if self.name == PDF_PART:
+            self.spool.write(bytes(data[start:end]))
+        elif self.name is not None:
+            self.field_bytes += end - start
+            if self.field_bytes > ORDER_FIELDS_MAX_BYTES:
+                raise HTTPException(status_code=413, detail="Form fields are too large.")
+            self.fields[self.name].extend(data[start:end])
+
+
+async def read_multipart(request: Request, spool: PdfSpool) -> Dict[str, str]:
+    """
+    Stream a multipart/form-data body: the `pdf` file part is hashed and
+    spooled chunk by chunk; every other part is returned as a text field.
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    boundary = params.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise HTTPException(status_code=415, detail="Upload multipart/form-data.")
+
+    form = _OrderForm(spool)
+    parser = MultipartParser(boundary, form.callbacks())
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+        parser.finalize()
+    except MultipartParseError as e:
+        raise HTTPException(status_code=400, detail=f"Malformed multipart body: {e}")
+    if not form.seen_pdf:
+        raise HTTPException(status_code=422, detail=f"Missing field: {PDF_PART}")
+    return {name: value.decode("utf-8", "replace") for name, value in form.fields.items()}
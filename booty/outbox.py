@@ -0,0 +1,329 @@
+import asyncio
+import json
+import os
+import random
+import re
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+from uuid import uuid4
+
+from fastapi import APIRouter, Depends
+
+import http_client
+import metrics
+import profiling
+from asset_cache import asset_cache
+from auth import require_admin
+
+router = APIRouter(prefix="/admin/outbox", tags=["outbox"], dependencies=[Depends(require_admin)])
+
+# === 1. SETTINGS ===
+# Outgoing Mailgun messages are written to a local SQLite file first and sent by
+# background workers, so request latency doesn't depend on Mailgun and an
+# outage delays mail instead of losing it.
+
+OUTBOX_DB = os.getenv("OUTBOX_DB", "outbox.sqlite3")
+OUTBOX_SPOOL_DIR = os.getenv("OUTBOX_SPOOL_DIR", "outbox_spool")
+OUTBOX_WORKERS = int(os.getenv("OUTBOX_WORKERS", "4"))
+MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+BASE_DELAY = 5.0        # seconds before the first retry
+MAX_DELAY = 15 * 60.0   # backoff ceiling
+LEASE_SECONDS = 120.0   # a 'sending' row older than this is assumed abandoned
+# Sent rows are kept this long so a repeated idempotency key is still ignored,
+# then deleted so the table (and every /metrics scrape of it) stays small
+KEEP_SENT = float(os.getenv("OUTBOX_KEEP_SENT", str(7 * 24 * 3600)))
+IDLE_POLL = 2.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    idempotency_key TEXT NOT NULL UNIQUE,
+    kind TEXT NOT NULL,
+    message TEXT NOT NULL,
+    attachments TEXT NOT NULL DEFAULT '[]',
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    last_error TEXT,
+    provider_id TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt_at);
+"""
+
+_wake: Optional[asyncio.Event] = None
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_tasks: List[asyncio.Task] = []
+
+# === 2. STORAGE ===
+
+
+def _connect() -> sqlite3.Connection:
+    conn = sqlite3.connect(OUTBOX_DB, timeout=10, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+@contextmanager
+def _db():
+    conn = _connect()
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+def init_db():
+    os.makedirs(OUTBOX_SPOOL_DIR, exist_ok=True)
+    with _db() as conn:
+        conn.executescript(_SCHEMA)
+
+
+def spool_path(key: str, filename: str) -> str:
+    """A fresh path in the spool dir for an attachment of message `key`."""
+    safe_key = re.sub(r"[^A-Za-z0-9_.-]", "_", key)
+    return os.path.join(OUTBOX_SPOOL_DIR, f"{safe_key}-{uuid4().hex[:8]}-{filename}")
+
+
+def spool_attachment(key: str, filename: str, content: bytes) -> str:
+    """Write an attachment next to the queue so the row stays small. Returns the path."""
+    path = spool_path(key, filename)
+    with open(path, "wb") as fh:
+        fh.write(content)
+    return path
+
+
+def enqueue(key: str, kind: str, message: Dict, attachments: Optional[List[Dict]] = None) -> bool:
+    """
+    Queue a Mailgun message. `key` makes the enqueue idempotent: a second call
+    with the same key is ignored and returns False (until KEEP_SENT after the
+    first was sent).
+    `attachments` items are {"filename", "mime", "path", "owned"}; owned files
+    are deleted once the message is sent or marked dead. Items with "asset"
+    instead of "path" are read from the asset cache (see asset_cache.py) when
+    the message is sent.
+    Blocks on a SQLite write; async routes call it through asyncio.to_thread.
+    """
+    now = time.time()
+    with profiling.span("outbox_enqueue"), _db() as conn:
+        cur = conn.execute(
+            "INSERT OR IGNORE INTO outbox (idempotency_key, kind, message, attachments,"
+            " next_attempt_at, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (key, kind, json.dumps(message), json.dumps(attachments or []), now, now, now),
+        )
+        created = cur.rowcount == 1
+    if created:
+        _notify()
+    return created
+
+
+def _claim_next() -> Optional[sqlite3.Row]:
+    now = time.time()
+    with _db() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute(
+            "SELECT * FROM outbox WHERE (status = 'pending' AND next_attempt_at <= ?)"
+            " OR (status = 'sending' AND updated_at < ?) ORDER BY id LIMIT 1",
+            (now, now - LEASE_SECONDS),
+        ).fetchone()
+        if row is not None:
+            conn.execute(
+                "UPDATE outbox SET status = 'sending', attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                (now, row["id"]),
+            )
+        conn.execute("COMMIT")
+        return row
+
+
+def _mark_sent(row_id: int, provider_id: Optional[str]):
+    now = time.time()
+    with _db() as conn:
+        # next_attempt_at doubles as the sent time so the prune below is a range on outbox_due
+        conn.execute(
+            "UPDATE outbox SET status = 'sent', provider_id = ?, last_error = NULL, next_attempt_at = ?,"
+            " updated_at = ? WHERE id = ?",
+            (provider_id, now, now, row_id),
+        )
+        conn.execute("DELETE FROM outbox WHERE status = 'sent' AND next_attempt_at < ?", (now - KEEP_SENT,))
+
+
+def _mark_failed(row_id: int, attempts: int, error: str, retryable: bool):
+    now = time.time()
+    if retryable and attempts < MAX_ATTEMPTS:
+        delay = min(MAX_DELAY, BASE_DELAY * 2 ** (attempts - 1)) * random.uniform(0.8, 1.2)
+        status, next_at = "pending", now + delay
+    else:
+        status, next_at = "dead", now
+    with _db() as conn:
+        conn.execute(
+            "UPDATE outbox SET status = ?, next_attempt_at = ?, last_error = ?, updated_at = ? WHERE id = ?",
+            (status, next_at, error[:500], now, row_id),
+        )
+    return status
+
+
+def stats() -> Dict[str, int]:
+    with _db() as conn:
+        rows = conn.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall()
+    return {status: count for status, count in rows}
+
+
+metrics.gauge_func(
+    "clarity_outbox_messages",
+    "Outbox rows by delivery status",
+    ("status",),
+    lambda: {(status,): count for status, count in stats().items()},
+)
+
+
+def stats_for_prefix(prefix: str) -> Dict[str, int]:
+    """Status counts for one family of keys, e.g. every batch of a bulk job."""
+    with _db() as conn:
+        # Range scan on the unique key index; LIKE would scan the table
+        rows = conn.execute(
+            "SELECT status, COUNT(*) FROM outbox WHERE idempotency_key >= ? AND idempotency_key < ?"
+            " GROUP BY status",
+            (prefix, prefix + "\uffff"),
+        ).fetchall()
+    return {status: count for status, count in rows}
+
+# === 3. DELIVERY ===
+
+
+async def _deliver(row: sqlite3.Row):
+    api_key = os.getenv("MAILGUN_API_KEY")
+    domain = os.getenv("MAILGUN_DOMAIN")
+    api_base = os.getenv("MAILGUN_API_BASE", "https://api.mailgun.net")
+    if not (api_key and domain):
+        raise RuntimeError("Missing Mailgun environment variables.")
+
+    data = json.loads(row["message"])
+    # Mailgun has no idempotency header; tag the message so webhooks can dedupe
+    data["v:outbox_key"] = row["idempotency_key"]
+
+    handles = []
+    try:
+        files = []
+        for a in json.loads(row["attachments"]):
+            if "asset" in a:
+                # Shared bytes from the asset cache; httpx streams them without copying
+                asset = asset_cache.get(a["asset"])
+                if asset is None:
+                    raise FileNotFoundError(f"Asset missing: {a['asset']}")
+                files.append(("attachment", (a["filename"], asset.content, a["mime"])))
+                continue
+            fh = open(a["path"], "rb")
+            handles.append(fh)
+            files.append(("attachment", (a["filename"], fh, a["mime"])))
+        return await http_client.post(
+            "mailgun",
+            f"{api_base}/v3/{domain}/messages",
+            auth=("api", api_key),
+            data=data,
+            files=files or None,
+        )
+    finally:
+        for fh in handles:
+            fh.close()
+
+
+def _provider_id(r) -> Optional[str]:
+    # The message is accepted by now; an odd body must not keep the row in 'sending'
+    if "application/json" not in r.headers.get("content-type", ""):
+        return None
+    try:
+        return r.json().get("id")
+    except (ValueError, AttributeError):
+        return None
+
+
+def _cleanup(row: sqlite3.Row):
+    for a in json.loads(row["attachments"]):
+        if a.get("owned"):
+            try:
+                os.remove(a["path"])
+            except OSError:
+                pass
+
+
+async def process_one() -> bool:
+    """Send the next due message, if any. Returns False when nothing was due."""
+    row = await asyncio.to_thread(_claim_next)
+    if row is None:
+        return False
+    attempts = row["attempts"] + 1
+    try:
+        r = await _deliver(row)
+    except Exception as e:
+        status = await asyncio.to_thread(_mark_failed, row["id"], attempts, str(e), True)
+        if status == "dead":
+            _cleanup(row)
+        print(f"⚠️ Outbox {row['kind']} {row['idempotency_key']} attempt {attempts} failed ({status}): {e}")
+        return True
+
+    if r.status_code < 300:
+        await asyncio.to_thread(_mark_sent, row["id"], _provider_id(r))
+        _cleanup(row)
+        print(f"✅ Outbox sent {row['kind']} {row['idempotency_key']}")
+    else:
+        # 4xx other than rate limiting means Mailgun rejected the message itself
+        retryable = r.status_code == 429 or r.status_code >= 500
+        status = await asyncio.to_thread(
+            _mark_failed, row["id"], attempts, f"Mailgun {r.status_code}: {r.text[:300]}", retryable
+        )
+        if status == "dead":
+            _cleanup(row)  # a dead row is never retried, so nothing will read its files again
+        print(f"⚠️ Outbox {row['kind']} {row['idempotency_key']} got {r.status_code} ({status})")
+    return True
+
+
+async def _worker():
+    while True:
+        try:
+            if await process_one():
+                continue
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"🔥 Outbox worker error: {e}")
+        _wake.clear()
+        try:
+            await asyncio.wait_for(_wake.wait(), timeout=IDLE_POLL)
+        except asyncio.TimeoutError:
+            pass
+
+
+def _notify():
+    # enqueue() may run on a threadpool thread (sync routes), so hop to the loop
+    if _wake is not None and _loop is not None:
+        _loop.call_soon_threadsafe(_wake.set)
+
+# === 4. LIFECYCLE ===
+
+
+async def start(workers: int = OUTBOX_WORKERS):
+    global _wake, _loop
+    init_db()
+    _wake = asyncio.Event()
+    _loop = asyncio.get_running_loop()
+    for _ in range(workers):
+        _tasks.append(asyncio.create_task(_worker()))
+
+
+async def stop():
+    for task in _tasks:
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+    _tasks.clear()
+
+# === 5. ROUTES ===
+
+
+@router.get("/stats")
+def outbox_stats():
+    return {"status": "success", "data": stats()}
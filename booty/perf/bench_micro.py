@@ -0,0 +1,138 @@
+"""
+Micro-benchmarks for the calculator functions, the ORS engine, the profit
+projection and both report renderers, checked against a stored baseline.
+
+Run from booty/:
+    python perf/bench_micro.py [--only ors] [--runs 3] [--tolerance 0.3] [--update-baseline]
+
+Each case is timed call by call (after a warm-up) for about --seconds, giving
+ops/s and p50/p95/p99 in µs; "peak B" is the peak of one call's live
+allocations (tracemalloc), which doesn't depend on machine speed. Every case
+is measured --runs times and the medians are kept. Exits 1 when ops/s, p50 or
+allocations regress past the tolerance (see perf/regression.py).
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import calculator  # noqa: E402
+import main  # noqa: E402
+import operational_risk  # noqa: E402
+import regression  # noqa: E402
+import report_templates  # noqa: E402
+from bench_templates import ORS_DATA, PROFIT_ARGS  # noqa: E402
+from operational_risk import RiskInput, run_operational_risk  # noqa: E402
+from profit_projection import ProfitRequest, compute_projection  # noqa: E402
+
+INDUSTRY = "Construction"
+BASELINE = "micro"
+# metric -> (better direction, absolute noise floor). A few hundred bytes of
+# peak_bytes is a dict resize or an interned string, not a regression.
+CHECKED = {"ops_per_sec": ("higher", 0.0), "p50_us": ("lower", 0.5), "peak_bytes": ("lower", 4096)}
+
+EFFICIENCY = main.EfficiencyAutoInput(industry=INDUSTRY, total_employees=50, avg_salary=80000, improvement_rate=20)
+CHURN = main.ChurnCalculatorRequest(
+    industry=INDUSTRY, num_customers=400, churn_rate=8, avg_revenue=1200, cac=300, desired_improvement=2,
+)
+LEADERSHIP = main.LeadershipDragCalculatorRequest(industry=INDUSTRY, total_employees=50, avg_salary=80000, leadership_drag=20)
+WORKFORCE = main.WorkforceProductivityFullRequest(
+    industry=INDUSTRY, total_revenue=1e7, payroll_cost=4e6, total_employees=50, productive_hours=6000,
+    target_hours_per_employee=152, absenteeism_days=20, overtime_hours=100,
+)
+DIVE = main.ProductivityDeepDiveInput(industry=INDUSTRY, total_employees=50, avg_salary=80000, absenteeism_days=30, avg_hours=140)
+RISK = RiskInput(**{k: v for k, v in ORS_DATA.items() if k in RiskInput.model_fields})
+PROFIT = ProfitRequest(
+    period="FY26", inputs={"revenue": 3_200_000, "cogs": 1_400_000, "opex": 950_000},
+    savings={"payroll": 180_000, "churn": 42_000, "leadership": 65_000}, ors={"ebitdaAtRisk": 410_000},
+)
+
+CASES = {
+    "calculator.load_benchmark_data": lambda: calculator.load_benchmark_data(),
+    "calculator.industry_benchmarks": lambda: calculator.industry_benchmarks(INDUSTRY),
+    "calculator.compare_to_benchmark": lambda: calculator.compare_to_benchmark(INDUSTRY, 20),
+    "calculator.calculate_efficiency_loss_and_roi": lambda: calculator.calculate_efficiency_loss_and_roi(EFFICIENCY),
+    "calculator.calculate_customer_churn_loss": lambda: calculator.calculate_customer_churn_loss(CHURN),
+    "calculator.calculate_leadership_drag_loss": lambda: calculator.calculate_leadership_drag_loss(LEADERSHIP),
+    "calculator.calculate_productivity_metrics": lambda: calculator.calculate_productivity_metrics(WORKFORCE),
+    "calculator.calculate_productivity_metrics_dive": lambda: calculator.calculate_productivity_metrics_dive(DIVE),
+    "calculator.get_industry_benchmarks": lambda: calculator.get_industry_benchmarks(),
+    "calculator.industry_defaults": lambda: calculator.industry_defaults(INDUSTRY),
+    "operational_risk.run_operational_risk": lambda: run_operational_risk(RISK),
+    "profit_projection.compute_projection": lambda: compute_projection(PROFIT),
+    "report_templates.render_report_html": lambda: report_templates.render_report_html(ORS_DATA),
+    "report_templates.render_profit_report_html": lambda: report_templates.render_profit_report_html(*PROFIT_ARGS),
+}
+
+
+def sample(fn, seconds):
+    # Warm-up, then size the run from the warm-up's pace
+    start = time.perf_counter()
+    warmups = 0
+    while time.perf_counter() - start < min(0.05, seconds / 10):
+        fn()
+        warmups += 1
+    n = max(200, min(200_000, int(warmups / min(0.05, seconds / 10) * seconds)))
+    clock = time.perf_counter_ns
+    samples = [0] * n
+    for i in range(n):
+        t0 = clock()
+        fn()
+        samples[i] = clock() - t0
+    return [s / 1000 for s in samples]
+
+
+def peak_bytes(fn, n=200):
+    fn()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    for _ in range(n):
+        fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak - before
+
+
+def main_cli():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=0.25, help="time budget per case, per run")
+    parser.add_argument("--only", default="", help="substring filter on case names")
+    regression.add_arguments(parser, tolerance=0.3)
+    args = parser.parse_args()
+
+    main.benchmark_store.reload()
+    report_templates.load()
+    # Measure the engine, not the sampled log line
+    operational_risk.ORS_LOG_RATE = 0.0
+
+    results = {}
+    print(f"{'case':<48} {'ops/s':>10} {'p50 µs':>8} {'p95 µs':>8} {'p99 µs':>8} {'peak B':>8}")
+    for name, fn in CASES.items():
+        if args.only not in name:
+            continue
+        runs = []
+        for _ in range(args.runs):
+            samples = sample(fn, args.seconds)
+            runs.append({
+                "ops_per_sec": round(1e6 / statistics.fmean(samples), 1),
+                "p50_us": round(regression.percentile(samples, 50), 3),
+                "p95_us": round(regression.percentile(samples, 95), 3),
+                "p99_us": round(regression.percentile(samples, 99), 3),
+                "peak_bytes": peak_bytes(fn),
+            })
+        row = results[name] = regression.median_row(runs)
+        print(f"{name:<48} {row['ops_per_sec']:10,.0f} {row['p50_us']:8.2f} {row['p95_us']:8.2f}"
+              f" {row['p99_us']:8.2f} {row['peak_bytes']:8,.0f}")
+
+    if args.only and args.update_baseline:
+        sys.exit("Refusing to write a partial baseline; drop --only.")
+    regression.finish(BASELINE, results, CHECKED, args)
+
+
+if __name__ == "__main__":
+    main_cli()
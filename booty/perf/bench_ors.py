@@ -0,0 +1,103 @@
+"""
+ORS engine micro-benchmark: per-call overhead of run_operational_risk.
+
+Run from booty/:
+    python perf/bench_ors.py [--n 50000] [--legacy-rev 9d226a5]
+
+Times the current module registry against the hard-coded version from
+`--legacy-rev` (the last commit that printed every payload), on a payload with
+every module active and one with most of them switched off. Legacy stdout goes
+to /dev/null, so its numbers are a lower bound: they include formatting the
+payload print but not the terminal or log-drain write. Also checks both
+versions agree on every payload before timing.
+"""
+import argparse
+import contextlib
+import os
+import random
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import operational_risk  # noqa: E402
+from operational_risk import RiskInput  # noqa: E402
+
+FULL = RiskInput(
+    payroll_cost=4_200_000, avg_salary=70_000, improvement_rate=18, churn_rate=12, desired_improvement=5,
+    cac=650, avg_revenue=1200, num_customers=800, leadership_drag=14, total_revenue=12_000_000,
+    productive_hours=7_800, target_hours_per_employee=150, overtime_hours=300, absenteeism_days=45,
+    avg_hours=140, total_employees=60, industry="Construction", ebitda_margin=18,
+)
+SPARSE = RiskInput(avg_salary=70_000, total_employees=60, improvement_rate=18, total_revenue=12_000_000)
+
+
+def load_legacy(rev):
+    proc = subprocess.run(["git", "show", f"{rev}:booty/operational_risk.py"], capture_output=True, text=True)
+    if proc.returncode != 0:
+        return None
+    namespace = {}
+    exec(compile(proc.stdout, f"{rev}:operational_risk.py", "exec"), namespace)
+    return namespace["run_operational_risk"]
+
+
+def random_inputs(rng):
+    def maybe(value):
+        return value if rng.random() < 0.7 else 0
+
+    return RiskInput(
+        payroll_cost=maybe(rng.uniform(1e5, 1e7)), avg_salary=rng.uniform(4e4, 1.2e5),
+        improvement_rate=maybe(rng.uniform(1, 40)), churn_rate=maybe(rng.uniform(1, 30)),
+        avg_revenue=maybe(rng.uniform(100, 5000)), num_customers=maybe(rng.randint(1, 5000)),
+        leadership_drag=maybe(rng.uniform(1, 30)), total_revenue=rng.uniform(1e6, 5e7),
+        productive_hours=maybe(rng.uniform(1000, 20000)), target_hours_per_employee=maybe(rng.uniform(100, 170)),
+        absenteeism_days=maybe(rng.uniform(1, 100)), avg_hours=maybe(rng.uniform(100, 170)),
+        total_employees=maybe(rng.randint(1, 500)), ebitda_margin=rng.uniform(5, 30),
+    )
+
+
+def time_per_call(fn, payload, n):
+    fn(payload)
+    start = time.perf_counter()
+    for _ in range(n):
+        fn(payload)
+    return (time.perf_counter() - start) / n * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=50000)
+    parser.add_argument("--legacy-rev", default="9d226a5")
+    args = parser.parse_args()
+
+    legacy = load_legacy(args.legacy_rev)
+    # Measure the engine, not the sampled log line
+    operational_risk.ORS_LOG_RATE = 0.0
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        if legacy is not None:
+            rng = random.Random(11)
+            for _ in range(2000):
+                payload = random_inputs(rng)
+                if legacy(payload) != operational_risk.run_operational_risk(payload):
+                    sys.exit(f"Results differ for {payload!r}")
+
+        rows = []
+        for label, payload in (("all modules", FULL), ("1 module", SPARSE)):
+            current = time_per_call(operational_risk.run_operational_risk, payload, args.n)
+            before = time_per_call(legacy, payload, args.n) if legacy else None
+            rows.append((label, before, current))
+
+    if legacy is None:
+        print(f"⚠️ Could not read operational_risk.py at {args.legacy_rev}; timing the registry only.")
+    else:
+        print("✅ Legacy and registry agree on 2000 random payloads")
+    print(f"{'payload':<12} {'legacy µs':>10} {'registry µs':>12}")
+    for label, before, current in rows:
+        legacy_col = f"{before:10.2f}" if before is not None else f"{'n/a':>10}"
+        print(f"{label:<12} {legacy_col} {current:12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Cold-start benchmark: how long a fresh interpreter takes to import the app.
+
+Run from booty/:
+    python perf/bench_startup.py [--runs 10]
+
+Each run is a new process (what Render does on scale-up), so module caches
+don't hide import cost. `pandas` is timed alongside as the reference for what
+the app used to pay before the benchmark loader moved to the csv module.
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+TARGETS = {
+    "main (app import)": "import main",
+    "main + benchmark load": "import main; main.benchmark_store.reload()",
+    "pandas (reference)": "import pandas",
+}
+
+
+def time_import(stmt: str, runs: int):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        proc = subprocess.run([sys.executable, "-c", stmt], capture_output=True)
+        elapsed = time.perf_counter() - start
+        if proc.returncode != 0:
+            return None
+        samples.append(elapsed * 1000)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    baseline = time_import("pass", args.runs)
+    base_ms = statistics.median(baseline)
+    print(f"{'interpreter only':<24} {base_ms:8.1f} ms")
+
+    for label, stmt in TARGETS.items():
+        samples = time_import(stmt, args.runs)
+        if samples is None:
+            print(f"{label:<24} {'n/a (import failed)':>14}")
+            continue
+        med = statistics.median(samples)
+        print(f"{label:<24} {med:8.1f} ms  (+{med - base_ms:.1f} ms over bare interpreter)")
+
+
+if __name__ == "__main__":
+    main()
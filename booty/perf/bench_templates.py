@@ -0,0 +1,149 @@
+"""
+Report rendering benchmark: precompiled templates vs the old f-string renderers.
+
+Run from booty/:
+    python perf/bench_templates.py [--n 20000] [--legacy-rev 840a85f]
+
+The f-string versions are pulled from `--legacy-rev` (the last commit where
+main.py built the HTML inline) so both paths render the same reports. Reports
+per-render latency and the peak bytes allocated per render (tracemalloc). The
+"(varied)" row sends a different report every time, as a bulk campaign would.
+"""
+import argparse
+import ast
+import itertools
+import os
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import report_templates  # noqa: E402
+
+LEGACY_FUNCTIONS = ("format_dollars", "_fmt", "render_report_html", "render_profit_report_html")
+
+ORS_DATA = {
+    "industry": "Education & Training", "total_employees": 120, "avg_salary": 72000,
+    "total_revenue": 14_000_000, "num_customers": 900, "avg_revenue": 1300, "cac": 650,
+    "churn_rate": 11.5, "desired_improvement": 5, "leadership_drag": 14, "productive_hours": 16400,
+    "target_hours_per_employee": 150, "avg_hours": 138, "overtime_hours": 420, "absenteeism_days": 55,
+    "payroll_cost": 8_640_000, "improvement_rate": 22, "ebitda_margin": 16,
+    "total_risk_dollars": 2_350_000, "ebitda_risk_pct": 104.9,
+    "module_breakdown": {
+        "Payroll Waste": 1_900_800, "Customer Churn": 120_000, "Leadership Drag": 250_000,
+        "Workforce Productivity": 60_000, "Productivity (Deep Dive)": 19_200,
+    },
+}
+PROFIT_ARGS = (
+    "owner@example.com",
+    {
+        "period": "FY26 Q1",
+        "inputs": {"revenue": 3_200_000, "cogs": 1_400_000, "opex": 950_000},
+        "savings": {"payroll": 180_000, "churn": 42_000, "leadership": 65_000, "workforce": 18_000, "deepDive": 9_500},
+        "scenarios": {"applyFixes": True, "applyORS": False},
+    },
+    {
+        "results": {
+            "now": {"gross": 1_800_000, "net": 850_000},
+            "fixes": {"net": 1_164_500, "delta_vs_now": 314_500},
+            "ors": {"net": 790_000, "delta_vs_now": -60_000},
+        },
+        "computed": {"totalSavings": 314_500, "orsEbitdaAtRisk": 410_000},
+    },
+)
+
+
+def varied_reports(n, seed=7):
+    """Distinct reports per send, so the formatted-amount cache can't flatter the numbers."""
+    rng = random.Random(seed)
+
+    def jitter(value):
+        if isinstance(value, dict):
+            return {k: jitter(v) for k, v in value.items()}
+        if isinstance(value, (int, float)):
+            return round(value * rng.uniform(0.5, 1.5), 1 if isinstance(value, float) else 0)
+        return value
+
+    return [jitter(ORS_DATA) for _ in range(n)]
+
+
+def load_legacy(rev):
+    proc = subprocess.run(["git", "show", f"{rev}:booty/main.py"], capture_output=True, text=True)
+    if proc.returncode != 0:
+        return None
+    tree = ast.parse(proc.stdout)
+    body = [n for n in tree.body if isinstance(n, ast.FunctionDef) and n.name in LEGACY_FUNCTIONS]
+    namespace = {}
+    exec(compile(ast.Module(body=body, type_ignores=[]), f"{rev}:main.py", "exec"), namespace)
+    return namespace
+
+
+def time_per_call(fn, n):
+    fn()
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - start) / n * 1e6
+
+
+def peak_bytes_per_call(fn, n):
+    # Peak of one render's live temporaries; each result is dropped before the next
+    fn()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    for _ in range(n):
+        fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak - before
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=20000)
+    parser.add_argument("--legacy-rev", default="840a85f")
+    args = parser.parse_args()
+
+    report_templates.load()
+    legacy = load_legacy(args.legacy_rev)
+    if legacy is None:
+        print(f"⚠️ Could not read main.py at {args.legacy_rev}; timing templates only.")
+
+    varied = varied_reports(1000)
+    next_compiled = itertools.cycle(varied).__next__
+    next_legacy = itertools.cycle(varied).__next__
+
+    cases = {
+        "ors": (
+            lambda: report_templates.render_report_html(ORS_DATA),
+            legacy and (lambda: legacy["render_report_html"](ORS_DATA)),
+        ),
+        "ors (varied)": (
+            lambda: report_templates.render_report_html(next_compiled()),
+            legacy and (lambda: legacy["render_report_html"](next_legacy())),
+        ),
+        "profit": (
+            lambda: report_templates.render_profit_report_html(*PROFIT_ARGS),
+            legacy and (lambda: legacy["render_profit_report_html"](*PROFIT_ARGS)),
+        ),
+        "ors (bytes)": (
+            lambda: report_templates.get("ors_report.html").render_bytes(report_templates.ors_report_values(ORS_DATA)),
+            legacy and (lambda: legacy["render_report_html"](ORS_DATA).encode("utf-8")),
+        ),
+    }
+
+    print(f"{'report':<14} {'path':<10} {'µs/render':>10} {'peak B/render':>14}")
+    for label, (compiled, fstring) in cases.items():
+        for path, fn in (("template", compiled), ("f-string", fstring)):
+            if fn is None:
+                continue
+            us = time_per_call(fn, args.n)
+            peak = peak_bytes_per_call(fn, min(args.n, 2000))
+            print(f"{label:<14} {path:<10} {us:10.2f} {peak:14,d}")
+
+
+if __name__ == "__main__":
+    main()
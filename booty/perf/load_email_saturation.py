@@ -0,0 +1,91 @@
+"""
+Load test: calculator latency while the email endpoints are saturated.
+
+Run from booty/:
+    python perf/load_email_saturation.py [--senders 100] [--upstream-delay 2.0]
+
+The app runs in-process; outbound Mailgun/reCAPTCHA/Sheets calls go to a local
+stub transport that sleeps for --upstream-delay seconds, standing in for a slow
+upstream. The script measures /run-payroll-waste latency idle and then again
+while --senders concurrent /send-profit-report calls are in flight.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("MAILGUN_API_KEY", "key-test")
+os.environ.setdefault("MAILGUN_DOMAIN", "mg.example.test")
+os.environ.setdefault("MAILGUN_SENDER", "reports@example.test")
+
+import http_client  # noqa: E402
+import main  # noqa: E402
+
+CALC_BODY = {"industry": "Construction", "total_employees": 50, "avg_salary": 80000, "improvement_rate": 20}
+PROFIT_BODY = {
+    "email": "lead@example.test",
+    "payload": {"period": "Q1", "inputs": {"revenue": 1_000_000, "cogs": 400_000, "opex": 300_000}},
+}
+
+
+def slow_upstream(delay: float):
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(delay)
+        return httpx.Response(200, json={"id": "<stub@mailgun>", "message": "Queued", "success": True})
+    return httpx.MockTransport(handler)
+
+
+def pct(samples, p):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+async def measure_calculator(client, n):
+    samples = []
+    for _ in range(n):
+        start = time.perf_counter()
+        r = await client.post("/run-payroll-waste", json=CALC_BODY)
+        samples.append((time.perf_counter() - start) * 1000)
+        r.raise_for_status()
+    return samples
+
+
+def report(label, samples):
+    print(f"{label:<22} n={len(samples):<5} p50={statistics.median(samples):7.2f} ms"
+          f"  p95={pct(samples, 95):7.2f} ms  p99={pct(samples, 99):7.2f} ms")
+
+
+async def run(args):
+    async with main.app.router.lifespan_context(main.app):
+        await http_client.startup(transport=slow_upstream(args.upstream_delay))
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://app") as client:
+            report("idle", await measure_calculator(client, args.requests))
+
+            senders = [
+                asyncio.create_task(client.post("/send-profit-report", json=PROFIT_BODY))
+                for _ in range(args.senders)
+            ]
+            await asyncio.sleep(0.05)
+            report(f"{args.senders} sends in flight", await measure_calculator(client, args.requests))
+            results = await asyncio.gather(*senders)
+            ok = sum(1 for r in results if r.status_code == 200)
+            print(f"sends completed: {ok}/{len(results)} ok")
+
+
+def cli():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--senders", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--upstream-delay", type=float, default=2.0)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    cli()
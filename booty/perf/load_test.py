@@ -0,0 +1,244 @@
+"""
+In-process load test of every public API route, checked against a baseline.
+
+Run from booty/:
+    python perf/load_test.py [--concurrency 16] [--seconds 1] [--runs 3] [--only run-] [--update-baseline]
+
+The app runs in this process behind httpx's ASGI transport with its real
+lifespan (outbox workers, snapshot writer). Mailgun, reCAPTCHA and Sheets are
+replaced by a local stub transport that answers after --upstream-delay seconds,
+and all runtime state (SQLite, spools, history) goes to a temp directory.
+Each route is driven by --concurrency closed-loop clients for --seconds;
+calculator inputs vary per request so the result cache doesn't serve them all.
+Each route is driven --runs times and the medians are kept. Reports req/s,
+p50/p95/p99 in ms and process RSS; exits 1 when a route's throughput or p50,
+or the peak RSS, regresses past the tolerance.
+"""
+import argparse
+import asyncio
+import base64
+import contextlib
+import hashlib
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+STATE_DIR = tempfile.mkdtemp(prefix="clarity-load-")
+for var, name in (
+    ("OUTBOX_DB", "outbox.sqlite3"), ("OUTBOX_SPOOL_DIR", "outbox_spool"), ("SNAPSHOT_DB", "snapshots.sqlite3"),
+    ("BULK_SPOOL_DIR", "bulk_spool"), ("SHARED_STATE_DIR", "shared_state"), ("CONFIG_HISTORY_DIR", "config_history"),
+    ("UNLOCK_DB", "unlock_events.sqlite3"),
+):
+    os.environ[var] = os.path.join(STATE_DIR, name)
+os.environ.setdefault("MAILGUN_API_KEY", "key-test")
+os.environ.setdefault("MAILGUN_DOMAIN", "mg.example.test")
+os.environ.setdefault("MAILGUN_SENDER", "reports@example.test")
+os.environ.setdefault("RECAPTCHA_SECRET_KEY", "secret-test")
+# One client address hammering every route; measure the routes, not the limiter
+os.environ["RATE_LIMIT_ENABLED"] = "0"
+
+import http_client  # noqa: E402
+import main  # noqa: E402
+import operational_risk  # noqa: E402
+import regression  # noqa: E402
+
+BASELINE = "load"
+# metric -> (better direction, absolute noise floor)
+CHECKED = {
+    "rps": ("higher", 20.0),
+    "p50_ms": ("lower", 1.0),
+    "peak_rss_mb": ("lower", 10.0),
+}
+INDUSTRIES = ["Construction", "Retail", "Education & Training", "Healthcare"]
+PDF = b"%PDF-1.4\n" + os.urandom(64 * 1024)
+
+
+def stub_upstream(delay: float):
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if delay:
+            await asyncio.sleep(delay)
+        return httpx.Response(200, json={"id": "<stub@mailgun>", "message": "Queued", "success": True})
+    return httpx.MockTransport(handler)
+
+
+def _order_form(i):
+    return {
+        "company": "Load Test Pty Ltd", "abn": "12 345 678 901", "name": "Sam", "title": "Director",
+        "email": f"order{i}@example.test", "phone": "0400 000 000", "initial_users": 25, "start_date": "2026-01-01",
+    }
+
+
+def _sha256_b64(data):
+    return base64.b64encode(hashlib.sha256(data).digest()).decode()
+
+
+def _order(i):
+    pdf = PDF + str(i).encode()  # unique hash, so every order is queued
+    return {
+        "form": _order_form(i),
+        "signature_png": "data:image/png;base64,iVBORw0KGgo=",
+        "pdf_base64": base64.b64encode(pdf).decode(),
+        "pdf_sha256_b64": _sha256_b64(pdf),
+    }
+
+
+def _order_upload(i):
+    pdf = PDF + b"upload" + str(i).encode()
+    return {
+        "data": {"form": json.dumps(_order_form(i)), "pdf_sha256_b64": _sha256_b64(pdf)},
+        "files": {"pdf": ("Candoo-Order.pdf", pdf, "application/pdf")},
+    }
+
+
+def _risk(i):
+    return {
+        "industry": INDUSTRIES[i % 4], "total_employees": 40 + i % 50, "avg_salary": 70000 + i,
+        "improvement_rate": 15, "total_revenue": 12_000_000, "payroll_cost": 4_000_000, "churn_rate": 10,
+        "num_customers": 800, "avg_revenue": 1200, "cac": 600, "leadership_drag": 12, "ebitda_margin": 15,
+    }
+
+
+def _profit(i):
+    return {"period": "FY26", "inputs": {"revenue": 3_000_000 + i, "cogs": 1_200_000, "opex": 900_000},
+            "savings": {"payroll": 150_000, "churn": 40_000}, "ors": {"ebitdaAtRisk": 300_000}}
+
+
+# route label -> i -> (method, url, request kwargs)
+SCENARIOS = {
+    "POST /run-payroll-waste": lambda i: ("POST", "/run-payroll-waste", {"json": {
+        "industry": INDUSTRIES[i % 4], "total_employees": 50, "avg_salary": 80000 + i, "improvement_rate": 20}}),
+    "POST /run-churn-calculator": lambda i: ("POST", "/run-churn-calculator", {"json": {
+        "industry": INDUSTRIES[i % 4], "num_customers": 400 + i, "churn_rate": 8, "avg_revenue": 1200, "cac": 300,
+        "desired_improvement": 2}}),
+    "POST /run-leadership-drag-calculator": lambda i: ("POST", "/run-leadership-drag-calculator", {"json": {
+        "industry": INDUSTRIES[i % 4], "total_employees": 50, "avg_salary": 80000 + i, "leadership_drag": 20}}),
+    "POST /run-workforce-productivity": lambda i: ("POST", "/run-workforce-productivity", {"json": {
+        "industry": INDUSTRIES[i % 4], "total_revenue": 1e7 + i, "payroll_cost": 4e6, "total_employees": 50,
+        "productive_hours": 6000, "target_hours_per_employee": 152, "absenteeism_days": 20, "overtime_hours": 100}}),
+    "POST /run-productivity-dive": lambda i: ("POST", "/run-productivity-dive", {"json": {
+        "industry": INDUSTRIES[i % 4], "total_employees": 50, "avg_salary": 80000 + i, "absenteeism_days": 30,
+        "avg_hours": 140}}),
+    "POST /run-operational-risk": lambda i: ("POST", "/run-operational-risk", {"json": _risk(i)}),
+    "GET /get-industry-benchmarks": lambda i: ("GET", "/get-industry-benchmarks", {"params": {"industry": INDUSTRIES[i % 4]}}),
+    "GET /get-all-industries": lambda i: ("GET", "/get-all-industries", {}),
+    "GET /bootstrap": lambda i: ("GET", "/bootstrap", {}),
+    "POST /profit/compute": lambda i: ("POST", "/profit/compute", {"json": _profit(i)}),
+    "POST /profit/timeseries": lambda i: ("POST", "/profit/timeseries", {"json": {**_profit(i), "months": 60}}),
+    "POST /compare/industries": lambda i: ("POST", "/compare/industries", {"json": {
+        "calculator": "payroll_waste",
+        "inputs": {"industry": "Construction", "total_employees": 50, "avg_salary": 80000 + i, "improvement_rate": 20}}}),
+    "POST /batch/run": lambda i: ("POST", "/batch/run", {"json": {"calculator": "leadership_drag", "columns": {
+        "industry": INDUSTRIES * 25, "total_employees": [50] * 100, "avg_salary": [80000 + i] * 100,
+        "leadership_drag": list(range(100))}}}),
+    "POST /ors/sensitivity": lambda i: ("POST", "/ors/sensitivity", {"json": {
+        "base": _risk(i), "ranges": {"churn_rate": {"start": 1, "stop": 30, "steps": 30},
+                                     "leadership_drag": {"start": 1, "stop": 30, "steps": 30}}}}),
+    "POST /monte-carlo/run": lambda i: ("POST", "/monte-carlo/run", {"json": {
+        "calculator": "operational_risk", "inputs": _risk(i), "draws": 10_000, "seed": i}}),
+    "POST /unlock-user": lambda i: ("POST", "/unlock-user", {"json": {"email": f"user{i}@example.test"}}),
+    "POST /send-risk-report": lambda i: ("POST", "/send-risk-report", {"json": {
+        **_risk(i), "captcha_token": "t", "recipient": f"lead{i}@example.test", "subject": "Your ORS"}}),
+    "POST /send-profit-report": lambda i: ("POST", "/send-profit-report", {"json": {
+        "email": f"lead{i}@example.test", "payload": _profit(i)}}),
+    "POST /api/order-sign": lambda i: ("POST", "/api/order-sign", {"json": _order(i)}),
+    "POST /api/order-sign/upload": lambda i: ("POST", "/api/order-sign/upload", _order_upload(i)),
+}
+
+
+def rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def drive(client, build, concurrency, seconds, counter):
+    samples, errors = [], 0
+    deadline = time.perf_counter() + seconds
+
+    async def worker():
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            counter[0] += 1
+            method, url, kwargs = build(counter[0])
+            start = time.perf_counter()
+            r = await client.request(method, url, **kwargs)
+            samples.append((time.perf_counter() - start) * 1000)
+            if r.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return samples, errors, time.perf_counter() - start
+
+
+async def run(args):
+    results = {}
+    counter = [0]
+    rows = []
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        async with main.app.router.lifespan_context(main.app):
+            await http_client.startup(transport=stub_upstream(args.upstream_delay))
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://app", timeout=60) as client:
+                for label, build in SCENARIOS.items():
+                    if args.only not in label:
+                        continue
+                    await drive(client, build, args.concurrency, min(0.3, args.seconds), counter)  # warm-up
+                    runs = []
+                    for _ in range(args.runs):
+                        samples, errors, elapsed = await drive(client, build, args.concurrency, args.seconds, counter)
+                        runs.append({
+                            "requests": len(samples),
+                            "errors": errors,
+                            "rps": round(len(samples) / elapsed, 1),
+                            "p50_ms": round(regression.percentile(samples, 50), 3),
+                            "p95_ms": round(regression.percentile(samples, 95), 3),
+                            "p99_ms": round(regression.percentile(samples, 99), 3),
+                            "rss_mb": round(rss_mb(), 1),
+                        })
+                    row = regression.median_row(runs)
+                    row["requests"] = sum(r["requests"] for r in runs)
+                    row["errors"] = sum(r["errors"] for r in runs)
+                    results[label] = row
+                    rows.append((label, row))
+    print(f"{'route':<38} {'req':>6} {'err':>4} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'RSS MB':>7}")
+    for label, row in rows:
+        print(f"{label:<38} {row['requests']:6d} {row['errors']:4d} {row['rps']:8,.1f} {row['p50_ms']:8.2f}"
+              f" {row['p95_ms']:8.2f} {row['p99_ms']:8.2f} {row['rss_mb']:7.1f}")
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"peak RSS {peak:.1f} MB · state in {STATE_DIR}")
+    results["process"] = {"peak_rss_mb": round(peak, 1)}
+    failed = [label for label, row in rows if row["errors"]]
+    return results, failed
+
+
+def cli():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=1.0, help="measured time per route, per run")
+    parser.add_argument("--upstream-delay", type=float, default=0.0, help="stub Mailgun/reCAPTCHA/Sheets latency")
+    parser.add_argument("--only", default="", help="substring filter on route labels")
+    regression.add_arguments(parser, tolerance=0.25, runs=3)
+    args = parser.parse_args()
+
+    operational_risk.ORS_LOG_RATE = 0.0
+    results, failed = asyncio.run(run(args))
+    if failed:
+        sys.exit(f"🔥 Routes returned errors: {', '.join(failed)}")
+    if args.only and args.update_baseline:
+        sys.exit("Refusing to write a partial baseline; drop --only.")
+    regression.finish(BASELINE, results, CHECKED, args)
+
+
+if __name__ == "__main__":
+    cli()
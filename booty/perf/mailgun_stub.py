@@ -0,0 +1,46 @@
+"""
+Local Mailgun stand-in for exercising the outbox and load tests.
+
+Run from booty/:
+    uvicorn perf.mailgun_stub:app --port 8025
+and start the app with MAILGUN_API_BASE=http://127.0.0.1:8025.
+
+Behaviour knobs (env):
+    STUB_DELAY        seconds to sleep per message (default 0)
+    STUB_FAIL_RATE    fraction of requests answered with 503 (default 0)
+    STUB_OUTAGE       "1" to answer every request with 503
+"""
+import asyncio
+import os
+import random
+from uuid import uuid4
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+app = FastAPI()
+
+received = []
+
+
+@app.post("/v3/{domain}/messages")
+async def messages(domain: str, request: Request):
+    delay = float(os.getenv("STUB_DELAY", "0"))
+    if delay:
+        await asyncio.sleep(delay)
+    if os.getenv("STUB_OUTAGE") == "1" or random.random() < float(os.getenv("STUB_FAIL_RATE", "0")):
+        return JSONResponse({"message": "Service Unavailable"}, status_code=503)
+
+    body = await request.body()
+    msg_id = f"<{uuid4().hex}@{domain}>"
+    received.append({
+        "id": msg_id,
+        "content_type": request.headers.get("content-type", ""),
+        "bytes": len(body),
+    })
+    return {"id": msg_id, "message": "Queued. Thank you."}
+
+
+@app.get("/_received")
+def list_received():
+    return {"count": len(received), "messages": received[-50:]}
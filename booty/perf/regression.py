@@ -0,0 +1,99 @@
+"""
+Baselines shared by perf/bench_micro.py and perf/load_test.py.
+
+Results are {case: {metric: value}}, each value the median of --runs
+repeats. A metric regresses when it is worse than the stored baseline by more
+than `tolerance` (a fraction) *and* by more than its absolute noise floor, so
+sub-microsecond wobble can't fail a run. Only medians and throughput are
+gated; p95/p99 are printed for reading but swing too much run to run on a
+shared machine to fail a build on.
+Baselines are only comparable on the machine that recorded them; refresh them
+there with --update-baseline after an intentional change.
+"""
+import json
+import os
+import platform
+import statistics
+import sys
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+
+
+def percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+
+def median_row(rows):
+    """Per-metric median of the same case measured several times."""
+    return {metric: round(statistics.median(row[metric] for row in rows), 3) for metric in rows[0]}
+
+
+def machine():
+    return {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()}
+
+
+def _path(name):
+    return os.path.join(BASELINE_DIR, f"{name}.json")
+
+
+def load(name):
+    try:
+        with open(_path(name)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save(name, results):
+    os.makedirs(BASELINE_DIR, exist_ok=True)
+    with open(_path(name), "w") as f:
+        json.dump({"machine": machine(), "results": results}, f, indent=2, sort_keys=True)
+        f.write("\n")
+    print(f"💾 Baseline written: {os.path.relpath(_path(name))}")
+
+
+def compare(name, results, metrics, tolerance):
+    """
+    `metrics` maps metric -> ("lower" | "higher", noise floor). Prints one line per
+    regression and returns how many there were.
+    """
+    baseline = load(name)
+    if baseline is None:
+        print(f"⚠️ No baseline for '{name}'; run with --update-baseline to record one.")
+        return 0
+    if baseline["machine"] != machine():
+        print(f"⚠️ Baseline recorded on {baseline['machine']}; this is {machine()}. Expect noise.")
+
+    regressions = 0
+    for case, values in results.items():
+        base = baseline["results"].get(case)
+        if base is None:
+            continue
+        for metric, (better, floor) in metrics.items():
+            if metric not in values or metric not in base:
+                continue
+            now, before = values[metric], base[metric]
+            worse_by = now - before if better == "lower" else before - now
+            if before and worse_by > max(floor, abs(before) * tolerance):
+                regressions += 1
+                change = (now - before) / abs(before) * 100
+                print(f"🔥 REGRESSION {case} {metric}: {before:,.2f} -> {now:,.2f} ({change:+.1f}%)")
+    if regressions == 0:
+        print(f"✅ No regressions against the '{name}' baseline (tolerance {tolerance:.0%})")
+    return regressions
+
+
+def finish(name, results, metrics, args):
+    """Shared CLI tail: write or check the baseline and exit non-zero on regressions."""
+    if args.update_baseline:
+        save(name, results)
+        return
+    if compare(name, results, metrics, args.tolerance):
+        sys.exit(1)
+
+
+def add_arguments(parser, tolerance, runs=3):
+    parser.add_argument("--runs", type=int, default=runs, help="repeats per case; the median is compared")
+    parser.add_argument("--update-baseline", action="store_true", help="record these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=tolerance, help="allowed slowdown as a fraction")
@@ -0,0 +1,327 @@
+import asyncio
+import cProfile
+import io
+import json
+import os
+import pstats
+import random
+import threading
+import time
+from contextlib import nullcontext
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+from uuid import uuid4
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse
+
+from auth import is_admin, require_admin
+from change_signal import SHARED_STATE_DIR
+from structured_log import sample_rate
+from versioned_files import atomic_write
+
+router = APIRouter(prefix="/admin/profiles", tags=["profiling"], dependencies=[Depends(require_admin)])
+
+# === 1. SETTINGS ===
+# A request is traced when an admin sends `X-Profile: spans|cprofile|pyinstrument`
+# (with X-Admin-Password) or when it's picked by PROFILE_SAMPLE_RATE (spans
+# only). Code marks phases with `with profiling.span("render"):`; on an
+# untraced request that is one ContextVar lookup returning a shared no-op.
+# Traces are written to PROFILE_DIR so any worker can serve them. A cProfile
+# report covers the event loop thread for the whole request (including other
+# requests' coroutines that ran meanwhile) plus threadpool code inside spans.
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(SHARED_STATE_DIR, "profiles"))
+PROFILE_SAMPLE_RATE = sample_rate("PROFILE_SAMPLE_RATE", 0.0)
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "200"))
+PRUNE_EVERY = 20   # saves between directory scans; the dir can run this far past PROFILE_KEEP
+MODES = ("spans", "cprofile", "pyinstrument")
+# Never trace the endpoints used to read traces and metrics
+SKIP_PREFIXES = ("/admin/profiles", "/metrics")
+PSTATS_LINES = 40
+
+_current: ContextVar[Optional["Trace"]] = ContextVar("profiling_trace", default=None)
+_depth: ContextVar[int] = ContextVar("profiling_depth", default=0)
+_NOOP = nullcontext()
+# The cProfile hook is per thread and two profilers on the event loop thread
+# would clobber each other, so only one request is profiled at a time.
+_profiler_lock = threading.Lock()
+_saves = 0
+
+# === 2. TRACES AND SPANS ===
+
+
+class Trace:
+    def __init__(self, method: str, path: str, mode: str, sampled: bool):
+        self.id = uuid4().hex[:12]
+        self.method = method
+        self.path = path
+        self.mode = mode
+        self.sampled = sampled
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.spans: List[Dict] = []
+        self.notes: List[str] = []
+        # thread id -> this trace's cProfile.Profile for that thread
+        self.profilers: Dict[int, cProfile.Profile] = {}
+        self.active = set()
+
+    def start_profiler(self) -> Optional[cProfile.Profile]:
+        """Enable profiling in the calling thread unless it's already on; returns the profiler to disable."""
+        tid = threading.get_ident()
+        if self.mode != "cprofile" or tid in self.active:
+            return None
+        profiler = self.profilers.get(tid) or cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError as e:
+            # Python 3.12+: another profiling tool already owns sys.monitoring
+            self.notes.append(f"cProfile unavailable in thread {tid}: {e}")
+            return None
+        self.profilers[tid] = profiler
+        self.active.add(tid)
+        return profiler
+
+    def stop_profiler(self, profiler: cProfile.Profile):
+        profiler.disable()
+        self.active.discard(threading.get_ident())
+
+
+class _Span:
+    __slots__ = ("trace", "name", "start", "token", "profiler")
+
+    def __init__(self, trace: Trace, name: str):
+        self.trace = trace
+        self.name = name
+
+    def __enter__(self):
+        self.token = _depth.set(_depth.get() + 1)
+        # Sync routes run in the threadpool, out of reach of the loop thread's
+        # profiler; profile their spans in that thread instead
+        self.profiler = self.trace.start_profiler()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        end = time.perf_counter()
+        if self.profiler is not None:
+            self.trace.stop_profiler(self.profiler)
+        depth = _depth.get()
+        _depth.reset(self.token)
+        self.trace.spans.append({
+            "name": self.name,
+            "depth": depth,
+            "start_ms": round((self.start - self.trace.start) * 1000, 3),
+            "duration_ms": round((end - self.start) * 1000, 3),
+            "error": exc[0].__name__ if exc[0] else None,
+        })
+        return False
+
+
+def span(name: str):
+    """Time a phase of the current request when it is being traced; a no-op otherwise."""
+    trace = _current.get()
+    if trace is None:
+        return _NOOP
+    return _Span(trace, name)
+
+# === 3. STORAGE ===
+
+
+def _path(trace_id: str, ext: str) -> str:
+    return os.path.join(PROFILE_DIR, f"{trace_id}.{ext}")
+
+
+def _pstats(trace: Trace) -> Optional[str]:
+    profilers = list(trace.profilers.values())
+    if not profilers:
+        return None
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    out = io.StringIO()
+    stats = pstats.Stats(profilers[0], stream=out)
+    for profiler in profilers[1:]:
+        stats.add(profiler)
+    stats.dump_stats(_path(trace.id, "prof"))
+    stats.sort_stats("cumulative").print_stats(PSTATS_LINES)
+    return out.getvalue()
+
+
+def _save(trace: Trace, route: str, status: str, total: float, report: Optional[str]):
+    global _saves
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    spans = sorted(trace.spans, key=lambda s: s["start_ms"])
+    top_level = sum(s["duration_ms"] for s in spans if s["depth"] == 1)
+    record = {
+        "id": trace.id,
+        "method": trace.method,
+        "path": trace.path,
+        "route": route,
+        "status": status,
+        "mode": trace.mode,
+        "sampled": trace.sampled,
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(trace.started_at)),
+        "total_ms": round(total * 1000, 3),
+        # Routing, body parsing, validation and serialization not covered by a span
+        "unattributed_ms": round(max(0.0, total * 1000 - top_level), 3),
+        "spans": spans,
+        "notes": trace.notes,
+        "report": report,
+    }
+    atomic_write(_path(trace.id, "json"), json.dumps(record).encode())
+    _saves += 1
+    if _saves % PRUNE_EVERY == 0:
+        _prune()
+
+
+def _prune():
+    names = [n for n in os.listdir(PROFILE_DIR) if n.endswith(".json")]
+    if len(names) <= PROFILE_KEEP:
+        return
+    names.sort(key=lambda n: os.path.getmtime(os.path.join(PROFILE_DIR, n)))
+    for name in names[: len(names) - PROFILE_KEEP]:
+        for ext in ("json", "prof"):
+            try:
+                os.remove(_path(name[:-5], ext))
+            except OSError:
+                pass
+
+
+def _load(trace_id: str) -> Dict:
+    if not trace_id.isalnum():
+        raise HTTPException(status_code=404, detail="Profile not found.")
+    try:
+        with open(_path(trace_id, "json"), "rb") as f:
+            return json.loads(f.read())
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Profile not found.")
+
+# === 4. MIDDLEWARE ===
+
+
+def _requested_mode(scope) -> Optional[str]:
+    mode = password = None
+    for key, value in scope["headers"]:
+        if key == b"x-profile":
+            mode = value.decode("latin-1").strip().lower()
+        elif key == b"x-admin-password":
+            password = value.decode("latin-1")
+    if mode is None or not is_admin(password or ""):
+        return None
+    return mode if mode in MODES else "spans"
+
+
+class ProfilingMiddleware:
+    """Pure ASGI; untraced requests cost a header scan and, if sampling is on, one random()."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(SKIP_PREFIXES):
+            return await self.app(scope, receive, send)
+        mode = _requested_mode(scope)
+        sampled = False
+        if mode is None and PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE:
+            mode, sampled = "spans", True
+        if mode is None:
+            return await self.app(scope, receive, send)
+
+        trace = Trace(scope["method"], scope["path"], mode, sampled)
+        status = "500"
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+                message = {**message, "headers": [*message.get("headers", []), (b"x-profile-id", trace.id.encode())]}
+            await send(message)
+
+        profiler = locked = None
+        if mode in ("cprofile", "pyinstrument"):
+            locked = _profiler_lock.acquire(blocking=False)
+            if not locked:
+                trace.notes.append("Another request was being profiled; recorded spans only.")
+                trace.mode = "spans"
+            elif mode == "pyinstrument":
+                try:
+                    from pyinstrument import Profiler
+                    profiler = Profiler(async_mode="enabled")
+                    profiler.start()
+                except ImportError:
+                    trace.notes.append("pyinstrument is not installed; recorded spans only.")
+                    trace.mode = "spans"
+            else:
+                trace.start_profiler()
+
+        token = _current.set(trace)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            total = time.perf_counter() - trace.start
+            _current.reset(token)
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            try:
+                _stop(trace, profiler)
+                # Report rendering and fsynced writes stay off the event loop
+                await asyncio.to_thread(_finish, trace, profiler, route, status, total)
+            except Exception as e:
+                print(f"⚠️ Could not save profile {trace.id}: {e}")
+            finally:
+                if locked:
+                    _profiler_lock.release()
+
+
+def _stop(trace: Trace, profiler):
+    """Turn the profilers off; runs on the event loop thread, which turned them on."""
+    if profiler is not None:
+        profiler.stop()
+    elif trace.mode == "cprofile":
+        for p in trace.profilers.values():
+            p.disable()
+        trace.active.clear()
+
+
+def _finish(trace: Trace, profiler, route: str, status: str, total: float):
+    report = None
+    if profiler is not None:
+        report = profiler.output_text(unicode=True, color=False)
+    elif trace.mode == "cprofile":
+        report = _pstats(trace)
+    _save(trace, route, status, total, report)
+
+# === 5. ROUTES ===
+
+
+@router.get("")
+def list_profiles(limit: int = 50):
+    if not os.path.isdir(PROFILE_DIR):
+        return {"status": "success", "data": []}
+    names = sorted(
+        (n for n in os.listdir(PROFILE_DIR) if n.endswith(".json")),
+        key=lambda n: os.path.getmtime(os.path.join(PROFILE_DIR, n)),
+        reverse=True,
+    )
+    summaries = []
+    for name in names[:limit]:
+        try:
+            record = _load(name[:-5])
+        except HTTPException:
+            continue  # pruned meanwhile
+        record.pop("report", None)
+        summaries.append(record)
+    return {"status": "success", "data": summaries}
+
+
+@router.get("/{trace_id}")
+def get_profile(trace_id: str):
+    return {"status": "success", "data": _load(trace_id)}
+
+
+@router.get("/{trace_id}/pstats")
+def download_pstats(trace_id: str):
+    """Raw cProfile dump for snakeviz / pstats."""
+    _load(trace_id)
+    path = _path(trace_id, "prof")
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="No cProfile dump for this trace.")
+    return FileResponse(path, media_type="application/octet-stream", filename=f"{trace_id}.prof")
@@ -1,7 +1,9 @@
 # booty/profit_projection.py
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
+
+from benchmark_store import benchmark_store
 
 router = APIRouter(prefix="/profit", tags=["profit-projection"])
 
@@ -42,6 +44,21 @@ class ProfitRequest(BaseModel):
     scenarios: Scenarios = Scenarios()
 
 
+class TimeSeriesRequest(ProfitRequest):
+    industry: Optional[str] = None
+    months: int = Field(default=36, ge=1, le=600)
+    # How many months the inputs/savings/ORS figures cover (12 = annual figures)
+    periodMonths: int = Field(default=12, ge=1, le=120)
+    # Savings phase in linearly over this many months (0 = full effect from month 1)
+    rampMonths: int = Field(default=6, ge=0, le=120)
+    # Overrides the industry's "Avg Customer Lifetime (months)" benchmark
+    customerLifetimeMonths: Optional[float] = Field(default=None, ge=1)
+
+
+class TimeSeriesBatchRequest(BaseModel):
+    items: List[TimeSeriesRequest] = Field(min_length=1, max_length=1000)
+
+
 class ProfitScenario(BaseModel):
     gross: float
     net: float
@@ -122,6 +139,112 @@ def compute_projection(req: ProfitRequest) -> ProfitResponse:
 
     return ProfitResponse(period=req.period, computed=computed, results=results)
 
+# ---------- Time series ----------
+# Month-by-month projection of the same four scenarios. Savings and ORS recovery
+# ramp in linearly. Churn recovery builds up as cohorts: savings.churn per month
+# is the steady-state revenue from all saved customers still paying, so each
+# month saves 1/lifetime of that (customers saved per month x revenue per
+# customer per month), and earlier cohorts keep paying at monthly survival
+# 1 - 1/lifetime. Recovery approaches the static monthly figure from below, so
+# no year of `fixes` exceeds /profit/compute. All requests in a batch are
+# evaluated as one (items, scenario, month) array.
+
+SCENARIOS = ["now", "fixes", "ors", "best"]
+LIFETIME_COLUMN = "Avg Customer Lifetime (months) (Value)"
+DEFAULT_CUSTOMER_LIFETIME = 24.0
+
+
+def _customer_lifetime(req: TimeSeriesRequest) -> tuple[float, str]:
+    if req.customerLifetimeMonths is not None:
+        return float(req.customerLifetimeMonths), "input"
+    row = benchmark_store.get().get(req.industry) if req.industry else None
+    value = row.get(LIFETIME_COLUMN) if row else None
+    if isinstance(value, (int, float)) and value >= 1:
+        return float(value), "benchmark"
+    return DEFAULT_CUSTOMER_LIFETIME, "default"
+
+
+def _retained(np, r, s):
+    """
+    y[..., t] = s * y[..., t-1] + r[..., t] along the last axis, i.e. each month's
+    recovery decays geometrically. Uses y = s^t * cumsum(r / s^k) in blocks short
+    enough that s^-k can't overflow, rather than stepping month by month.
+    """
+    n = r.shape[-1]
+    s = np.broadcast_to(s, r.shape[:-1] + (1,))
+    live = s > 0
+    if not live.any():
+        return r.copy()
+    s_safe = np.where(live, s, 1.0)
+    block = max(1, int(300 / -np.log(min(float(s_safe.min()), 1 - 1e-12))))
+    out = np.empty_like(r)
+    carry = np.zeros(r.shape[:-1] + (1,))
+    for start in range(0, n, block):
+        seg = r[..., start:start + block]
+        powers = s_safe ** np.arange(seg.shape[-1])
+        out[..., start:start + block] = powers * (carry * s_safe + np.cumsum(seg / powers, axis=-1))
+        carry = out[..., start + seg.shape[-1] - 1:start + seg.shape[-1]]
+    return np.where(live, out, r)
+
+
+def project_series(reqs: List[TimeSeriesRequest]) -> List[dict]:
+    import numpy as np
+
+    months = max(r.months for r in reqs)
+    per_month, fixes, churn, ors, lifetimes, sources = [], [], [], [], [], []
+    for r in reqs:
+        _, np_now = compute_now(r.inputs)
+        s = r.savings
+        lifetime, source = _customer_lifetime(r)
+        per_month.append(np_now / r.periodMonths)
+        fixes.append((_safe(s.payroll) + _safe(s.workforce) + _safe(s.deepDive) + _safe(s.leadership)) / r.periodMonths
+                     if r.scenarios.applyFixes else 0.0)
+        churn.append(_safe(s.churn) / r.periodMonths if r.scenarios.applyFixes else 0.0)
+        ors.append(_safe(r.ors.get("ebitdaAtRisk", 0)) / r.periodMonths if r.scenarios.applyORS else 0.0)
+        lifetimes.append(lifetime)
+        sources.append(source)
+
+    col = lambda v: np.asarray(v, dtype=float)[:, None]  # noqa: E731  (items, 1)
+    t = np.arange(months, dtype=float)
+    ramp_len = col([r.rampMonths for r in reqs])
+    ramp = np.where(ramp_len > 0, np.minimum(1.0, (t + 1) / np.maximum(ramp_len, 1)), 1.0)  # (items, months)
+
+    survival = 1 - 1 / col(lifetimes)
+    # Each month's new cohort: the share of the steady-state recovery that leaves each month
+    fix_gain = col(fixes) * ramp + _retained(np, col(churn) * (1 - survival) * ramp, survival)
+    ors_gain = col(ors) * ramp
+    # (items, scenario, month): now, fixes, ors, best
+    delta = np.stack([np.zeros_like(ramp), fix_gain, ors_gain, fix_gain + ors_gain], axis=1)
+    net = col(per_month)[:, :, None] + delta
+    cumulative = np.cumsum(delta, axis=-1)
+
+    # Round and convert once for the whole batch; per-item slicing is then plain lists
+    net_l, delta_l, cum_l = (a.round(2).tolist() for a in (net, delta, cumulative))
+    results = []
+    for i, r in enumerate(reqs):
+        n = r.months
+        series, totals = {}, {}
+        for j, name in enumerate(SCENARIOS):
+            series[name] = {
+                "net": net_l[i][j][:n],
+                "delta_vs_now": delta_l[i][j][:n],
+                "cumulative_delta": cum_l[i][j][:n],
+            }
+            totals[name] = {
+                "net": round(float(net[i, j, :n].sum()), 2),
+                "delta_vs_now": cum_l[i][j][n - 1],
+                "final_month_net": net_l[i][j][n - 1],
+            }
+        results.append({
+            "period": r.period,
+            "months": n,
+            "customer_lifetime_months": lifetimes[i],
+            "customer_lifetime_source": sources[i],
+            "series": series,
+            "totals": totals,
+        })
+    return results
+
 # ---------- Routes ----------
 
 
@@ -136,3 +259,20 @@ def compute(req: ProfitRequest):
         return compute_projection(req)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/timeseries")
+def timeseries(req: TimeSeriesRequest):
+    try:
+        return project_series([req])[0]
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/timeseries/batch")
+def timeseries_batch(req: TimeSeriesBatchRequest):
+    """Many projections in one call; they share a single array evaluation."""
+    try:
+        return {"results": project_series(req.items)}
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -0,0 +1,225 @@
+import asyncio
+import hashlib
+import math
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional, Tuple
+
+from fastapi import Depends, HTTPException, Request
+
+import metrics
+from change_signal import SHARED_STATE_DIR
+
+# === 1. SETTINGS ===
+# The routes that spend Mailgun, reCAPTCHA or Apps Script quota are guarded
+# before any work starts: a token bucket per client IP, one per email address,
+# and a per-worker cap on guarded requests in flight. Over any of them the
+# request gets a 429 with Retry-After. Calculator routes are never guarded.
+# /unlock-user must always answer 200, so it calls check() itself and simply
+# skips logging when a bucket is empty.
+# Buckets live in this process's memory; RATE_LIMIT_BACKEND=sqlite keeps them
+# in one SQLite file in SHARED_STATE_DIR so every gunicorn worker on the host
+# shares them (gunicorn.conf.py selects it when there is more than one worker).
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") != "0"
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+RATE_LIMIT_DB = os.getenv("RATE_LIMIT_DB", os.path.join(SHARED_STATE_DIR, "rate_limits.sqlite3"))
+MAX_IN_FLIGHT = int(os.getenv("RATE_LIMIT_MAX_IN_FLIGHT", "32"))
+# How many proxies append to X-Forwarded-For in front of the app (Render: one).
+# The client address is that many entries from the right; entries further left
+# are whatever the client sent and can't be trusted.
+PROXY_HOPS = int(os.getenv("RATE_LIMIT_PROXY_HOPS", "1"))
+MAX_MEMORY_BUCKETS = 50_000
+PRUNE_EVERY = 1000          # SQLite takes between deletes of idle buckets
+PRUNE_AGE = 24 * 3600.0     # SQLite buckets idle this long are deleted; longer than any refill window
+
+# route -> key kind -> "requests/seconds"; override with e.g. RATE_LIMIT_ORDER_IP=20/3600
+DEFAULT_LIMITS = {
+    "risk_report": {"ip": "10/600", "email": "5/3600"},
+    "profit_report": {"ip": "10/600", "email": "5/3600"},
+    "unlock": {"ip": "30/600", "email": "20/3600"},
+    "order": {"ip": "10/3600", "email": "5/3600"},
+}
+
+
+def _parse(spec: str) -> Tuple[float, float]:
+    """Parse "10/600": a burst of 10, refilled at 10/600 tokens per second."""
+    count, seconds = spec.split("/")
+    return float(count), float(count) / float(seconds)
+
+
+LIMITS = {
+    route: {kind: _parse(os.getenv(f"RATE_LIMIT_{route.upper()}_{kind.upper()}", spec)) for kind, spec in kinds.items()}
+    for route, kinds in DEFAULT_LIMITS.items()
+}
+
+_rejected: Dict[Tuple[str, str], int] = {}
+_in_flight = 0
+
+# === 2. BUCKETS ===
+
+
+def _refill(tokens: float, updated: float, capacity: float, rate: float, now: float) -> float:
+    return min(capacity, tokens + max(0.0, now - updated) * rate)
+
+
+def _wait(tokens: float, rate: float) -> int:
+    """Seconds until the bucket holds a whole token again."""
+    return max(1, math.ceil((1.0 - tokens) / rate))
+
+
+class MemoryBuckets:
+    blocking = False
+
+    def __init__(self):
+        # key -> (tokens, updated, time the bucket is full again)
+        self._buckets: Dict[str, Tuple[float, float, float]] = {}
+        self._lock = threading.Lock()
+        self._sweep_at = MAX_MEMORY_BUCKETS
+
+    def take(self, key: str, capacity: float, rate: float) -> int:
+        """Spend one token; returns 0 when allowed, else the Retry-After seconds."""
+        now = time.time()
+        with self._lock:
+            tokens, updated, _ = self._buckets.get(key, (capacity, now, now))
+            tokens = _refill(tokens, updated, capacity, rate, now)
+            allowed = tokens >= 1.0
+            if allowed:
+                tokens -= 1.0
+            self._buckets[key] = (tokens, now, now + (capacity - tokens) / rate)
+            if len(self._buckets) > self._sweep_at:
+                self._sweep(now)
+        return 0 if allowed else _wait(tokens, rate)
+
+    def _sweep(self, now: float):
+        # A bucket that has refilled is the same as no bucket
+        self._buckets = {k: v for k, v in self._buckets.items() if v[2] > now}
+        self._sweep_at = max(MAX_MEMORY_BUCKETS, 2 * len(self._buckets))
+
+
+class SqliteBuckets:
+    _SCHEMA = "CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+    # take() can wait up to 5 s on the write lock, so callers run it off the event loop
+    blocking = True
+
+    def __init__(self, path: str = RATE_LIMIT_DB):
+        self.path = path
+        self._takes = 0
+        self._ready = False
+
+    @contextmanager
+    def _db(self):
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        try:
+            if not self._ready:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(self._SCHEMA)
+                self._ready = True
+            conn.execute("PRAGMA synchronous=NORMAL")
+            yield conn
+        finally:
+            conn.close()
+
+    def take(self, key: str, capacity: float, rate: float) -> int:
+        now = time.time()
+        with self._db() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+                tokens = _refill(*(row or (capacity, now)), capacity, rate, now)
+                allowed = tokens >= 1.0
+                conn.execute(
+                    "INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)",
+                    (key, tokens - 1.0 if allowed else tokens, now),
+                )
+                self._takes += 1
+                if self._takes % PRUNE_EVERY == 0:
+                    conn.execute("DELETE FROM buckets WHERE updated < ?", (now - PRUNE_AGE,))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return 0 if allowed else _wait(tokens, rate)
+
+
+buckets = SqliteBuckets() if RATE_LIMIT_BACKEND == "sqlite" else MemoryBuckets()
+
+# === 3. CHECKS ===
+
+
+def _reject(route: str, reason: str, retry_after: int):
+    _rejected[(route, reason)] = _rejected.get((route, reason), 0) + 1
+    print(f"🚦 {route} rate limited ({reason}), retry in {retry_after}s")
+    raise HTTPException(
+        status_code=429,
+        detail="Too many requests. Please try again shortly.",
+        headers={"Retry-After": str(retry_after)},
+    )
+
+
+async def check(route: str, kind: str, value) -> None:
+    """Spend a token from `route`'s `kind` bucket for `value`; raises 429 when it's empty."""
+    value = str(value or "").strip().lower()
+    if not RATE_LIMIT_ENABLED or not value:
+        return
+    capacity, rate = LIMITS[route][kind]
+    # Hashed so the shared backend doesn't store addresses
+    key = f"{route}:{kind}:{hashlib.sha1(value.encode()).hexdigest()[:20]}"
+    if buckets.blocking:
+        retry_after = await asyncio.to_thread(buckets.take, key, capacity, rate)
+    else:
+        retry_after = buckets.take(key, capacity, rate)
+    if retry_after:
+        _reject(route, kind, retry_after)
+
+
+def client_ip(request: Request) -> str:
+    forwarded = request.headers.get("x-forwarded-for")
+    if forwarded and PROXY_HOPS > 0:
+        hops = [h.strip() for h in forwarded.split(",") if h.strip()]
+        if hops:
+            return hops[-min(PROXY_HOPS, len(hops))]
+    return request.client.host if request.client else ""
+
+
+def guard(route: str, email: Optional[Callable[[Dict], object]] = None):
+    """
+    Route dependency: IP bucket, then (for JSON bodies, when `email` picks the
+    address out of the body) the email bucket, then an in-flight slot held
+    until the endpoint returns.
+    """
+
+    async def dependency(request: Request):
+        global _in_flight
+        if not RATE_LIMIT_ENABLED:
+            yield
+            return
+        await check(route, "ip", client_ip(request))
+        if email is not None:
+            try:
+                body = await request.json()  # cached on the request for the endpoint
+            except Exception:
+                body = None
+            if isinstance(body, dict):
+                await check(route, "email", email(body))
+        if _in_flight >= MAX_IN_FLIGHT:
+            _reject(route, "in_flight", 1)
+        _in_flight += 1
+        try:
+            yield
+        finally:
+            _in_flight -= 1
+
+    return Depends(dependency)
+
+
+metrics.counter_func(
+    "clarity_rate_limited_total",
+    "Requests refused with 429, by route and limit (ip, email, in_flight)",
+    ("route", "limit"),
+    lambda: dict(_rejected),
+)
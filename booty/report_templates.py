@@ -0,0 +1,191 @@
+"""
+Precompiled HTML email templates for the ORS and Profit reports.
+
+Templates live in templates/*.html with `{{ slot }}` placeholders. Each file
+is compiled once into a Python function whose body is a single f-string, so the
+static chrome (styles, logo, footer, labels) becomes code constants and a render
+costs the same as the old inline f-strings, without the HTML living in main.py.
+The static fragments are also kept pre-encoded so callers that need bytes can
+join them directly instead of encoding the whole document per send.
+"""
+import functools
+import html
+import keyword
+import os
+import re
+import threading
+
+import profiling
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+SLOT = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+
+# === 1. COMPILED TEMPLATES ===
+
+
+class Template:
+    __slots__ = ("name", "slots", "_order", "_render", "_static_bytes")
+
+    def __init__(self, name, source):
+        parts = SLOT.split(source)
+        static, slots = parts[0::2], parts[1::2]
+        for slot in slots:
+            if keyword.iskeyword(slot):
+                raise ValueError(f"{name}: slot name '{slot}' is a Python keyword")
+        self.name = name
+        self.slots = tuple(dict.fromkeys(slots))
+        self._order = tuple(slots)
+        self._render = self._compile(static, slots)
+        self._static_bytes = [p.encode("utf-8") for p in static]
+
+    def _compile(self, static, slots):
+        body = "".join(
+            text.replace("{", "{{").replace("}", "}}") + (f"{{{slots[i]}}}" if i < len(slots) else "")
+            for i, text in enumerate(static)
+        )
+        namespace = {}
+        exec(f"def render({', '.join(self.slots)}):\n    return f{body!r}\n", namespace)
+        return namespace["render"]
+
+    def render(self, values) -> str:
+        """`values` maps every slot name to a number or an already-escaped string."""
+        return self._render(**values)
+
+    def render_bytes(self, values) -> bytes:
+        out = [None] * (len(self._static_bytes) + len(self._order))
+        out[0::2] = self._static_bytes
+        out[1::2] = [str(values[s]).encode("utf-8") for s in self._order]
+        return b"".join(out)
+
+
+_compiled = {}
+_lock = threading.Lock()
+
+
+def get(name) -> Template:
+    template = _compiled.get(name)
+    if template is None:
+        with _lock:
+            template = _compiled.get(name)
+            if template is None:
+                with open(os.path.join(TEMPLATE_DIR, name), encoding="utf-8") as f:
+                    template = _compiled[name] = Template(name, f.read())
+    return template
+
+
+def load():
+    """Compile every template up front so the first send doesn't pay for it."""
+    for name in sorted(os.listdir(TEMPLATE_DIR)):
+        if name.endswith(".html"):
+            get(name)
+    print(f"🧩 Report templates compiled: {len(_compiled)}")
+
+# === 2. FORMATTING ===
+
+_NUMBER = (int, float)
+_escape = html.escape
+
+
+def format_dollars(value):
+    if type(value) in _NUMBER:
+        return f"${value:,.0f}"
+    if value is None or value == "N/A":
+        return "$N/A"
+    try:
+        return f"${float(value):,.0f}"
+    except (TypeError, ValueError):
+        return "$N/A"
+
+
+def _text(value):
+    # Numbers can't carry markup and are formatted by the compiled f-string itself;
+    # only user-supplied strings need escaping
+    if type(value) in _NUMBER:
+        return value
+    return _escape(str(value), quote=False)
+
+
+def _signed_dollars(delta):
+    cls, sign = ("pos", "+") if (delta or 0) >= 0 else ("neg", "")
+    return f'<span class="{cls}">{sign}{format_dollars(delta)}</span>'
+
+# === 3. REPORTS ===
+
+ORS_TEXT_FIELDS = (
+    "ebitda_margin", "ebitda_risk_pct", "industry", "total_employees", "num_customers",
+    "churn_rate", "desired_improvement", "leadership_drag", "productive_hours",
+    "target_hours_per_employee", "avg_hours", "overtime_hours", "absenteeism_days",
+    "improvement_rate",
+)
+ORS_DOLLAR_FIELDS = ("total_risk_dollars", "avg_salary", "total_revenue", "avg_revenue", "cac", "payroll_cost")
+ORS_MODULE_SLOTS = {
+    "loss_payroll_waste": "Payroll Waste",
+    "loss_customer_churn": "Customer Churn",
+    "loss_leadership_drag": "Leadership Drag",
+    "loss_workforce_productivity": "Workforce Productivity",
+    "loss_productivity_dive": "Productivity (Deep Dive)",
+}
+
+
+def ors_report_values(data):
+    breakdown = data.get("module_breakdown") or {}
+    values = {k: _text(data.get(k, "N/A")) for k in ORS_TEXT_FIELDS}
+    values.update((k, format_dollars(data.get(k))) for k in ORS_DOLLAR_FIELDS)
+    values.update((slot, format_dollars(breakdown.get(label))) for slot, label in ORS_MODULE_SLOTS.items())
+    return values
+
+
+def render_report_html(data):
+    with profiling.span("render"):
+        return get("ors_report.html").render(ors_report_values(data))
+
+
+@functools.lru_cache(maxsize=None)
+def recipient_variables_html(name):
+    """
+    The template with every slot left as a Mailgun `%recipient.slot%` placeholder,
+    so one body serves a whole batch send and each recipient's values travel in
+    `recipient-variables`.
+    """
+    template = get(name)
+    return template.render({slot: f"%recipient.{slot}%" for slot in template.slots})
+
+
+def profit_report_values(recipient, payload, result):
+    payload = payload or {}
+    inputs = payload.get("inputs") or {}
+    savings = payload.get("savings") or {}
+    scenarios = payload.get("scenarios") or {}
+    results = (result or {}).get("results") or {}
+    computed = (result or {}).get("computed") or {}
+    now = results.get("now") or {}
+    fixes = results.get("fixes") or {}
+    ors = results.get("ors") or {}
+
+    return {
+        "period": _text(payload.get("period") or "This Period"),
+        "recipient": _text(recipient),
+        "revenue": format_dollars(inputs.get("revenue")),
+        "cogs": format_dollars(inputs.get("cogs")),
+        "opex": format_dollars(inputs.get("opex")),
+        "gross_now": format_dollars(now.get("gross")),
+        "net_now": format_dollars(now.get("net")),
+        "savings_payroll": format_dollars(savings.get("payroll")),
+        "savings_churn": format_dollars(savings.get("churn")),
+        "savings_leadership": format_dollars(savings.get("leadership")),
+        "savings_workforce": format_dollars(savings.get("workforce")),
+        "savings_deep_dive": format_dollars(savings.get("deepDive")),
+        "total_savings": format_dollars(computed.get("totalSavings", 0.0)),
+        "ors_risk": format_dollars(computed.get("orsEbitdaAtRisk", 0.0)),
+        "apply_fixes": str(bool(scenarios.get("applyFixes"))).lower(),
+        "net_fixes": format_dollars(fixes.get("net")),
+        "delta_fixes": _signed_dollars(fixes.get("delta_vs_now")),
+        "apply_ors": str(bool(scenarios.get("applyORS"))).lower(),
+        "net_ors": format_dollars(ors.get("net")),
+        "delta_ors": _signed_dollars(ors.get("delta_vs_now")),
+    }
+
+
+def render_profit_report_html(recipient: str, payload: dict, result: dict) -> str:
+    with profiling.span("render"):
+        return get("profit_report.html").render(profit_report_values(recipient, payload, result))
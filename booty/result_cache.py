@@ -0,0 +1,140 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import Response
+
+import metrics
+import profiling
+from auth import require_admin
+from benchmark_store import benchmark_store
+
+router = APIRouter(prefix="/admin/cache", tags=["cache"], dependencies=[Depends(require_admin)])
+
+# === 1. CACHE ===
+
+
+class ResultCache:
+    """
+    Bounded LRU of encoded JSON responses with a TTL.
+    Keys hash the route name, the benchmark version and the validated model, so
+    benchmark updates never serve stale results; the store also clears the
+    cache outright when its table changes.
+    """
+
+    def __init__(self, max_entries=5000, max_bytes=32 * 1024 * 1024, ttl=600.0):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes = 0
+        self._data = OrderedDict()  # key -> (expires_at, body)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(name, model):
+        version = benchmark_store.get().version
+        raw = f"{name}|{version}|{model.model_dump_json()}".encode()
+        return hashlib.blake2b(raw, digest_size=16).digest()
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, body = entry
+            if expires_at < now:
+                del self._data[key]
+                self.bytes -= len(body)
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def put(self, key, body: bytes):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.bytes -= len(old[1])
+            self._data[key] = (time.monotonic() + self.ttl, body)
+            self.bytes += len(body)
+            while len(self._data) > self.max_entries or self.bytes > self.max_bytes:
+                _, (_, evicted) = self._data.popitem(last=False)
+                self.bytes -= len(evicted)
+                self.evictions += 1
+
+    def clear(self, *_):
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+
+    def respond(self, name, model, compute):
+        """Return the cached response for `model`, computing and storing it on a miss."""
+        with profiling.span("cache_lookup"):
+            key = self.key(name, model)
+            body = self.get(key)
+        if body is None:
+            with profiling.span("compute"):
+                result = compute()
+            with profiling.span("encode"):
+                body = json.dumps(result, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            self.put(key, body)
+        return Response(content=body, media_type="application/json")
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "bytes": self.bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+result_cache = ResultCache(
+    max_entries=int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "5000")),
+    max_bytes=int(os.getenv("RESULT_CACHE_MAX_BYTES", str(32 * 1024 * 1024))),
+    ttl=float(os.getenv("RESULT_CACHE_TTL", "600")),
+)
+benchmark_store.on_change(result_cache.clear)
+metrics.counter_func(
+    "clarity_result_cache_lookups_total",
+    "Calculator result cache lookups",
+    ("result",),
+    lambda: {("hit",): result_cache.hits, ("miss",): result_cache.misses},
+)
+metrics.counter_func(
+    "clarity_result_cache_evictions_total",
+    "Entries evicted from the calculator result cache for size",
+    (),
+    lambda: {(): result_cache.evictions},
+)
+
+# === 2. ROUTES ===
+
+
+@router.get("/stats")
+def cache_stats():
+    return {"status": "success", "data": result_cache.stats()}
+
+
+@router.post("/clear")
+def cache_clear():
+    result_cache.clear()
+    return {"status": "success", "message": "Result cache cleared."}
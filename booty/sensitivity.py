@@ -0,0 +1,160 @@
+import math
+import os
+from typing import Dict, List, Optional
+
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel, Field
+
+from operational_risk import RiskInput
+
+router = APIRouter(prefix="/ors", tags=["ors-sensitivity"])
+
+MAX_GRID_POINTS = int(os.getenv("ORS_MAX_GRID_POINTS", "1000000"))
+MAX_RETURNED_POINTS = 10000
+SWEEPABLE = [name for name, f in RiskInput.model_fields.items() if f.annotation in (int, float)]
+
+# === Models ===
+
+
+class SweepRange(BaseModel):
+    # Either an explicit list of values, or start/stop/steps (inclusive, evenly spaced)
+    values: Optional[List[float]] = None
+    start: Optional[float] = None
+    stop: Optional[float] = None
+    steps: int = Field(default=11, ge=1, le=100000)
+
+
+class SensitivityRequest(BaseModel):
+    base: RiskInput = RiskInput()
+    ranges: Dict[str, SweepRange]
+    include_grid: bool = False
+
+# === Helpers ===
+
+
+def _axis_length(r: SweepRange) -> int:
+    return len(r.values) if r.values else r.steps
+
+
+def _axis(np, name, r: SweepRange):
+    if r.values:
+        return np.asarray(r.values, dtype=float)
+    if r.start is None or r.stop is None:
+        raise ValueError(f"Range for '{name}' needs 'values' or both 'start' and 'stop'.")
+    return np.linspace(r.start, r.stop, r.steps)
+
+
+def _summary(np, arr):
+    p10, p50, p90 = np.percentile(arr, [10, 50, 90])
+    return {
+        "min": round(float(arr.min()), 2),
+        "p10": round(float(p10), 2),
+        "p50": round(float(p50), 2),
+        "p90": round(float(p90), 2),
+        "max": round(float(arr.max()), 2),
+    }
+
+
+def _evaluate(vectorized, base, overrides):
+    x = dict(base)
+    x.update(overrides)
+    return vectorized.operational_risk(x)
+
+# === Route ===
+
+
+@router.post("/sensitivity")
+def ors_sensitivity(req: SensitivityRequest):
+    """
+    Evaluates the ORS over the Cartesian grid of `ranges` (other fields from `base`)
+    and ranks inputs by how far they move EBITDA-at-risk.
+    """
+    # Deferred so numpy stays off the cold-start import path
+    import numpy as np
+    import vectorized
+
+    unknown = [k for k in req.ranges if k not in SWEEPABLE]
+    if unknown:
+        raise HTTPException(status_code=422, detail=f"Cannot sweep {unknown}; choose from {SWEEPABLE}")
+    if not req.ranges:
+        raise HTTPException(status_code=422, detail="Provide at least one range.")
+
+    # Sized from the request before any array exists; math.prod on Python ints
+    # can't wrap around the way an int64 product does
+    shape = tuple(_axis_length(r) for r in req.ranges.values())
+    for name, length in zip(req.ranges, shape):
+        if length > MAX_GRID_POINTS:
+            raise HTTPException(status_code=413, detail=f"Range for '{name}' has {length} values (max {MAX_GRID_POINTS}).")
+    points = math.prod(shape)
+    if points > MAX_GRID_POINTS:
+        raise HTTPException(status_code=413, detail=f"Grid has {points} points (max {MAX_GRID_POINTS}).")
+
+    try:
+        axes = {name: _axis(np, name, r) for name, r in req.ranges.items()}
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    base = {k: np.float64(v) for k, v in req.base.model_dump().items() if k in SWEEPABLE}
+
+    # Full grid: each axis is a sparse open mesh, broadcasting does the rest
+    mesh = dict(zip(axes, np.meshgrid(*axes.values(), indexing="ij", sparse=True)))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        grid = _evaluate(vectorized, base, mesh)
+        base_result = _evaluate(vectorized, base, {})
+    risk = np.broadcast_to(grid["total_risk_dollars"], shape)
+    pct = np.broadcast_to(grid["ebitda_risk_pct"], shape)
+    base_pct = float(base_result["ebitda_risk_pct"])
+
+    # Tornado: one input at a time across its range, everything else at base
+    tornado = []
+    for name, axis in axes.items():
+        with np.errstate(divide="ignore", invalid="ignore"):
+            one = _evaluate(vectorized, base, {name: axis})
+        y = np.broadcast_to(one["ebitda_risk_pct"], axis.shape)
+        lo_x, hi_x = float(axis.min()), float(axis.max())
+        y_lo, y_hi = float(y[axis.argmin()]), float(y[axis.argmax()])
+        x0 = float(base[name])
+        elasticity = None
+        if base_pct and x0 and hi_x != lo_x:
+            elasticity = round(((y_hi - y_lo) / base_pct) / ((hi_x - lo_x) / x0), 4)
+        tornado.append({
+            "input": name,
+            "base_value": x0,
+            "range": [lo_x, hi_x],
+            "ebitda_risk_pct_low": round(float(y.min()), 2),
+            "ebitda_risk_pct_high": round(float(y.max()), 2),
+            "swing_pct_points": round(float(y.max() - y.min()), 2),
+            "elasticity": elasticity,
+        })
+    tornado.sort(key=lambda t: t["swing_pct_points"], reverse=True)
+
+    def at(flat_index):
+        pos = np.unravel_index(flat_index, shape)
+        return {name: float(axes[name][i]) for name, i in zip(axes, pos)}
+
+    result = {
+        "points": points,
+        "shape": {name: len(a) for name, a in axes.items()},
+        "base": {
+            "total_risk_dollars": round(float(base_result["total_risk_dollars"]), 2),
+            "ebitda_risk_pct": round(base_pct, 1),
+        },
+        "total_risk_dollars": _summary(np, risk),
+        "ebitda_risk_pct": _summary(np, pct),
+        "worst_case": at(int(np.argmax(pct))),
+        "best_case": at(int(np.argmin(pct))),
+        "tornado": tornado,
+    }
+
+    if req.include_grid:
+        if points > MAX_RETURNED_POINTS:
+            raise HTTPException(
+                status_code=413,
+                detail=f"include_grid is limited to {MAX_RETURNED_POINTS} points; this grid has {points}.",
+            )
+        result["axes"] = {name: a.tolist() for name, a in axes.items()}
+        result["grid"] = {
+            "total_risk_dollars": np.round(risk, 2).tolist(),
+            "ebitda_risk_pct": np.round(pct, 2).tolist(),
+        }
+    return result
@@ -0,0 +1,109 @@
+"""
+Monte Carlo engine for the calculators and the ORS.
+
+Each benchmark value is treated as a normal distribution centred on the
+published value, with a relative standard deviation of (100 - certainty) / 100
+taken from its "(Certainty)" column. Draws are clipped at zero since no
+benchmark can go negative. Everything is vectorized over the draws.
+"""
+import re
+
+import numpy as np
+
+import vectorized
+
+# ORS inputs the UI pre-fills from benchmarks, and the benchmark whose certainty sets their spread
+ORS_BENCHMARK_INPUTS = {
+    "churn_rate": "Customer Churn Rate (%) (Value)",
+    "leadership_drag": "Leadership Drag Impact (%) (Value)",
+    "improvement_rate": "Process Inefficiency Rate (%) (Value)",
+    "cac": "Customer Acquisition Cost (CAC) (AUD) (Value)",
+    "avg_revenue": "Avg Customer Spend (AUD/month) (Value)",
+}
+
+# === 1. SAMPLING ===
+
+
+def certainty_columns(value_column):
+    """
+    Candidate certainty columns for a value column. Most follow 'X (unit) (Value)'
+    -> 'X (unit) (Certainty)', but some drop the unit, e.g.
+    'Customer Acquisition Cost (CAC) (AUD) (Value)' -> '... (CAC) (Certainty)'.
+    """
+    if not value_column.endswith(" (Value)"):
+        return []
+    candidates = [value_column[: -len(" (Value)")] + " (Certainty)"]
+    short = re.sub(r" \([^()]*\) \(Value\)$", " (Certainty)", value_column)
+    if short != value_column:
+        candidates.append(short)
+    return candidates
+
+
+def relative_sd(row, value_column):
+    for key in certainty_columns(value_column):
+        certainty = row.get(key)
+        if isinstance(certainty, (int, float)):
+            return (100.0 - min(100.0, max(0.0, float(certainty)))) / 100.0
+    return 0.0  # no certainty published: treat as exact
+
+
+def _draw(rng, mean, rel_sd, draws):
+    if not rel_sd or not mean:
+        return np.full(draws, float(mean))
+    return np.maximum(rng.normal(mean, abs(mean) * rel_sd, draws), 0.0)
+
+
+class BenchmarkSampler:
+    """Benchmark accessor for the kernels that returns `draws` samples per column."""
+
+    def __init__(self, row, rng, draws):
+        self.row = row
+        self.rng = rng
+        self.draws = draws
+        self._cache = {}
+
+    def __call__(self, column, default):
+        samples = self._cache.get(column)
+        if samples is None:
+            mean = self.row.get(column, default)
+            if not isinstance(mean, (int, float)):
+                mean = default
+            samples = self._cache[column] = _draw(self.rng, mean, relative_sd(self.row, column), self.draws)
+        return samples
+
+# === 2. SIMULATION ===
+
+
+def simulate(calculator, row, inputs, draws, seed):
+    """
+    One chunk of draws. `row` is the industry's benchmark record, `inputs` the
+    scenario (dict of field -> float). Returns {output: samples}.
+    """
+    rng = np.random.default_rng(seed)
+
+    if calculator == "operational_risk":
+        x = {k: np.float64(v) for k, v in inputs.items()}
+        for field, column in ORS_BENCHMARK_INPUTS.items():
+            x[field] = _draw(rng, inputs[field], relative_sd(row, column), draws)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            result = vectorized.operational_risk(x)
+        out = {
+            "total_risk_dollars": result["total_risk_dollars"],
+            "ebitda_risk_pct": result["ebitda_risk_pct"],
+        }
+        out.update(result["module_losses"])
+    else:
+        x = {k: np.float64(v) for k, v in inputs.items()}
+        out = vectorized.run_kernel(calculator, x, BenchmarkSampler(row, rng, draws))
+
+    return {k: np.broadcast_to(np.asarray(v, dtype=float), (draws,)) for k, v in out.items()}
+
+
+def bands(samples):
+    p10, p50, p90 = np.percentile(samples, [10, 50, 90])
+    return {
+        "p10": round(float(p10), 2),
+        "p50": round(float(p50), 2),
+        "p90": round(float(p90), 2),
+        "mean": round(float(samples.mean()), 2),
+    }
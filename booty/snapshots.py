@@ -0,0 +1,417 @@
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Optional
+from uuid import uuid4
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+import metrics
+import outbox
+from auth import require_admin
+from operational_risk import RiskInput
+from report_templates import render_report_html
+
+router = APIRouter(prefix="/admin/snapshots", tags=["snapshots"], dependencies=[Depends(require_admin)])
+
+# === 1. SETTINGS ===
+# Every ORS report snapshot is kept in a local SQLite file (WAL) so reports can be
+# re-sent, compared and aggregated later. The request path only puts the row on
+# an in-memory queue; one writer thread commits them in batches.
+
+SNAPSHOT_DB = os.getenv("SNAPSHOT_DB", "snapshots.sqlite3")
+BATCH_MAX = int(os.getenv("SNAPSHOT_BATCH_MAX", "500"))
+FLUSH_INTERVAL = float(os.getenv("SNAPSHOT_FLUSH_INTERVAL", "0.5"))
+QUEUE_MAX = int(os.getenv("SNAPSHOT_QUEUE_MAX", "20000"))
+PAGE_MAX = 500
+
+# What's needed to re-render the email later
+REPORT_KEYS = set(RiskInput.model_fields) | {
+    "recipient", "subject", "total_risk_dollars", "ebitda_risk_pct", "ebitda_value", "module_breakdown",
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    report_id TEXT NOT NULL,
+    email TEXT,
+    snapshot_at TEXT NOT NULL,
+    snapshot_ts REAL NOT NULL,
+    industry TEXT,
+    total_risk REAL,
+    ebitda_risk_pct REAL,
+    fixes_total REAL,
+    best_case_net REAL,
+    snapshot TEXT NOT NULL,
+    report TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS snapshots_report_id ON snapshots (report_id);
+CREATE INDEX IF NOT EXISTS snapshots_email_ts ON snapshots (email, snapshot_ts);
+CREATE INDEX IF NOT EXISTS snapshots_ts ON snapshots (snapshot_ts);
+CREATE INDEX IF NOT EXISTS snapshots_industry_ts ON snapshots (industry, snapshot_ts);
+
+-- Daily rollup maintained by the writer, so trends never scan the raw rows
+CREATE TABLE IF NOT EXISTS snapshot_daily (
+    day TEXT NOT NULL,
+    industry TEXT NOT NULL,
+    reports INTEGER NOT NULL,
+    sum_total_risk REAL NOT NULL,
+    n_total_risk INTEGER NOT NULL,
+    sum_ebitda_risk_pct REAL NOT NULL,
+    n_ebitda_risk_pct INTEGER NOT NULL,
+    sum_fixes_total REAL NOT NULL,
+    n_fixes_total INTEGER NOT NULL,
+    PRIMARY KEY (day, industry)
+);
+"""
+
+_INSERT = (
+    "INSERT OR IGNORE INTO snapshots (report_id, email, snapshot_at, snapshot_ts, industry, total_risk,"
+    " ebitda_risk_pct, fixes_total, best_case_net, snapshot, report) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+_ROLLUP = (
+    "INSERT INTO snapshot_daily VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT (day, industry) DO UPDATE SET"
+    " reports = reports + excluded.reports,"
+    " sum_total_risk = sum_total_risk + excluded.sum_total_risk, n_total_risk = n_total_risk + excluded.n_total_risk,"
+    " sum_ebitda_risk_pct = sum_ebitda_risk_pct + excluded.sum_ebitda_risk_pct,"
+    " n_ebitda_risk_pct = n_ebitda_risk_pct + excluded.n_ebitda_risk_pct,"
+    " sum_fixes_total = sum_fixes_total + excluded.sum_fixes_total, n_fixes_total = n_fixes_total + excluded.n_fixes_total"
+)
+# Columns returned by list/history queries; the JSON bodies are only read for single lookups
+_SUMMARY = "id, report_id, email, snapshot_at, industry, total_risk, ebitda_risk_pct, fixes_total, best_case_net"
+
+_queue: "queue.Queue[Optional[tuple]]" = queue.Queue(maxsize=QUEUE_MAX)
+_writer: Optional[threading.Thread] = None
+_counters = {"written": 0, "dropped": 0, "batches": 0}
+
+# === 2. STORAGE ===
+
+
+def _connect() -> sqlite3.Connection:
+    conn = sqlite3.connect(SNAPSHOT_DB, timeout=10, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+@contextmanager
+def _db():
+    conn = _connect()
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+def init_db():
+    with _db() as conn:
+        conn.executescript(_SCHEMA)
+
+
+def _parse_ts(value: Optional[str]) -> float:
+    if not value:
+        return time.time()
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return time.time()
+
+
+def _query_ts(name: str, value: Optional[str]) -> Optional[float]:
+    """A `since`/`until` query parameter; unlike stored timestamps, a bad one is the caller's error."""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        raise HTTPException(status_code=422, detail=f"`{name}` must be an ISO-8601 timestamp, got {value!r}.")
+
+
+def _row(snapshot: Dict, data: Dict) -> tuple:
+    email = (snapshot.get("email") or "").strip().lower() or None
+    totals = snapshot.get("totals") or {}
+    report = {k: v for k, v in data.items() if k in REPORT_KEYS}
+    return (
+        snapshot["report_id"],
+        email,
+        snapshot["snapshot_at"],
+        _parse_ts(snapshot["snapshot_at"]),
+        data.get("industry") or None,
+        (snapshot.get("risk") or {}).get("ors_ebitda_at_risk"),
+        data.get("ebitda_risk_pct"),
+        totals.get("fixes_total"),
+        totals.get("best_case_net"),
+        json.dumps(snapshot, separators=(",", ":")),
+        json.dumps(report, separators=(",", ":"), default=str),
+    )
+
+
+def record(snapshot: Dict, data: Dict) -> bool:
+    """Queue a snapshot for the writer; never blocks the request (it runs on the event loop)."""
+    try:
+        _queue.put_nowait(_row(snapshot, data))
+        return True
+    except queue.Full:
+        _counters["dropped"] += 1
+        print(f"⚠️ Snapshot queue full; dropped {snapshot.get('report_id')}")
+        return False
+
+
+def _write(batch):
+    rollup = {}
+    written = 0
+    with _db() as conn:
+        conn.execute("BEGIN")
+        for row in batch:
+            if conn.execute(_INSERT, row).rowcount != 1:
+                continue  # report_id already stored
+            written += 1
+            day = time.strftime("%Y-%m-%d", time.gmtime(row[3]))
+            agg = rollup.setdefault((day, row[4] or ""), [0, 0.0, 0, 0.0, 0, 0.0, 0])
+            agg[0] += 1
+            for slot, value in ((1, row[5]), (3, row[6]), (5, row[7])):
+                if isinstance(value, (int, float)):
+                    agg[slot] += value
+                    agg[slot + 1] += 1
+        conn.executemany(_ROLLUP, [(day, industry, *agg) for (day, industry), agg in rollup.items()])
+        conn.execute("COMMIT")
+    _counters["written"] += written
+    _counters["batches"] += 1
+
+
+def _writer_loop():
+    stopping = False
+    while not stopping:
+        try:
+            item = _queue.get(timeout=FLUSH_INTERVAL)
+        except queue.Empty:
+            continue
+        batch = []
+        deadline = time.monotonic() + FLUSH_INTERVAL
+        while item is not None:
+            batch.append(item)
+            if len(batch) >= BATCH_MAX:
+                break
+            try:
+                item = _queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+        else:
+            stopping = True  # None is the shutdown sentinel; flush what we have first
+        if batch:
+            try:
+                _write(batch)
+            except Exception as e:
+                _counters["dropped"] += len(batch)
+                print(f"🔥 Snapshot write failed ({len(batch)} rows): {e}")
+
+# === 3. LIFECYCLE ===
+
+
+def start():
+    global _writer
+    init_db()
+    _writer = threading.Thread(target=_writer_loop, name="snapshot-writer", daemon=True)
+    _writer.start()
+
+
+def stop():
+    global _writer
+    if _writer is not None:
+        _queue.put(None)
+        _writer.join(timeout=10)
+        _writer = None
+
+# === 4. QUERIES ===
+
+
+def get(report_id: str) -> Optional[Dict]:
+    with _db() as conn:
+        row = conn.execute("SELECT * FROM snapshots WHERE report_id = ?", (report_id,)).fetchone()
+    if row is None:
+        return None
+    out = dict(row)
+    out["snapshot"] = json.loads(out["snapshot"])
+    out["report"] = json.loads(out["report"])
+    return out
+
+
+def history(email=None, industry=None, since=None, until=None, before_id=None, limit=100):
+    """
+    Newest first; page with `before_id` (the last `id` of the previous page).
+    Ordering by (snapshot_ts, id) lets every filter walk one of the indexes
+    instead of sorting all matching rows.
+    """
+    where, args = [], []
+    if email:
+        where.append("email = ?")
+        args.append(email.strip().lower())
+    if industry:
+        where.append("industry = ?")
+        args.append(industry)
+    if since is not None:
+        where.append("snapshot_ts >= ?")
+        args.append(since)
+    if until is not None:
+        where.append("snapshot_ts < ?")
+        args.append(until)
+    with _db() as conn:
+        if before_id is not None:
+            cursor = conn.execute("SELECT snapshot_ts FROM snapshots WHERE id = ?", (before_id,)).fetchone()
+            if cursor is None:
+                return []
+            where.append("(snapshot_ts < ? OR (snapshot_ts = ? AND id < ?))")
+            args += [cursor[0], cursor[0], before_id]
+        sql = f"SELECT {_SUMMARY} FROM snapshots"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY snapshot_ts DESC, id DESC LIMIT ?"
+        args.append(limit)
+        return [dict(r) for r in conn.execute(sql, args).fetchall()]
+
+
+BUCKETS = {"day": "day", "week": "strftime('%Y-W%W', day)", "month": "substr(day, 1, 7)"}
+
+
+def trends(bucket="day", industry=None, since=None, until=None):
+    """Per-bucket totals from the daily rollup; `since`/`until` are rounded to whole UTC days."""
+    where, args = [], []
+    if industry:
+        where.append("industry = ?")
+        args.append(industry)
+    if since is not None:
+        where.append("day >= ?")
+        args.append(time.strftime("%Y-%m-%d", time.gmtime(since)))
+    if until is not None:
+        where.append("day <= ?")
+        args.append(time.strftime("%Y-%m-%d", time.gmtime(until)))
+    sql = (
+        f"SELECT {BUCKETS[bucket]} AS bucket, SUM(reports) AS reports,"
+        " SUM(sum_total_risk) AS sum_total_risk,"
+        " SUM(sum_total_risk) / NULLIF(SUM(n_total_risk), 0) AS avg_total_risk,"
+        " SUM(sum_ebitda_risk_pct) / NULLIF(SUM(n_ebitda_risk_pct), 0) AS avg_ebitda_risk_pct,"
+        " SUM(sum_fixes_total) / NULLIF(SUM(n_fixes_total), 0) AS avg_fixes_total"
+        " FROM snapshot_daily"
+    )
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " GROUP BY bucket ORDER BY bucket"
+    with _db() as conn:
+        rows = conn.execute(sql, args).fetchall()
+    return [{k: (round(v, 2) if isinstance(v, float) else v) for k, v in dict(r).items()} for r in rows]
+
+
+def stats() -> Dict:
+    with _db() as conn:
+        total = conn.execute("SELECT COUNT(*) FROM snapshots").fetchone()[0]
+    return {"rows": total, "queued": _queue.qsize(), **_counters}
+
+
+metrics.counter_func(
+    "clarity_snapshots_total",
+    "Report snapshots by writer outcome",
+    ("result",),
+    lambda: {("written",): _counters["written"], ("dropped",): _counters["dropped"]},
+)
+
+# === 5. ROUTES ===
+
+
+@router.get("")
+def list_snapshots(
+    email: Optional[str] = None,
+    industry: Optional[str] = None,
+    since: Optional[str] = Query(default=None, description="ISO-8601 timestamp"),
+    until: Optional[str] = Query(default=None, description="ISO-8601 timestamp"),
+    before_id: Optional[int] = None,
+    limit: int = Query(default=100, ge=1, le=PAGE_MAX),
+):
+    rows = history(
+        email, industry,
+        _query_ts("since", since), _query_ts("until", until),
+        before_id, limit,
+    )
+    return {"status": "success", "data": rows, "next_before_id": rows[-1]["id"] if len(rows) == limit else None}
+
+
+@router.get("/stats")
+def snapshot_stats():
+    return {"status": "success", "data": stats()}
+
+
+@router.get("/trends")
+def snapshot_trends(
+    bucket: str = Query(default="day", pattern="^(day|week|month)$"),
+    industry: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+):
+    data = trends(bucket, industry, _query_ts("since", since), _query_ts("until", until))
+    return {"status": "success", "data": data}
+
+
+@router.get("/compare")
+def compare_snapshots(a: str, b: str):
+    """Field-by-field change from report `a` to report `b`."""
+    first, second = get(a), get(b)
+    if first is None or second is None:
+        raise HTTPException(status_code=404, detail="Snapshot not found.")
+
+    def numbers(snap):
+        flat = {}
+        for section in ("inputs", "savings", "risk", "totals"):
+            for k, v in (snap["snapshot"].get(section) or {}).items():
+                flat[f"{section}.{k}"] = v
+        return flat
+
+    before, after = numbers(first), numbers(second)
+    diff = {}
+    for key in before.keys() | after.keys():
+        x, y = before.get(key), after.get(key)
+        if isinstance(x, (int, float)) and isinstance(y, (int, float)):
+            diff[key] = {"a": x, "b": y, "change": round(y - x, 2)}
+        elif x != y:
+            diff[key] = {"a": x, "b": y, "change": None}
+    return {"status": "success", "data": {"a": a, "b": b, "diff": dict(sorted(diff.items()))}}
+
+
+@router.get("/{report_id}")
+def get_snapshot(report_id: str):
+    snap = get(report_id)
+    if snap is None:
+        raise HTTPException(status_code=404, detail="Snapshot not found.")
+    return {"status": "success", "data": snap}
+
+
+@router.post("/{report_id}/resend")
+def resend_snapshot(report_id: str, to: Optional[str] = None):
+    """Re-render the stored report and queue it again, to the original recipient unless `to` is given."""
+    snap = get(report_id)
+    if snap is None:
+        raise HTTPException(status_code=404, detail="Snapshot not found.")
+    sender = os.getenv("MAILGUN_SENDER")
+    if not sender:
+        raise HTTPException(status_code=500, detail="Missing Mailgun environment variables")
+    report = snap["report"]
+    recipient = to or report.get("recipient") or snap["email"]
+    if not recipient or "@" not in recipient:
+        raise HTTPException(status_code=422, detail="No recipient on the stored report; pass `to`.")
+
+    key = f"ors-resend:{report_id}:{uuid4()}"
+    outbox.enqueue(
+        key,
+        "ors_report",
+        {
+            "from": f"Candoo Culture Reports <{sender}>",
+            "to": [recipient],
+            "subject": report.get("subject") or "Your Operational Risk Summary",
+            "html": render_report_html(report),
+        },
+    )
+    return {"status": "success", "data": {"queued": key, "to": recipient}}
@@ -0,0 +1,24 @@
+import json
+import os
+import random
+import sys
+import time
+
+
+def sample_rate(env_var: str, default: float) -> float:
+    return min(1.0, max(0.0, float(os.getenv(env_var, str(default)))))
+
+
+def log_event(event: str, rate: float = 1.0, **fields):
+    """
+    One JSON line per event on stdout (Render's log drain parses it).
+    Hot paths pass a `rate` < 1 so most calls cost a single random() and
+    never touch stdout; the rate is recorded so counts can be scaled back up.
+    """
+    if rate < 1.0 and random.random() >= rate:
+        return
+    record = {"ts": round(time.time(), 3), "event": event}
+    if rate < 1.0:
+        record["sample_rate"] = rate
+    record.update(fields)
+    sys.stdout.write(json.dumps(record, default=str, separators=(",", ":")) + "\n")
@@ -0,0 +1,349 @@
+import asyncio
+import os
+import queue
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import APIRouter, Depends
+
+import http_client
+import metrics
+from auth import require_admin
+
+router = APIRouter(prefix="/admin/unlocks", tags=["unlocks"], dependencies=[Depends(require_admin)])
+
+# === 1. SETTINGS ===
+# /unlock-user only puts the event on an in-memory queue and returns; a writer
+# thread commits queued events to a local SQLite spool in batches, as
+# snapshots.py does. A background flusher sends spooled events to the Apps
+# Script sheet when UNLOCK_BATCH_MAX have piled up or every
+# UNLOCK_FLUSH_INTERVAL seconds, and retries failures with backoff. The same
+# email unlocking again within UNLOCK_DEDUPE_WINDOW is not logged twice.
+# The deployed script takes one form-encoded event per POST, so by default a
+# flush sends its batch as concurrent single posts (capped by http_client's
+# Sheets limit). With UNLOCK_SHEETS_BATCH=1 a flush is one JSON POST,
+# {"events": [{"email", "timestamp", "source"}, ...]}, for a script that
+# appends them in one go.
+
+UNLOCK_DB = os.getenv("UNLOCK_DB", "unlock_events.sqlite3")
+SHEETS_URL = os.getenv(
+    "UNLOCK_SHEETS_URL",
+    "https://script.google.com/macros/s/AKfycbwbtb1kDD5fOJrtCVtfcVq2H5vdgrpYhw89zpnJryUEiuset9AUBWSkNRPTU_5So-t-/exec",
+)
+SHEETS_BATCH = os.getenv("UNLOCK_SHEETS_BATCH", "0") == "1"
+BATCH_MAX = int(os.getenv("UNLOCK_BATCH_MAX", "50"))
+FLUSH_INTERVAL = float(os.getenv("UNLOCK_FLUSH_INTERVAL", "5.0"))
+DEDUPE_WINDOW = float(os.getenv("UNLOCK_DEDUPE_WINDOW", "3600"))
+MAX_ATTEMPTS = int(os.getenv("UNLOCK_MAX_ATTEMPTS", "10"))
+BASE_DELAY = 10.0       # seconds before the first retry
+MAX_DELAY = 30 * 60.0   # backoff ceiling
+LEASE_SECONDS = 120.0   # a 'sending' row older than this is assumed abandoned
+KEEP_SENT = 7 * 24 * 3600.0
+SPOOL_INTERVAL = 0.25
+SPOOL_BATCH_MAX = 500
+QUEUE_MAX = 10_000
+RECENT_MAX = 100_000    # emails remembered in memory for the dedupe fast path
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS unlock_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    email TEXT NOT NULL,
+    email_key TEXT NOT NULL,
+    source TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS unlock_events_due ON unlock_events (status, next_attempt_at);
+CREATE INDEX IF NOT EXISTS unlock_events_email ON unlock_events (email_key, created_at);
+"""
+
+# lower-cased email -> created_at of its last recorded event in this process
+_recent: Dict[str, float] = {}
+_recent_lock = threading.Lock()
+_counts = {"recorded": 0, "deduplicated": 0, "dropped": 0}
+_queue: "queue.Queue[Optional[tuple]]" = queue.Queue(maxsize=QUEUE_MAX)
+_writer: Optional[threading.Thread] = None
+_wake: Optional[asyncio.Event] = None
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_task: Optional[asyncio.Task] = None
+_unflushed = 0
+
+# === 2. STORAGE ===
+
+
+def _connect() -> sqlite3.Connection:
+    conn = sqlite3.connect(UNLOCK_DB, timeout=10, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+@contextmanager
+def _db():
+    conn = _connect()
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+def init_db():
+    with _db() as conn:
+        conn.executescript(_SCHEMA)
+
+
+def _seen_recently(email: str, now: float) -> bool:
+    with _recent_lock:
+        last = _recent.get(email)
+        if last is not None and now - last < DEDUPE_WINDOW:
+            return True
+        if len(_recent) >= RECENT_MAX:
+            _recent.clear()  # only a fast path; the table still dedupes
+        _recent[email] = now
+        return False
+
+
+def record(email: str, timestamp: str, source: str) -> bool:
+    """
+    Queue one unlock for the spool writer; never blocks the request. Returns
+    False when this process saw the same email within DEDUPE_WINDOW (the
+    writer also skips emails another worker already spooled).
+    """
+    email = email.strip()
+    key = email.lower()
+    now = time.time()
+    if _seen_recently(key, now):
+        _counts["deduplicated"] += 1
+        return False
+    try:
+        _queue.put_nowait((email, key, source, timestamp, now))
+        return True
+    except queue.Full:
+        _counts["dropped"] += 1
+        print(f"⚠️ Unlock queue full; dropped {email}")
+        return False
+
+
+def _write(batch):
+    global _unflushed
+    written = 0
+    with _db() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        for email, key, source, timestamp, created in batch:
+            cur = conn.execute(
+                "INSERT INTO unlock_events (email, email_key, source, timestamp, next_attempt_at, created_at, updated_at)"
+                " SELECT ?, ?, ?, ?, ?, ?, ? WHERE NOT EXISTS"
+                " (SELECT 1 FROM unlock_events WHERE email_key = ? AND created_at > ?)",
+                (email, key, source, timestamp, created, created, created, key, created - DEDUPE_WINDOW),
+            )
+            written += cur.rowcount
+        conn.execute("COMMIT")
+    _counts["recorded"] += written
+    _counts["deduplicated"] += len(batch) - written
+    _unflushed += written
+    if _unflushed >= BATCH_MAX:
+        _notify()
+
+
+def _writer_loop():
+    stopping = False
+    while not stopping:
+        try:
+            item = _queue.get(timeout=SPOOL_INTERVAL)
+        except queue.Empty:
+            continue
+        batch = []
+        deadline = time.monotonic() + SPOOL_INTERVAL
+        while item is not None:
+            batch.append(item)
+            if len(batch) >= SPOOL_BATCH_MAX:
+                break
+            try:
+                item = _queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+        else:
+            stopping = True  # None is the shutdown sentinel; spool what we have first
+        if batch:
+            try:
+                _write(batch)
+            except Exception as e:
+                _counts["dropped"] += len(batch)
+                with _recent_lock:
+                    for item in batch:
+                        _recent.pop(item[1], None)
+                print(f"🔥 Unlock spool write failed ({len(batch)} events): {e}")
+
+
+def _claim_batch() -> List[sqlite3.Row]:
+    now = time.time()
+    with _db() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        rows = conn.execute(
+            "SELECT * FROM unlock_events WHERE (status = 'pending' AND next_attempt_at <= ?)"
+            " OR (status = 'sending' AND updated_at < ?) ORDER BY id LIMIT ?",
+            (now, now - LEASE_SECONDS, BATCH_MAX),
+        ).fetchall()
+        if rows:
+            conn.executemany(
+                "UPDATE unlock_events SET status = 'sending', attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                [(now, row["id"]) for row in rows],
+            )
+        conn.execute("COMMIT")
+        return rows
+
+
+def _mark_sent(ids: List[int]):
+    now = time.time()
+    with _db() as conn:
+        conn.executemany(
+            "UPDATE unlock_events SET status = 'sent', last_error = NULL, updated_at = ? WHERE id = ?",
+            [(now, row_id) for row_id in ids],
+        )
+        conn.execute("DELETE FROM unlock_events WHERE status = 'sent' AND updated_at < ?", (now - KEEP_SENT,))
+
+
+def _mark_failed(failures: List[Tuple[sqlite3.Row, str]]):
+    now = time.time()
+    updates = []
+    for row, error in failures:
+        attempts = row["attempts"] + 1
+        if attempts < MAX_ATTEMPTS:
+            delay = min(MAX_DELAY, BASE_DELAY * 2 ** (attempts - 1)) * random.uniform(0.8, 1.2)
+            updates.append(("pending", now + delay, error[:500], now, row["id"]))
+        else:
+            updates.append(("dead", now, error[:500], now, row["id"]))
+    with _db() as conn:
+        conn.executemany(
+            "UPDATE unlock_events SET status = ?, next_attempt_at = ?, last_error = ?, updated_at = ? WHERE id = ?",
+            updates,
+        )
+
+
+def stats() -> Dict[str, int]:
+    with _db() as conn:
+        rows = conn.execute("SELECT status, COUNT(*) FROM unlock_events GROUP BY status").fetchall()
+    return {status: count for status, count in rows}
+
+
+metrics.gauge_func(
+    "clarity_unlock_events",
+    "Spooled unlock events by Sheets delivery status",
+    ("status",),
+    lambda: {(status,): count for status, count in stats().items()},
+)
+metrics.counter_func(
+    "clarity_unlock_events_total",
+    "Unlocks received by /unlock-user: recorded to the spool, deduplicated or dropped",
+    ("outcome",),
+    lambda: {(outcome,): n for outcome, n in _counts.items()},
+)
+
+# === 3. DELIVERY ===
+
+
+def _event(row: sqlite3.Row) -> Dict[str, str]:
+    return {"email": row["email"], "timestamp": row["timestamp"], "source": row["source"]}
+
+
+async def _post_one(row: sqlite3.Row) -> Optional[str]:
+    """Returns an error message, or None once the sheet accepted it."""
+    try:
+        r = await http_client.post("sheets", SHEETS_URL, data=_event(row))
+    except Exception as e:
+        return str(e) or type(e).__name__
+    return None if r.is_success else f"Sheets {r.status_code}: {r.text[:160]}"
+
+
+async def flush_once() -> int:
+    """Send one batch of due events. Returns how many were attempted."""
+    global _unflushed
+    rows = await asyncio.to_thread(_claim_batch)
+    if not rows:
+        _unflushed = 0
+        return 0
+    if SHEETS_BATCH:
+        error = None
+        try:
+            r = await http_client.post("sheets", SHEETS_URL, json={"events": [_event(row) for row in rows]})
+            if not r.is_success:
+                error = f"Sheets {r.status_code}: {r.text[:160]}"
+        except Exception as e:
+            error = str(e) or type(e).__name__
+        errors = [error] * len(rows)
+    else:
+        errors = await asyncio.gather(*(_post_one(row) for row in rows))
+
+    sent = [row["id"] for row, error in zip(rows, errors) if error is None]
+    failed = [(row, error) for row, error in zip(rows, errors) if error is not None]
+    if sent:
+        await asyncio.to_thread(_mark_sent, sent)
+    if failed:
+        await asyncio.to_thread(_mark_failed, failed)
+        print(f"⚠️ Sheets unlock logging failed for {len(failed)}/{len(rows)} events: {failed[0][1]}")
+    _unflushed = max(0, _unflushed - len(rows))
+    return len(rows)
+
+
+async def _flusher():
+    while True:
+        try:
+            # A full batch means more may be waiting
+            if await flush_once() >= BATCH_MAX:
+                continue
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"🔥 Unlock flusher error: {e}")
+        _wake.clear()
+        try:
+            await asyncio.wait_for(_wake.wait(), timeout=FLUSH_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+
+
+def _notify():
+    if _wake is not None and _loop is not None:
+        _loop.call_soon_threadsafe(_wake.set)
+
+# === 4. LIFECYCLE ===
+
+
+async def start():
+    global _wake, _loop, _task, _writer
+    init_db()
+    _wake = asyncio.Event()
+    _loop = asyncio.get_running_loop()
+    _writer = threading.Thread(target=_writer_loop, name="unlock-spool-writer", daemon=True)
+    _writer.start()
+    _task = asyncio.create_task(_flusher())
+
+
+async def stop():
+    global _task, _writer
+    if _writer is not None:
+        # Spool what's queued; the flusher sends it after the next start
+        _queue.put(None)
+        await asyncio.to_thread(_writer.join, 10)
+        _writer = None
+    if _task is not None:
+        _task.cancel()
+        await asyncio.gather(_task, return_exceptions=True)
+        _task = None
+
+# === 5. ROUTES ===
+
+
+@router.get("/stats")
+def unlock_stats():
+    return {"status": "success", "data": {"events": stats(), "queued": _queue.qsize(), **_counts}}
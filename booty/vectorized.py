@@ -0,0 +1,321 @@
+"""
+NumPy versions of the calculator.py formulas.
+
+Each kernel takes input columns `x` and a benchmark accessor `b(column, default)`
+and returns output columns. Everything broadcasts, so the same kernel serves a
+batch of scenarios (one benchmark row per scenario), one scenario against every
+industry, or one scenario against sampled benchmark draws.
+"""
+import numpy as np
+
+from benchmark_store import benchmark_store
+
+# === 1. BENCHMARK MATRIX ===
+
+
+class BenchmarkArrays:
+    """Struct-of-arrays view of a BenchmarkTable, rows in `industries` order."""
+
+    def __init__(self, table):
+        self.version = table.version
+        self.industries = list(table.industries)
+        self.index = {name: i for i, name in enumerate(self.industries)}
+        self._table = table
+        self._columns = {}
+
+    def column(self, name, default):
+        key = (name, default)
+        col = self._columns.get(key)
+        if col is None:
+            values = []
+            for industry in self.industries:
+                v = self._table.rows[industry].get(name, default)
+                values.append(v if isinstance(v, (int, float)) else default)
+            col = self._columns[key] = np.asarray(values, dtype=float)
+        return col
+
+    def lookup(self, industries):
+        """Row positions for an iterable of industry names; -1 where unknown."""
+        get = self.index.get
+        return np.fromiter((get(i, -1) for i in industries), dtype=np.int64)
+
+
+_arrays = None
+
+
+def benchmark_arrays() -> BenchmarkArrays:
+    global _arrays
+    table = benchmark_store.get()
+    arrays = _arrays
+    if arrays is None or arrays.version != table.version:
+        arrays = _arrays = BenchmarkArrays(table)
+    return arrays
+
+# === 2. HELPERS ===
+
+
+def _div(a, b):
+    a, b = np.broadcast_arrays(np.asarray(a, dtype=float), np.asarray(b, dtype=float))
+    return np.divide(a, b, out=np.zeros(a.shape), where=b != 0)
+
+# === 3. KERNELS ===
+
+
+def payroll_waste(x, b):
+    monthly_salary = x["avg_salary"] / 12
+    turnover_rate = b("Employee Churn Rate (%) (Value)", 0) / 100
+    inefficiency_rate = b("Process Inefficiency Rate (%) (Value)", 0) / 100
+    replacement_cost = b("Employee Replacement Cost (AUD) (Value)", 50000)
+    intervention_cost = x["total_employees"] * 7.5
+
+    inefficiency_loss = x["total_employees"] * monthly_salary * inefficiency_rate
+    improved_cost = inefficiency_loss * (1 - x["improvement_rate"] / 100)
+    savings = inefficiency_loss - improved_cost
+    churn_loss = (x["total_employees"] * turnover_rate * replacement_cost) / 12
+    return_per_dollar = _div(savings, intervention_cost)
+
+    return {
+        "employee_churn_cost": churn_loss,
+        "payroll_inefficiency_cost": inefficiency_loss,
+        "total_monthly_loss": inefficiency_loss + churn_loss,
+        "improved_inefficiency_cost": improved_cost,
+        "direct_savings": savings,
+        "monthly_roi": return_per_dollar * 100,
+        "return_per_dollar": return_per_dollar,
+        "payback_days": np.round(_div(intervention_cost, savings) * 30),
+    }
+
+
+def customer_churn(x, b):
+    churn_rate = x["churn_rate"] / 100.0
+    improvement_pts = np.clip(x["desired_improvement"], 0.0, np.maximum(x["churn_rate"], 0.0)) / 100.0
+
+    revenue_loss = x["num_customers"] * churn_rate * x["avg_revenue"]
+    replacement_cost = x["num_customers"] * churn_rate * x["cac"]
+    potential_gain = x["num_customers"] * improvement_pts * x["avg_revenue"]
+    cac_avoided = x["num_customers"] * improvement_pts * x["cac"]
+    total_gain = potential_gain + cac_avoided
+    denom = revenue_loss + replacement_cost
+
+    return {
+        "revenue_loss": revenue_loss,
+        "replacement_cost": replacement_cost,
+        "potential_gain": potential_gain,
+        "recovery_percent": _div(potential_gain, denom) * 100,
+        "cac_avoided": cac_avoided,
+        "total_gain": total_gain,
+        "recovery_percent_total": _div(total_gain, denom) * 100,
+        "benchmark_churn_rate": b("Customer Churn Rate (%) (Value)", 0),
+    }
+
+
+def leadership_drag(x, b):
+    drag_rate = x["leadership_drag"] / 100
+    annual_loss = x["avg_salary"] * drag_rate * x["total_employees"]
+    industry_avg = b("Leadership Drag Impact (%) (Value)", 10.0)
+    excess_drag = np.maximum(0, x["leadership_drag"] - industry_avg) / 100
+
+    return {
+        "monthly_loss": annual_loss / 12,
+        "annual_loss": annual_loss,
+        "excess_monthly_cost": np.round(x["avg_salary"] * x["total_employees"] * excess_drag / 12),
+        "industry_avg": industry_avg,
+    }
+
+
+def workforce_productivity(x, b):
+    total_target_hours = x["total_employees"] * x["target_hours_per_employee"]
+    lost_hours = x["absenteeism_days"] * 7.6
+    revenue_per_hour = _div(x["total_revenue"], x["productive_hours"])
+
+    return {
+        "revenue_per_employee": _div(x["total_revenue"], x["total_employees"]),
+        "payroll_efficiency": _div(x["total_revenue"], x["payroll_cost"]) * 100,
+        "utilisation_rate": _div(x["productive_hours"], total_target_hours) * 100,
+        "absenteeism_rate": _div(lost_hours, total_target_hours) * 100,
+        "overtime_rate": _div(x["overtime_hours"], x["productive_hours"]) * 100,
+        "opportunity_gain": 0.05 * total_target_hours * revenue_per_hour,
+        "payroll_return_per_dollar": _div(x["total_revenue"], x["payroll_cost"]),
+    }
+
+
+def productivity_dive(x, b):
+    target_hours = b("Target Hours per Employee (Value)", 160)
+    absenteeism_benchmark = b("Absenteeism Days per Month (Value)", 4)
+    output_per_employee = b("Output per Employee (AUD/month) (Value)", 12000)
+
+    total_employees = x["total_employees"]
+    monthly_salary = x["avg_salary"] / 12
+    # Blank absenteeism = per-employee benchmark x headcount (see calculator.py)
+    absenteeism_days = np.where(
+        (x["absenteeism_days"] == 0) & (total_employees != 0),
+        absenteeism_benchmark * total_employees,
+        x["absenteeism_days"],
+    )
+    avg_hours = np.where(x["avg_hours"] != 0, x["avg_hours"], target_hours)
+
+    utilisation_gap = np.maximum(0.0, _div(target_hours - avg_hours, target_hours))
+    underutilisation_cost = utilisation_gap * output_per_employee * total_employees
+    avg_daily_salary = _div(monthly_salary, target_hours / 7.6)
+    absenteeism_cost = absenteeism_days * avg_daily_salary
+
+    return {
+        "absenteeism_cost": absenteeism_cost,
+        "utilisation_gap_pct": utilisation_gap * 100,
+        "underutilisation_cost": underutilisation_cost,
+        "output_per_employee": output_per_employee,
+        "total_hidden_cost": absenteeism_cost + underutilisation_cost,
+    }
+
+# === 4. OPERATIONAL RISK ===
+# Same rules as operational_risk.run_operational_risk, over arrays of RiskInput fields.
+
+ORS_MODULES = [
+    "Payroll Waste",
+    "Customer Churn",
+    "Leadership Drag",
+    "Workforce Productivity",
+    "Productivity (Deep Dive)",
+]
+
+
+def operational_risk(x):
+    payroll_cost = np.where(x["payroll_cost"] > 0, x["payroll_cost"], x["avg_salary"] * x["total_employees"])
+    ebitda_value = x["total_revenue"] * (x["ebitda_margin"] / 100)
+
+    expected_hours = x["target_hours_per_employee"] * x["total_employees"]
+    workforce_active = (x["productive_hours"] > 0) & (x["target_hours_per_employee"] > 0) & (x["total_employees"] > 0)
+    daily_salary = _div(x["avg_salary"] / 12, x["avg_hours"] / 7.6)
+
+    losses = {
+        "Payroll Waste": np.where(x["improvement_rate"] > 0, payroll_cost * (x["improvement_rate"] / 100), 0.0),
+        "Customer Churn": np.where(
+            (x["churn_rate"] > 0) & (x["avg_revenue"] > 0) & (x["num_customers"] > 0),
+            x["churn_rate"] / 100 * x["avg_revenue"] * x["num_customers"],
+            0.0,
+        ),
+        "Leadership Drag": np.where(x["leadership_drag"] > 0, payroll_cost * (x["leadership_drag"] / 100), 0.0),
+        "Workforce Productivity": np.where(
+            workforce_active,
+            np.maximum((1 - _div(x["productive_hours"], expected_hours)) * payroll_cost, 0.0),
+            0.0,
+        ),
+        "Productivity (Deep Dive)": np.where(
+            (x["avg_hours"] > 0) & (x["absenteeism_days"] > 0),
+            x["absenteeism_days"] * daily_salary,
+            0.0,
+        ),
+    }
+    total_risk = sum(losses.values())
+    return {
+        "module_losses": losses,
+        "ebitda_value": ebitda_value,
+        "total_risk_dollars": total_risk,
+        "ebitda_risk_pct": np.where(ebitda_value > 0, _div(total_risk, ebitda_value) * 100, 0.0),
+    }
+
+# === 5. REGISTRY ===
+# fields: input name -> default (None = required)
+# rank_by: output that orders a cross-industry comparison (None = the kernel
+# doesn't read any benchmark, so every industry gives the same answer)
+
+
+CALCULATORS = {
+    "payroll_waste": {
+        "fields": {"total_employees": None, "avg_salary": None, "improvement_rate": None},
+        "kernel": payroll_waste,
+        "rank_by": "total_monthly_loss",
+    },
+    "customer_churn": {
+        "fields": {"num_customers": None, "churn_rate": None, "avg_revenue": None,
+                   "cac": None, "desired_improvement": None},
+        "kernel": customer_churn,
+        "rank_by": "benchmark_churn_rate",  # the only output that varies by industry
+    },
+    "leadership_drag": {
+        "fields": {"total_employees": None, "avg_salary": None, "leadership_drag": None},
+        "kernel": leadership_drag,
+        "rank_by": "excess_monthly_cost",
+    },
+    "workforce_productivity": {
+        "fields": {"total_revenue": None, "payroll_cost": None, "total_employees": None,
+                   "productive_hours": None, "target_hours_per_employee": None,
+                   "absenteeism_days": None, "overtime_hours": None},
+        "kernel": workforce_productivity,
+        "rank_by": None,
+    },
+    "productivity_dive": {
+        "fields": {"total_employees": None, "avg_salary": None, "absenteeism_days": 0, "avg_hours": 0},
+        "kernel": productivity_dive,
+        "rank_by": "total_hidden_cost",
+    },
+}
+
+
+def _to_column(values, field, default):
+    try:
+        col = np.array(values, dtype=float)
+    except (TypeError, ValueError):
+        raise ValueError(f"Field '{field}' must be numeric")
+    missing = np.isnan(col)
+    if missing.any():
+        if default is None:
+            raise ValueError(f"Row {int(np.argmax(missing))}: missing field '{field}'")
+        col[missing] = default
+    return col
+
+
+def columns_from_rows(name, rows):
+    """Row dicts -> float input columns. Raises ValueError on missing/non-numeric input."""
+    return {
+        field: _to_column([row.get(field) for row in rows], field, default)
+        for field, default in CALCULATORS[name]["fields"].items()
+    }
+
+
+def columns_from_columns(name, columns, n):
+    """Columnar payload ({field: [values]}) -> float input columns of length n."""
+    x = {}
+    for field, default in CALCULATORS[name]["fields"].items():
+        values = columns.get(field)
+        if values is None:
+            values = [None] * n
+        elif len(values) != n:
+            raise ValueError(f"Column '{field}' has {len(values)} values, expected {n}")
+        x[field] = _to_column(values, field, default)
+    return x
+
+
+def evaluate(name, x, industries):
+    """
+    Run calculator `name` over input columns `x`, one industry per row.
+    Returns (outputs, ok) where `ok` is False for rows whose industry is unknown.
+    """
+    arrays = benchmark_arrays()
+    idx = arrays.lookup(industries)
+    ok = idx >= 0
+    safe_idx = np.where(ok, idx, 0)
+
+    def b(column, default):
+        return arrays.column(column, default)[safe_idx]
+
+    return run_kernel(name, x, b), ok
+
+
+def across_industries(name, x):
+    """
+    Run calculator `name` for one scenario (length-1 input columns) against every
+    industry at once. Returns (industries, outputs) with one value per industry.
+    """
+    arrays = benchmark_arrays()
+    n = len(arrays.industries)
+    out = run_kernel(name, x, arrays.column)
+    return arrays.industries, {k: np.broadcast_to(v, (n,)) for k, v in out.items()}
+
+
+def run_kernel(name, x, b):
+    """Call a kernel and broadcast every output to the same shape."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = CALCULATORS[name]["kernel"](x, b)
+    keys = list(out)
+    return dict(zip(keys, np.broadcast_arrays(*(np.asarray(out[k], dtype=float) for k in keys))))
@@ -0,0 +1,137 @@
+import fcntl
+import hashlib
+import os
+import re
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from change_signal import ChangeSignal
+
+CONFIG_HISTORY_DIR = os.getenv("CONFIG_HISTORY_DIR", "config_history")
+CONFIG_HISTORY_KEEP = int(os.getenv("CONFIG_HISTORY_KEEP", "50"))
+
+# === 1. ATOMIC WRITES ===
+
+
+def atomic_write(path: str, data: bytes):
+    """
+    Write to a temp file in the same directory, fsync, then rename over `path`.
+    Readers see either the old file or the new one, never a partial write.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        try:
+            os.chmod(tmp, os.stat(path).st_mode & 0o777)
+        except FileNotFoundError:
+            os.chmod(tmp, 0o644)
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+    dir_fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+# === 2. VERSIONED FILE ===
+
+
+class VersionedFile:
+    """
+    A live config file plus numbered copies of every version written through it
+    (`<CONFIG_HISTORY_DIR>/<name>/000042<ext>`). Versions only go up: a rollback
+    writes the old content as a new version. Writers are serialized by a thread
+    lock and an flock on the history directory, so concurrent requests and other
+    worker processes can't interleave; readers never take either lock. Each
+    write bumps `signal` so other workers drop their cached copy.
+    """
+
+    def __init__(self, path: str, name: str, keep: int = CONFIG_HISTORY_KEEP):
+        self.path = path
+        self.ext = os.path.splitext(path)[1]
+        self.dir = os.path.join(CONFIG_HISTORY_DIR, name)
+        self.keep = max(1, keep)
+        self._pattern = re.compile(rf"^(\d{{6}}){re.escape(self.ext)}$")
+        self._lock = threading.Lock()
+        self.signal = ChangeSignal(name)
+
+    def _versions(self):
+        try:
+            names = os.listdir(self.dir)
+        except FileNotFoundError:
+            return []
+        return sorted(int(m.group(1)) for m in map(self._pattern.match, names) if m)
+
+    def _version_path(self, version: int) -> str:
+        return os.path.join(self.dir, f"{version:06d}{self.ext}")
+
+    @contextmanager
+    def _locked(self):
+        os.makedirs(self.dir, exist_ok=True)
+        with self._lock, open(os.path.join(self.dir, ".lock"), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def current_version(self) -> int:
+        versions = self._versions()
+        return versions[-1] if versions else 0
+
+    def write(self, data: bytes) -> int:
+        """Store `data` as the next version and make it live. Returns the new version number."""
+        with self._locked():
+            versions = self._versions()
+            if not versions and os.path.exists(self.path):
+                # First managed write: keep what was deployed as version 1
+                with open(self.path, "rb") as f:
+                    atomic_write(self._version_path(1), f.read())
+                versions = [1]
+            version = (versions[-1] if versions else 0) + 1
+            atomic_write(self._version_path(version), data)
+            atomic_write(self.path, data)
+            self.signal.bump()
+            for old in versions[: max(0, len(versions) + 1 - self.keep)]:
+                os.remove(self._version_path(old))
+        return version
+
+    def read(self, version: int) -> bytes:
+        try:
+            with open(self._version_path(version), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            raise KeyError(version)
+
+    def rollback(self, version: int) -> int:
+        """Republish an earlier version's content as a new version."""
+        return self.write(self.read(version))
+
+    def history(self):
+        entries = []
+        for version in reversed(self._versions()):
+            path = self._version_path(version)
+            try:
+                st = os.stat(path)
+                with open(path, "rb") as f:
+                    digest = hashlib.sha1(f.read()).hexdigest()[:12]
+            except FileNotFoundError:
+                continue  # pruned by a concurrent write
+            entries.append({
+                "version": version,
+                "written_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(st.st_mtime)),
+                "bytes": st.st_size,
+                "content_hash": digest,
+            })
+        return entries